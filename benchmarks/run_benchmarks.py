@@ -0,0 +1,292 @@
+"""Benchmarks of the correlation_analysis.py hot paths on synthetic data.
+
+Each benchmark runs at every requested size on files from
+benchmarks/synthetic_data.py. The reported time is the fastest of `--repeat`
+runs; peak memory comes from one extra run under tracemalloc, which sees the
+NumPy and pandas buffers and is kept out of the timed runs because it slows
+allocation down.
+
+Results can be stored as a baseline and later runs compared against it. A
+benchmark regresses when its time or peak memory exceeds the baseline by more
+than `--tolerance`, and the run then exits with status 1. Baselines are only
+comparable on the same machine.
+
+Run it from the repository root:
+
+    python -m benchmarks.run_benchmarks --save-baseline
+    python -m benchmarks.run_benchmarks
+    python -m benchmarks.run_benchmarks --sizes 1000000 10000000 --benchmarks load_citations
+"""
+
+import argparse
+import json
+import platform
+import shutil
+import tempfile
+import time
+import tracemalloc
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+import scipy
+
+from benchmarks.synthetic_data import write_synthetic_files
+from correlation_analysis import (
+    REPO_ROOT,
+    build_outer_merge,
+    cliffs_delta,
+    create_analysis_dataset,
+    load_badges,
+    load_citations,
+    repo_relative,
+    save_plots,
+    statistical_tests,
+)
+
+
+DATA_DIR = REPO_ROOT / ".cache" / "benchmarks"
+BASELINE_FILE = REPO_ROOT / "benchmarks" / "baseline.json"
+DEFAULT_SIZES = [1000, 10000, 100000]
+DEFAULT_REPEAT = 3
+DEFAULT_TOLERANCE = 0.5  # allowed relative slowdown or memory growth over the baseline
+
+
+class Inputs:
+    """Lazily built inputs of the benchmarks at one size, each computed once."""
+
+    def __init__(self, n_rows, seed):
+        self.citation_file, self.badge_file = write_synthetic_files(n_rows, DATA_DIR, seed)
+        self._values = {}
+
+    def _get(self, name, build):
+        if name not in self._values:
+            self._values[name] = build()
+        return self._values[name]
+
+    def citations(self):
+        return self._get("citations", lambda: load_citations(self.citation_file))
+
+    def badges(self):
+        return self._get("badges", lambda: load_badges(self.badge_file))
+
+    def merged(self):
+        return self._get("merged", lambda: build_outer_merge(self.citations(), self.badges()))
+
+    def analysis(self):
+        return self._get("analysis", lambda: create_analysis_dataset(self.merged()))
+
+    def cliffs_groups(self):
+        def build():
+            analysis_df = self.analysis()
+            citations = analysis_df["Citations"].to_numpy()
+            categories = analysis_df["BadgeCategory"]
+            return citations[categories == "Replicable"], citations[categories == "No badge"]
+
+        return self._get("cliffs_groups", build)
+
+
+# Each benchmark prepares its arguments from the inputs, which is not measured,
+# and returns the call to measure.
+def bench_load_citations(inputs):
+    return lambda: load_citations(inputs.citation_file)
+
+
+def bench_build_outer_merge(inputs):
+    citations_df, badges_df = inputs.citations(), inputs.badges()
+    return lambda: build_outer_merge(citations_df, badges_df)
+
+
+def bench_create_analysis_dataset(inputs):
+    merged_df = inputs.merged()
+    return lambda: create_analysis_dataset(merged_df)
+
+
+def bench_statistical_tests(inputs):
+    analysis_df = inputs.analysis()
+    return lambda: statistical_tests(analysis_df)
+
+
+def bench_cliffs_delta(inputs):
+    replicable, no_badge = inputs.cliffs_groups()
+    return lambda: cliffs_delta(replicable, no_badge)
+
+
+def bench_save_plots(inputs):
+    analysis_df = inputs.analysis()
+
+    def call():
+        plot_dir = Path(tempfile.mkdtemp(prefix="benchmark-plots-"))
+        try:
+            save_plots(analysis_df, plot_dir, "synthetic")
+        finally:
+            shutil.rmtree(plot_dir)
+
+    return call
+
+
+BENCHMARKS = {
+    "load_citations": bench_load_citations,
+    "build_outer_merge": bench_build_outer_merge,
+    "create_analysis_dataset": bench_create_analysis_dataset,
+    "statistical_tests": bench_statistical_tests,
+    "cliffs_delta": bench_cliffs_delta,
+    "save_plots": bench_save_plots,
+}
+
+
+def measure(call, repeat):
+    """Return (fastest wall time in seconds, peak traced allocation in MB) of `call`."""
+    times = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        call()
+        times.append(time.perf_counter() - start)
+    tracemalloc.start()
+    try:
+        call()
+        peak = tracemalloc.get_traced_memory()[1]
+    finally:
+        tracemalloc.stop()
+    return min(times), peak / 2**20
+
+
+def run_benchmarks(names, sizes, repeat=DEFAULT_REPEAT, seed=0):
+    """Run the named benchmarks at each size and return {"<name>/<size>": result}."""
+    results = {}
+    for size in sizes:
+        inputs = Inputs(size, seed)
+        for name in names:
+            seconds, peak_mb = measure(BENCHMARKS[name](inputs), repeat)
+            results[f"{name}/{size}"] = {"seconds": seconds, "peak_mb": peak_mb}
+            print(f"{name:<24} {size:>10} rows {seconds:>10.4f} s {peak_mb:>10.1f} MB", flush=True)
+    return results
+
+
+def environment():
+    return {
+        "python": platform.python_version(),
+        "machine": platform.machine(),
+        "processor": platform.processor(),
+        "numpy": np.__version__,
+        "pandas": pd.__version__,
+        "scipy": scipy.__version__,
+    }
+
+
+def compare_to_baseline(results, baseline, tolerance):
+    """Return a frame comparing `results` with the baseline ones they share."""
+    rows = []
+    for key, result in results.items():
+        reference = baseline.get(key)
+        if reference is None:
+            continue
+        time_ratio = result["seconds"] / reference["seconds"] if reference["seconds"] else np.nan
+        memory_ratio = result["peak_mb"] / reference["peak_mb"] if reference["peak_mb"] else np.nan
+        rows.append(
+            {
+                "benchmark": key,
+                "seconds": result["seconds"],
+                "baseline_seconds": reference["seconds"],
+                "time_ratio": time_ratio,
+                "peak_mb": result["peak_mb"],
+                "baseline_peak_mb": reference["peak_mb"],
+                "memory_ratio": memory_ratio,
+                "regressed": bool(time_ratio > 1 + tolerance or memory_ratio > 1 + tolerance),
+            }
+        )
+    return pd.DataFrame(rows)
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(
+        description="Benchmark the analysis hot paths on seeded synthetic data."
+    )
+    parser.add_argument(
+        "--sizes",
+        type=int,
+        nargs="+",
+        default=DEFAULT_SIZES,
+        help=f"Row counts to benchmark (default: {' '.join(map(str, DEFAULT_SIZES))}).",
+    )
+    parser.add_argument(
+        "--benchmarks",
+        nargs="+",
+        choices=list(BENCHMARKS),
+        default=list(BENCHMARKS),
+        help="Benchmarks to run (default: all).",
+    )
+    parser.add_argument(
+        "--repeat",
+        type=int,
+        default=DEFAULT_REPEAT,
+        help=f"Timed runs per benchmark; the fastest is reported (default: {DEFAULT_REPEAT}).",
+    )
+    parser.add_argument("--seed", type=int, default=0, help="Synthetic data seed (default: 0).")
+    parser.add_argument(
+        "--baseline",
+        type=Path,
+        default=BASELINE_FILE,
+        help=f"Baseline results file (default: {repo_relative(BASELINE_FILE)}).",
+    )
+    parser.add_argument(
+        "--save-baseline",
+        action="store_true",
+        help="Store the results in the baseline file instead of comparing against it.",
+    )
+    parser.add_argument(
+        "--tolerance",
+        type=float,
+        default=DEFAULT_TOLERANCE,
+        help=(
+            "Relative increase in time or peak memory over the baseline reported as a "
+            f"regression (default: {DEFAULT_TOLERANCE:g})."
+        ),
+    )
+    parser.add_argument("--output", type=Path, help="Also write the results to this JSON file.")
+    return parser.parse_args(argv)
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    results = run_benchmarks(args.benchmarks, args.sizes, args.repeat, args.seed)
+    report = {"environment": environment(), "seed": args.seed, "results": results}
+    if args.output:
+        with args.output.open("w", encoding="utf-8") as handle:
+            json.dump(report, handle, indent=2)
+
+    if args.save_baseline:
+        baseline = {"environment": environment(), "seed": args.seed, "results": {}}
+        if args.baseline.exists():
+            with args.baseline.open(encoding="utf-8") as handle:
+                baseline = json.load(handle)
+        # Benchmarks that were not run keep their stored baseline.
+        baseline["environment"] = environment()
+        baseline["results"].update(results)
+        with args.baseline.open("w", encoding="utf-8") as handle:
+            json.dump(baseline, handle, indent=2, sort_keys=True)
+        print(f"Baseline written to {repo_relative(args.baseline)}")
+        return
+
+    if not args.baseline.exists():
+        print(f"No baseline at {repo_relative(args.baseline)}; run with --save-baseline first.")
+        return
+    with args.baseline.open(encoding="utf-8") as handle:
+        baseline = json.load(handle)
+    if baseline.get("seed") != args.seed:
+        raise ValueError(
+            f"Baseline {args.baseline} was recorded with seed {baseline.get('seed')}, not {args.seed}"
+        )
+    comparison = compare_to_baseline(results, baseline["results"], args.tolerance)
+    if comparison.empty:
+        print("No benchmark in this run has a baseline result.")
+        return
+    print()
+    print(comparison.to_string(index=False, float_format=lambda value: f"{value:.4g}"))
+    if comparison["regressed"].any():
+        regressed = ", ".join(comparison.loc[comparison["regressed"], "benchmark"])
+        raise SystemExit(f"Regression over {args.tolerance:.0%} tolerance: {regressed}")
+
+
+if __name__ == "__main__":
+    main()
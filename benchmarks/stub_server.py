@@ -0,0 +1,171 @@
+"""Local stand-in for the DBLP, OpenAlex and OpenCitations APIs.
+
+StubServer answers the URL shapes used by get-citations.py with small
+deterministic JSON documents. It can throttle clients like the real APIs do,
+answering requests beyond `rate` per second with 429 and a Retry-After header,
+add a fixed `latency` per request, and serve ETags so conditional requests get
+304 answers. It counts requests, throttled answers, 304 answers, and TCP
+connections, so transports can be compared for throughput and connection
+reuse without touching the network.
+
+    with StubServer(rate=50) as server:
+        transport.get(server.url("/works/https://doi.org/10.1000/1"))
+        print(server.stats)
+"""
+
+import hashlib
+import json
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, unquote, urlparse
+
+
+def stub_citations(key):
+    """Deterministic citation count of a DOI or title."""
+    return int(hashlib.sha256(key.encode("utf-8")).hexdigest()[:6], 16) % 500
+
+
+def stub_document(path, query):
+    """JSON document for an API path, or None for an unknown path."""
+    if path.startswith("/works/"):
+        doi = unquote(path[len("/works/"):])
+        return {"id": f"https://openalex.org/W{stub_citations(doi)}", "doi": doi, "cited_by_count": stub_citations(doi)}
+    if path == "/works":
+        filters = query.get("filter", [""])[0]
+        if filters.startswith("doi:"):
+            dois = filters[len("doi:"):].split("|")
+            return {
+                "meta": {"count": len(dois)},
+                "results": [{"doi": doi, "cited_by_count": stub_citations(doi)} for doi in dois],
+            }
+        title = filters.partition(":")[2].replace("+", " ")
+        return {
+            "meta": {"count": 1},
+            "results": [
+                {"doi": f"https://doi.org/10.1000/{stub_citations(title)}", "title": title, "cited_by_count": stub_citations(title)}
+            ],
+        }
+    if path.startswith("/index/api/v1/citations/"):
+        doi = unquote(path[len("/index/api/v1/citations/"):])
+        return [
+            {
+                "oci": f"0{index}-0{stub_citations(doi)}",
+                "citing": f"10.1000/citing.{index}",
+                "cited": doi,
+                "creation": "2023-01-01",
+                "timespan": "P1Y",
+                "journal_sc": "no",
+                "author_sc": "no",
+            }
+            for index in range(stub_citations(doi))
+        ]
+    if path.startswith("/index/api/v1/citation-count/"):
+        doi = unquote(path[len("/index/api/v1/citation-count/"):])
+        return [{"count": str(stub_citations(doi))}]
+    if path == "/search/publ/api":
+        first = int(query.get("f", ["0"])[0])
+        page_size = int(query.get("h", ["1000"])[0])
+        total = int(query.get("total", ["100"])[0])
+        hits = [
+            {"info": {"ee": f"https://doi.org/10.1000/stub.{index}", "title": f"Stub paper {index}."}}
+            for index in range(first, min(total, first + page_size))
+        ]
+        return {"result": {"hits": {"@total": str(total), "hit": hits}}}
+    return None
+
+
+class StubServer:
+    """Threaded local HTTP/1.1 server for the citation APIs with optional throttling."""
+
+    def __init__(self, rate=None, burst=1, latency=0.0, retry_after=1, etag=True):
+        self.rate = rate
+        self.burst = burst
+        self.latency = latency
+        self.retry_after = retry_after
+        self.etag = etag
+        self.stats = {"requests": 0, "throttled": 0, "not_modified": 0, "connections": 0}
+        self._lock = threading.Lock()
+        self._tokens = float(burst)
+        self._updated = time.monotonic()
+        self._server = None
+        self._thread = None
+
+    def _admit(self):
+        """Token bucket of the server; False when the client is over the rate."""
+        if not self.rate:
+            return True
+        now = time.monotonic()
+        self._tokens = min(self.burst, self._tokens + (now - self._updated) * self.rate)
+        self._updated = now
+        if self._tokens < 1:
+            return False
+        self._tokens -= 1
+        return True
+
+    def _handler(self):
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"  # keep-alive, so clients can reuse connections
+
+            def setup(self):
+                super().setup()
+                with server._lock:
+                    server.stats["connections"] += 1
+
+            def log_message(self, *args):
+                pass
+
+            def respond(self, status, body=b"", headers=None):
+                self.send_response(status)
+                for name, value in (headers or {}).items():
+                    self.send_header(name, value)
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def do_GET(self):
+                with server._lock:
+                    server.stats["requests"] += 1
+                    admitted = server._admit()
+                    if not admitted:
+                        server.stats["throttled"] += 1
+                if server.latency:
+                    time.sleep(server.latency)
+                if not admitted:
+                    self.respond(429, headers={"Retry-After": str(server.retry_after)})
+                    return
+                parts = urlparse(self.path)
+                document = stub_document(parts.path, parse_qs(parts.query))
+                if document is None:
+                    self.respond(404)
+                    return
+                body = json.dumps(document).encode("utf-8")
+                headers = {"Content-Type": "application/json"}
+                if server.etag:
+                    headers["ETag"] = f'"{hashlib.sha256(body).hexdigest()[:16]}"'
+                    if self.headers.get("If-None-Match") == headers["ETag"]:
+                        with server._lock:
+                            server.stats["not_modified"] += 1
+                        self.respond(304, headers={"ETag": headers["ETag"]})
+                        return
+                self.respond(200, body, headers)
+
+        return Handler
+
+    def url(self, path):
+        host, port = self._server.server_address[:2]
+        return f"http://{host}:{port}{path}"
+
+    def __enter__(self):
+        self._server = ThreadingHTTPServer(("127.0.0.1", 0), self._handler())
+        self._server.daemon_threads = True
+        self._thread = threading.Thread(target=self._server.serve_forever, daemon=True)
+        self._thread.start()
+        return self
+
+    def __exit__(self, *exc_info):
+        self._server.shutdown()
+        self._server.server_close()
+        self._thread.join()
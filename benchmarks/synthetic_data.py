@@ -0,0 +1,116 @@
+"""Seeded synthetic citation and badge files in the layout of the SC 2022 dataset.
+
+The generated papers have hierarchy-consistent badges (Replicable implies
+Functional implies Available), heavy-tailed citation counts (Poisson counts
+with log-normally distributed rates that rise slightly with the badge level),
+and DOIs written with the prefix, case, whitespace and trailing-slash variants
+that normalize_doi() has to undo. As in the real data, a few papers are only
+listed in one of the two files and the files list papers in different orders.
+
+Generate a pair of files from the repository root:
+
+    python -m benchmarks.synthetic_data --rows 1000000 --output-dir .cache/synthetic
+"""
+
+import argparse
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+
+# Shares of papers in each badge category: No badge, Available only,
+# Functional only, Replicable.
+CATEGORY_SHARES = [0.6, 0.15, 0.05, 0.2]
+DOI_VARIANTS = ["https://doi.org/", "http://dx.doi.org/", "doi:", "", "HTTPS://DOI.ORG/"]
+CITATION_ONLY_SHARE = 0.01  # papers missing from the badge file
+BADGE_ONLY_SHARE = 0.005  # papers missing from the citation file
+LOG_RATE_MEAN = 1.8
+LOG_RATE_SIGMA = 1.1
+LEVEL_EFFECT = 0.15  # increase of the mean log citation rate per badge level
+
+
+def doi_variants(dois, rng):
+    """Write each DOI with a random prefix variant, case, padding and trailing slash."""
+    prefixes = np.array(DOI_VARIANTS, dtype=object)[rng.integers(len(DOI_VARIANTS), size=len(dois))]
+    variants = pd.Series(prefixes + dois, dtype=object)
+    upper = rng.random(len(dois)) < 0.1
+    variants[upper] = variants[upper].str.upper()
+    slash = rng.random(len(dois)) < 0.05
+    variants[slash] = variants[slash] + "/"
+    padded = rng.random(len(dois)) < 0.05
+    variants[padded] = " " + variants[padded] + " "
+    return variants
+
+
+def synthetic_papers(n_rows, seed=0):
+    """Return (citations_df, badges_df) frames with about `n_rows` rows each."""
+    rng = np.random.default_rng(seed)
+    n_papers = int(round(n_rows * (1 + BADGE_ONLY_SHARE)))
+    registrants = rng.integers(1000, 10000, size=n_papers).astype(str)
+    dois = (
+        pd.Series(["10."] * n_papers, dtype=object)
+        + registrants
+        + "/bench."
+        + pd.Series(np.arange(n_papers)).astype(str)
+    ).to_numpy(dtype=object)
+
+    levels = rng.choice(len(CATEGORY_SHARES), size=n_papers, p=CATEGORY_SHARES)
+    badges = {
+        "aa": (levels >= 1).astype(int),
+        "af": (levels >= 2).astype(int),
+        "ar": (levels >= 3).astype(int),
+    }
+    rates = np.exp(rng.normal(LOG_RATE_MEAN + LEVEL_EFFECT * levels, LOG_RATE_SIGMA))
+    citations = rng.poisson(rates)
+
+    in_citations = rng.random(n_papers) >= BADGE_ONLY_SHARE
+    in_badges = rng.random(n_papers) >= CITATION_ONLY_SHARE
+    citation_rows = rng.permutation(np.flatnonzero(in_citations))
+    badge_rows = rng.permutation(np.flatnonzero(in_badges))
+    citations_df = pd.DataFrame(
+        {
+            "DOI": doi_variants(dois[citation_rows], rng),
+            "Citations": citations[citation_rows],
+        }
+    )
+    badges_df = pd.DataFrame(
+        {"DOI": doi_variants(dois[badge_rows], rng)}
+        | {column: values[badge_rows] for column, values in badges.items()}
+    )
+    return citations_df, badges_df
+
+
+def write_synthetic_files(n_rows, output_dir, seed=0):
+    """Write synthetic citation and badge CSVs to `output_dir` unless they exist.
+
+    Returns the (citation file, badge file) paths. Files are named after the row
+    count and seed, so they can be reused by later runs.
+    """
+    output_dir = Path(output_dir)
+    citation_file = output_dir / f"synthetic{n_rows}_seed{seed}_citations.csv"
+    badge_file = output_dir / f"synthetic{n_rows}_seed{seed}_reproducibility.csv"
+    if not citation_file.exists() or not badge_file.exists():
+        output_dir.mkdir(parents=True, exist_ok=True)
+        citations_df, badges_df = synthetic_papers(n_rows, seed)
+        citations_df.to_csv(citation_file, index=False)
+        badges_df.to_csv(badge_file, index=False)
+    return citation_file, badge_file
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Write seeded synthetic citation and badge CSVs.")
+    parser.add_argument("--rows", type=int, required=True, help="Approximate rows per file.")
+    parser.add_argument("--seed", type=int, default=0, help="Random seed (default: 0).")
+    parser.add_argument("--output-dir", type=Path, required=True, help="Directory for the CSVs.")
+    return parser.parse_args(argv)
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    for path in write_synthetic_files(args.rows, args.output_dir, args.seed):
+        print(f"Wrote {path}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,231 @@
+"""Columnar DOI x snapshot store of citation counts.
+
+The panel keeps every normalized DOI once, in an index shared by all
+snapshots, together with one source spelling per DOI (the spelling of the
+snapshot that added it). The citation counts form a DOI x snapshot int32
+matrix stored column by column: each snapshot is one file that is memory-mapped
+on read, so reading a snapshot neither parses nor copies its counts. A column
+only covers the DOIs known when it was written; later DOIs are MISSING in it,
+so adding DOIs never rewrites the stored columns.
+
+Column and DOI files are written under temporary names and renamed into place
+before panel.json, which is itself replaced atomically and is the only file
+that makes them visible. A run that dies half-way leaves the previous panel
+intact. Opening a column checks that its file size matches panel.json.
+
+correlation_analysis.py builds and reads the panel; this module only deals
+with storage and has no knowledge of the CSV layout.
+"""
+
+import json
+import os
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+
+MISSING = -1  # stored for DOIs that are absent from a snapshot
+METADATA_FILE = "panel.json"
+DOI_FILE = "dois.txt"
+SOURCE_DOI_FILE = "source_dois.txt"
+FORMAT_VERSION = 2
+SEPARATOR = "\0"  # between the DOIs of the DOI files; never part of a DOI
+
+
+def read_strings(path, count):
+    """First `count` strings of a SEPARATOR-joined UTF-8 file, as an object array.
+
+    Strings beyond `count` were appended by an add_snapshot() that did not get
+    to save its metadata and are ignored.
+    """
+    if not count:
+        return np.empty(0, dtype=object)
+    values = path.read_text(encoding="utf-8").split(SEPARATOR)
+    if len(values) < count:
+        raise ValueError(f"{path} holds {len(values)} DOIs, but the citation panel expects {count}")
+    return np.array(values[:count], dtype=object)
+
+
+def write_atomically(path, write):
+    temporary_path = path.with_name(f".{path.name}.tmp")
+    with temporary_path.open("wb") as handle:
+        write(handle)
+    os.replace(temporary_path, path)
+
+
+class CitationPanel:
+    """DOI x snapshot int32 citation counts with the DOI index and snapshot metadata."""
+
+    def __init__(self, directory):
+        self.directory = Path(directory)
+        self.snapshots = []
+        n_rows = 0
+        metadata_path = self.directory / METADATA_FILE
+        if metadata_path.exists():
+            with metadata_path.open(encoding="utf-8") as handle:
+                metadata = json.load(handle)
+            # Panels in an older layout are rebuilt by the next update.
+            if metadata.get("format") == FORMAT_VERSION:
+                self.snapshots = metadata["snapshots"]
+                n_rows = metadata["rows"]
+        self.dois = read_strings(self.directory / DOI_FILE, n_rows)
+        self.source_dois = read_strings(self.directory / SOURCE_DOI_FILE, n_rows)
+        self._columns = {}
+        self._doi_rows = None
+
+    def __getstate__(self):
+        # Memory maps are reopened lazily in the receiving process.
+        state = self.__dict__.copy()
+        state["_columns"] = {}
+        state["_doi_rows"] = None
+        return state
+
+    @property
+    def shape(self):
+        return len(self.dois), len(self.snapshots)
+
+    def snapshot(self, label):
+        for snapshot in self.snapshots:
+            if snapshot["label"] == label:
+                return snapshot
+        raise KeyError(f"Snapshot {label} is not in the citation panel at {self.directory}")
+
+    def is_current(self, label, digest):
+        """Whether `label` is stored and was built from a file with this content digest."""
+        return any(
+            snapshot["label"] == label and snapshot["digest"] == digest
+            for snapshot in self.snapshots
+        )
+
+    def column(self, label):
+        """Zero-copy view of one snapshot's counts, MISSING where a DOI is absent.
+
+        The column covers the first snapshot["length"] DOIs of the index.
+        """
+        snapshot = self.snapshot(label)
+        if label not in self._columns:
+            path = self.directory / snapshot["file"]
+            expected = snapshot["length"] * np.dtype(np.int32).itemsize
+            if path.stat().st_size != expected:
+                raise ValueError(
+                    f"{path} holds {path.stat().st_size} bytes, but the citation panel expects "
+                    f"{expected} ({snapshot['length']} int32 counts)"
+                )
+            self._columns[label] = (
+                np.memmap(path, dtype=np.int32, mode="r", shape=(snapshot["length"],))
+                if snapshot["length"]
+                else np.empty(0, dtype=np.int32)
+            )
+        return self._columns[label]
+
+    def counts(self, labels):
+        """(n_dois, len(labels)) int32 counts of the given snapshots, MISSING where absent."""
+        counts = np.full((len(self.dois), len(labels)), MISSING, dtype=np.int32)
+        for index, label in enumerate(labels):
+            column = self.column(label)
+            counts[: len(column), index] = column
+        return counts
+
+    def snapshot_frame(self, label):
+        """Return the snapshot as load_citations() would: DOI, Citations, CitationDOI.
+
+        When the snapshot's DOIs are one contiguous run of the index, as they
+        are when snapshots share their DOIs, the Citations column is a view of
+        the memory map and DOI a view of the index.
+        """
+        snapshot = self.snapshot(label)
+        counts = self.column(label)
+        rows = np.flatnonzero(counts != MISSING)
+        if not rows.size or rows[-1] - rows[0] + 1 == rows.size:
+            rows = slice(rows[0], rows[-1] + 1) if rows.size else slice(0, 0)
+        source_dois = self.source_dois[rows]
+        overrides = snapshot["source_dois"]
+        if overrides["rows"]:
+            # Rows where this snapshot spells the DOI differently from the index.
+            source_dois = source_dois.copy()
+            positions = np.searchsorted(np.arange(len(counts))[rows], overrides["rows"])
+            source_dois[positions] = overrides["dois"]
+        return pd.DataFrame(
+            {
+                "DOI": self.dois[rows],
+                "Citations": counts[rows],
+                "CitationDOI": source_dois,
+            },
+            copy=False,
+        )
+
+    def add_snapshot(self, label, citations_df, digest, metadata=None):
+        """Store (or replace) a snapshot from a frame with DOI, CitationDOI and Citations.
+
+        DOIs must already be normalized and unique. New DOIs are appended to the
+        index and the snapshot is written as a new column file; stored columns
+        are left as they are.
+        """
+        citations = citations_df["Citations"].to_numpy()
+        if not np.all(np.isfinite(citations)) or not np.all(citations == np.round(citations)):
+            raise ValueError(f"Citation counts for {label} must be integers to be stored in the panel")
+        if citations.size and (citations.min() < 0 or citations.max() > np.iinfo(np.int32).max):
+            raise ValueError(f"Citation counts for {label} do not fit the int32 panel")
+
+        if self._doi_rows is None:
+            self._doi_rows = {doi: row for row, doi in enumerate(self.dois)}
+        dois = citations_df["DOI"].to_numpy(dtype=object)
+        sources = citations_df["CitationDOI"].to_numpy(dtype=object)
+        stored_rows = len(self.dois)
+        new = np.fromiter((doi not in self._doi_rows for doi in dois), dtype=bool, count=len(dois))
+        for row, doi in enumerate(dois[new], start=stored_rows):
+            self._doi_rows[doi] = row
+        rows = np.fromiter((self._doi_rows[doi] for doi in dois), dtype=np.int64, count=len(dois))
+        self.dois = np.concatenate([self.dois, dois[new]])
+        self.source_dois = np.concatenate([self.source_dois, sources[new]])
+
+        column = np.full(len(self.dois), MISSING, dtype=np.int32)
+        column[rows] = citations.astype(np.int32)
+        differs = sources != self.source_dois[rows]
+        order = np.argsort(rows[differs])
+
+        self.directory.mkdir(parents=True, exist_ok=True)
+        existing = [snapshot for snapshot in self.snapshots if snapshot["label"] == label]
+        entry = {
+            **(metadata or {}),
+            "label": label,
+            "file": f"{label}.{digest[:16]}.{len(column)}.int32",
+            "length": len(column),
+            "digest": digest,
+            "rows": int(len(citations_df)),
+            "source_dois": {
+                "rows": rows[differs][order].tolist(),
+                "dois": sources[differs][order].tolist(),
+            },
+        }
+        write_atomically(self.directory / entry["file"], lambda handle: handle.write(column.tobytes()))
+        if len(self.dois) > stored_rows:
+            for path, values in [
+                (self.directory / DOI_FILE, self.dois),
+                (self.directory / SOURCE_DOI_FILE, self.source_dois),
+            ]:
+                write_atomically(
+                    path, lambda handle: handle.write(SEPARATOR.join(values).encode("utf-8"))
+                )
+        if existing:
+            self.snapshots[self.snapshots.index(existing[0])] = entry
+        else:
+            self.snapshots.append(entry)
+        self._columns.pop(label, None)
+        self._save_metadata()
+        self._remove_unreferenced_files()
+
+    def _save_metadata(self):
+        metadata = {"format": FORMAT_VERSION, "rows": len(self.dois), "snapshots": self.snapshots}
+        write_atomically(
+            self.directory / METADATA_FILE,
+            lambda handle: handle.write(json.dumps(metadata).encode("utf-8")),
+        )
+
+    def _remove_unreferenced_files(self):
+        """Delete column files of replaced snapshots and of older panel layouts."""
+        referenced = {snapshot["file"] for snapshot in self.snapshots}
+        for path in self.directory.glob("*.int32"):
+            if path.name not in referenced:
+                path.unlink()
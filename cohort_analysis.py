@@ -0,0 +1,596 @@
+"""Batch analysis of badge level against citations for many venue/year cohorts.
+
+correlation_analysis.py reproduces the SC 2022 paper analysis. This script runs
+the same merge, validation and test battery for every cohort (venue, year and
+citation snapshot) listed in a manifest or found in the dataset directory
+layout:
+
+    dataset/<venue><year>_reproducibility.csv
+    dataset/data-<mon>-<yyyy>/<venue><year>_citations.csv
+
+All valid cohorts are stacked into one frame. Descriptive statistics and the
+Spearman, Kruskal-Wallis, Mann-Whitney and Cliff's delta results are computed
+with grouped array operations over that frame, so a run costs a few passes over
+all papers instead of one set of test calls per cohort.
+
+Run it from the repository root:
+
+    python cohort_analysis.py
+    python cohort_analysis.py --manifest cohorts.csv
+"""
+
+import argparse
+import json
+import re
+from datetime import datetime
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+from scipy.stats import chi2, ks_2samp, mannwhitneyu, norm
+from scipy.stats import t as student_t
+
+from correlation_analysis import (
+    ALPHA,
+    CATEGORY_LEVELS,
+    CATEGORY_ORDER,
+    REPO_ROOT,
+    RESULTS_STORE_FILE,
+    association_interpretation,
+    build_outer_merge,
+    category_difference_interpretation,
+    clean_for_json,
+    code_digest,
+    create_analysis_dataset,
+    hierarchy_errors,
+    load_badges,
+    load_citations,
+    merge_diagnostics,
+    posthoc_pairwise_tests,
+    repo_relative,
+    save_plots,
+    test_row,
+    two_group_interpretation,
+    unmatched_rows,
+)
+from results_store import ResultsStore
+
+
+DATASET_DIR = REPO_ROOT / "dataset"
+OUTPUT_DIR = REPO_ROOT / "outputs" / "cohorts"
+COHORT_COLUMNS = ["cohort", "venue", "year", "snapshot", "citation_window"]
+MANIFEST_COLUMNS = ["venue", "year", "snapshot", "citation_window", "citation_file", "badge_file"]
+BADGE_FILE_PATTERN = re.compile(r"^(?P<venue>[a-z][a-z-]*?)(?P<year>\d{4})_reproducibility\.csv$")
+SNAPSHOT_DIR_PATTERN = re.compile(r"^data-(?P<month>[a-z]{3})-(?P<year>\d{4})$")
+
+
+def cohort_label(venue, year, snapshot):
+    return f"{venue}{year}_{snapshot}"
+
+
+def discover_cohorts(dataset_dir=DATASET_DIR):
+    """Cohorts from the dataset layout, ordered by venue, year and snapshot date."""
+    dataset_dir = Path(dataset_dir)
+    cohorts = []
+    for badge_file in sorted(dataset_dir.glob("*_reproducibility.csv")):
+        match = BADGE_FILE_PATTERN.match(badge_file.name)
+        if not match:
+            continue
+        venue, year = match["venue"], int(match["year"])
+        for citation_file in dataset_dir.glob(f"data-*/{venue}{year}_citations.csv"):
+            snapshot_match = SNAPSHOT_DIR_PATTERN.match(citation_file.parent.name)
+            if not snapshot_match:
+                continue
+            snapshot_date = datetime.strptime(
+                f"{snapshot_match['month']}-{snapshot_match['year']}", "%b-%Y"
+            )
+            snapshot = f"{snapshot_match['month']}{snapshot_match['year']}"
+            cohorts.append(
+                {
+                    "cohort": cohort_label(venue, year, snapshot),
+                    "venue": venue,
+                    "year": year,
+                    "snapshot": snapshot,
+                    "citation_window": snapshot_date.strftime("%B %Y"),
+                    "snapshot_date": snapshot_date.strftime("%Y-%m-%d"),
+                    "citation_file": citation_file.resolve(),
+                    "badge_file": badge_file.resolve(),
+                }
+            )
+    return sorted(
+        cohorts, key=lambda cohort: (cohort["venue"], cohort["year"], cohort["snapshot_date"])
+    )
+
+
+def load_manifest(path):
+    """Cohorts listed in a CSV manifest, in file order.
+
+    The manifest has one row per cohort with the columns in MANIFEST_COLUMNS.
+    Relative file paths are resolved against the manifest's directory.
+    """
+    path = Path(path)
+    df = pd.read_csv(path, dtype=str)
+    missing = set(MANIFEST_COLUMNS) - set(df.columns)
+    if missing:
+        raise ValueError(f"{path} is missing columns: {sorted(missing)}")
+    if df[MANIFEST_COLUMNS].isna().any().any():
+        raise ValueError(f"{path} has empty values in columns: {MANIFEST_COLUMNS}")
+
+    base_dir = path.resolve().parent
+    cohorts = [
+        {
+            "cohort": cohort_label(row.venue, int(row.year), row.snapshot),
+            "venue": row.venue,
+            "year": int(row.year),
+            "snapshot": row.snapshot,
+            "citation_window": row.citation_window,
+            "citation_file": (base_dir / row.citation_file).resolve(),
+            "badge_file": (base_dir / row.badge_file).resolve(),
+        }
+        for row in df.itertuples(index=False)
+    ]
+    labels = pd.Series([cohort["cohort"] for cohort in cohorts])
+    duplicated = labels[labels.duplicated()].tolist()
+    if duplicated:
+        raise ValueError(f"Duplicate cohorts in {path}: {duplicated}")
+    return cohorts
+
+
+def load_cohorts(cohorts):
+    """Merge and validate every cohort.
+
+    Returns (analysis_df, cohort_df, unmatched_df, errors_df). analysis_df stacks
+    the analysis datasets of all valid cohorts with the COHORT_COLUMNS in front.
+    cohort_df has one row per cohort with its merge diagnostics and a status;
+    cohorts that fail validation are marked "invalid" with the error message
+    and left out of analysis_df instead of stopping the whole batch. Each badge
+    file is loaded once and shared by the snapshots of its venue and year.
+    """
+    badge_tables = {}
+    analysis_frames, unmatched_frames, error_frames, cohort_rows = [], [], [], []
+    for cohort in cohorts:
+        keys = {column: cohort[column] for column in COHORT_COLUMNS}
+        row = {
+            **keys,
+            "citation_file": repo_relative(cohort["citation_file"]),
+            "badge_file": repo_relative(cohort["badge_file"]),
+            "status": "analyzed",
+            "error": None,
+        }
+        cohort_rows.append(row)
+        try:
+            if cohort["badge_file"] not in badge_tables:
+                badge_tables[cohort["badge_file"]] = load_badges(cohort["badge_file"])
+            badges_df = badge_tables[cohort["badge_file"]]
+            citations_df = load_citations(cohort["citation_file"])
+            merged_df = build_outer_merge(citations_df, badges_df)
+            analysis_df = create_analysis_dataset(merged_df)
+        except (OSError, ValueError) as error:
+            row.update(status="invalid", error=str(error))
+            continue
+
+        row.update(merge_diagnostics(merged_df, citations_df, badges_df))
+        unmatched_frames.append(unmatched_rows(merged_df).assign(**keys))
+        errors = hierarchy_errors(analysis_df)
+        if not errors.empty:
+            error_frames.append(errors.assign(**keys))
+            row.update(status="invalid", error="Badge hierarchy validation failed")
+            continue
+        analysis_frames.append(analysis_df.assign(**keys))
+
+    def stacked(frames, columns):
+        if not frames:
+            return pd.DataFrame(columns=COHORT_COLUMNS + columns)
+        df = pd.concat(frames, ignore_index=True)
+        return df[COHORT_COLUMNS + [column for column in df.columns if column not in COHORT_COLUMNS]]
+
+    analysis_df = stacked(analysis_frames, [])
+    unmatched_df = stacked(unmatched_frames, [])
+    errors_df = stacked(error_frames, ["DOI", "CitationDOI", "BadgeDOI", "error"])
+    cohort_df = pd.DataFrame(cohort_rows)
+    count_columns = cohort_df.columns[cohort_df.columns.get_loc("error") + 1 :]
+    cohort_df[count_columns] = cohort_df[count_columns].astype("Int64")
+    return analysis_df, cohort_df, unmatched_df, errors_df
+
+
+def grouped_ranks(codes, values, n_groups):
+    """Average ranks of `values` within each group, as rankdata() per group.
+
+    `codes` are integer group codes in [0, n_groups). Returns the ranks and, per
+    group, the tie term sum(t**3 - t) over runs of t tied values. One lexsort
+    orders all groups at once.
+    """
+    codes = np.asarray(codes, dtype=np.int64)
+    values = np.asarray(values, dtype=float)
+    ranks = np.empty(len(values))
+    if not len(values):
+        return ranks, np.zeros(n_groups)
+
+    order = np.lexsort((values, codes))
+    sorted_codes = codes[order]
+    sorted_values = values[order]
+    positions = np.arange(len(values))
+    group_start = np.r_[True, sorted_codes[1:] != sorted_codes[:-1]]
+    run_start = group_start | np.r_[True, sorted_values[1:] != sorted_values[:-1]]
+    group_first = np.maximum.accumulate(np.where(group_start, positions, 0))
+    run_first = positions[run_start]
+    run_sizes = np.diff(np.r_[run_first, len(values)])
+    run_ranks = run_first - group_first[run_start] + (run_sizes + 1) / 2
+    ranks[order] = run_ranks[np.cumsum(run_start) - 1]
+    tie_terms = np.bincount(
+        sorted_codes[run_start],
+        weights=run_sizes.astype(float) ** 3 - run_sizes,
+        minlength=n_groups,
+    )
+    return ranks, tie_terms
+
+
+def grouped_spearman(codes, x_values, y_values, n_groups):
+    """Spearman rho and two-sided p-value per group, matching scipy.stats.spearmanr."""
+    x_ranks, _ = grouped_ranks(codes, x_values, n_groups)
+    y_ranks, _ = grouped_ranks(codes, y_values, n_groups)
+    n = np.bincount(codes, minlength=n_groups).astype(float)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        x_centered = x_ranks - (np.bincount(codes, x_ranks, n_groups) / n)[codes]
+        y_centered = y_ranks - (np.bincount(codes, y_ranks, n_groups) / n)[codes]
+        rho = np.bincount(codes, x_centered * y_centered, n_groups) / np.sqrt(
+            np.bincount(codes, x_centered**2, n_groups)
+            * np.bincount(codes, y_centered**2, n_groups)
+        )
+        rho = np.clip(rho, -1.0, 1.0)
+        dof = n - 2
+        t_statistic = rho * np.sqrt((dof / ((rho + 1.0) * (1.0 - rho))).clip(0))
+        p_value = 2 * student_t.sf(np.abs(t_statistic), np.where(dof > 0, dof, np.nan))
+    return rho, np.minimum(p_value, 1.0)
+
+
+def grouped_kruskal(codes, levels, values, n_groups):
+    """Kruskal-Wallis H and p-value per group across the badge levels.
+
+    Cohorts with an empty badge category get NaN, as scipy.stats.kruskal does,
+    and so do cohorts whose citation counts are all identical.
+    """
+    ranks, tie_terms = grouped_ranks(codes, values, n_groups)
+    n_levels = len(CATEGORY_ORDER)
+    cells = codes * n_levels + levels
+    sizes = np.bincount(cells, minlength=n_groups * n_levels).reshape(n_groups, n_levels)
+    rank_sums = np.bincount(cells, ranks, n_groups * n_levels).reshape(n_groups, n_levels)
+    n = sizes.sum(axis=1).astype(float)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        h_statistic = (
+            12 / (n * (n + 1)) * (rank_sums**2 / sizes).sum(axis=1) - 3 * (n + 1)
+        ) / (1 - tie_terms / (n**3 - n))
+    h_statistic[(sizes == 0).any(axis=1) | (tie_terms == n**3 - n)] = np.nan
+    return h_statistic, chi2.sf(h_statistic, n_levels - 1)
+
+
+def grouped_mann_whitney(codes, in_first, values, n_groups):
+    """Two-sided Mann-Whitney U of the first vs the second sample per group.
+
+    Matches scipy.stats.mannwhitneyu with method="auto": the normal
+    approximation with tie and continuity correction is evaluated for all
+    groups at once, and only groups small enough for the exact distribution
+    (a sample of at most 8 and no ties) are passed to scipy. Returns U of the
+    first sample, the p-value, Cliff's delta and the two sample sizes.
+    """
+    ranks, tie_terms = grouped_ranks(codes, values, n_groups)
+    n_1 = np.bincount(codes, in_first, n_groups)
+    n_2 = np.bincount(codes, minlength=n_groups) - n_1
+    u_statistic = np.bincount(codes, ranks * in_first, n_groups) - n_1 * (n_1 + 1) / 2
+    n = n_1 + n_2
+    with np.errstate(divide="ignore", invalid="ignore"):
+        u_max = np.maximum(u_statistic, n_1 * n_2 - u_statistic)
+        sigma = np.sqrt(n_1 * n_2 / 12 * ((n + 1) - tie_terms / (n * (n - 1))))
+        p_value = np.clip(2 * norm.sf((u_max - n_1 * n_2 / 2 - 0.5) / sigma), 0.0, 1.0)
+        delta = 2 * u_statistic / (n_1 * n_2) - 1
+
+    empty = (n_1 == 0) | (n_2 == 0)
+    u_statistic[empty] = np.nan
+    p_value[empty] = np.nan
+    exact = ~empty & ((n_1 <= 8) | (n_2 <= 8)) & (tie_terms == 0)
+    for group in np.flatnonzero(exact):
+        members = codes == group
+        p_value[group] = mannwhitneyu(
+            values[members & in_first], values[members & ~in_first], alternative="two-sided"
+        ).pvalue
+    return u_statistic, p_value, delta, n_1.astype(int), n_2.astype(int)
+
+
+def cohort_descriptive_statistics(analysis_df, cohort_df):
+    """descriptive_statistics() for every cohort from one grouped aggregation."""
+    keys = [
+        pd.Categorical(analysis_df["cohort"], categories=cohort_df["cohort"]),
+        pd.Categorical(analysis_df["BadgeCategory"], categories=CATEGORY_ORDER),
+    ]
+    grouped = analysis_df["Citations"].groupby(keys, observed=False)
+    stats_df = pd.DataFrame(
+        {
+            "n": grouped.count(),
+            "mean": grouped.mean(),
+            "median": grouped.median(),
+            "std": grouped.std(),
+            "min": grouped.min(),
+            "q25": grouped.quantile(0.25),
+            "q75": grouped.quantile(0.75),
+            "max": grouped.max(),
+        }
+    )
+    stats_df.insert(stats_df.columns.get_loc("max"), "IQR", stats_df["q75"] - stats_df["q25"])
+    stats_df.index.names = ["cohort", "BadgeCategory"]
+    stats_df = stats_df.reset_index()
+    stats_df["cohort"] = stats_df["cohort"].astype(str)
+    stats_df["BadgeCategory"] = stats_df["BadgeCategory"].astype(str)
+    return cohort_df.merge(stats_df, on="cohort")
+
+
+def test_frame(cohort_df, test, comparison, **columns):
+    """Rows of test_row() for every cohort at once; columns hold one value per cohort."""
+    frame = pd.DataFrame(test_row(test, comparison, **columns), index=cohort_df.index)
+    return pd.concat([cohort_df, frame], axis=1)
+
+
+def cohort_statistical_tests(analysis_df, cohort_df):
+    """statistical_tests() for every cohort in analysis_df.
+
+    Only the Kolmogorov-Smirnov test, and the post-hoc tests of cohorts whose
+    Kruskal-Wallis test is significant, are still run one cohort at a time.
+    """
+    n_cohorts = len(cohort_df)
+    codes = pd.Categorical(analysis_df["cohort"], categories=cohort_df["cohort"]).codes.astype(
+        np.int64
+    )
+    levels = analysis_df["BadgeLevel"].to_numpy(dtype=np.int64)
+    citations = analysis_df["Citations"].to_numpy(dtype=float)
+    n_total = np.bincount(codes, minlength=n_cohorts)
+    frames = []
+
+    rho, spearman_p = grouped_spearman(codes, levels, citations, n_cohorts)
+    frames.append(
+        test_frame(
+            cohort_df,
+            "Spearman rank correlation",
+            "Ordinal badge level vs citations",
+            statistic=rho,
+            p_value=spearman_p,
+            n_total=n_total,
+            interpretation=[association_interpretation(p) for p in spearman_p],
+            notes="Badge level is encoded as No badge=0, Available only=1, Functional only=2, Replicable=3.",
+        )
+    )
+
+    h_statistic, kruskal_p = grouped_kruskal(codes, levels, citations, n_cohorts)
+    frames.append(
+        test_frame(
+            cohort_df,
+            "Kruskal-Wallis H",
+            "Citations across mutually exclusive badge categories",
+            statistic=h_statistic,
+            p_value=kruskal_p,
+            n_total=n_total,
+            interpretation=[category_difference_interpretation(p) for p in kruskal_p],
+            notes="Omnibus non-parametric test across the four mutually exclusive badge categories.",
+        )
+    )
+
+    pair = np.isin(levels, [CATEGORY_LEVELS["Replicable"], CATEGORY_LEVELS["No badge"]])
+    pair_codes = codes[pair]
+    pair_citations = citations[pair]
+    is_replicable = levels[pair] == CATEGORY_LEVELS["Replicable"]
+    u_statistic, mann_whitney_p, delta, n_1, n_2 = grouped_mann_whitney(
+        pair_codes, is_replicable, pair_citations, n_cohorts
+    )
+    frames.append(
+        test_frame(
+            cohort_df,
+            "Mann-Whitney U",
+            "Replicable vs No badge",
+            statistic=u_statistic,
+            p_value=mann_whitney_p,
+            n_1=n_1,
+            n_2=n_2,
+            interpretation=[two_group_interpretation(p) for p in mann_whitney_p],
+            notes="Pre-specified conservative comparison between the highest badge level and no recorded badge.",
+        )
+    )
+    frames.append(
+        test_frame(
+            cohort_df,
+            "Cliff's delta",
+            "Replicable vs No badge",
+            effect_size=delta,
+            effect_size_name="Cliff's delta",
+            n_1=n_1,
+            n_2=n_2,
+            interpretation="Effect size only; positive values mean Replicable citation counts tend to be larger than No badge.",
+        )
+    )
+
+    ks_results = np.full((n_cohorts, 2), np.nan)
+    for cohort in np.flatnonzero((n_1 > 0) & (n_2 > 0)):
+        members = pair_codes == cohort
+        ks_results[cohort] = ks_2samp(
+            pair_citations[members & is_replicable], pair_citations[members & ~is_replicable]
+        )
+    frames.append(
+        test_frame(
+            cohort_df,
+            "Kolmogorov-Smirnov",
+            "Replicable vs No badge",
+            statistic=ks_results[:, 0],
+            p_value=ks_results[:, 1],
+            n_1=n_1,
+            n_2=n_2,
+            interpretation=[two_group_interpretation(p) for p in ks_results[:, 1]],
+            notes="Secondary/exploratory distributional check.",
+        )
+    )
+
+    significant = kruskal_p < ALPHA
+    frames.append(
+        test_frame(
+            cohort_df[~significant],
+            "Post-hoc pairwise tests",
+            "All badge categories",
+            status="skipped",
+            interpretation="Skipped because the Kruskal-Wallis omnibus test was not significant at alpha=0.05.",
+        )
+    )
+    for cohort in np.flatnonzero(significant):
+        posthoc_rows = posthoc_pairwise_tests(analysis_df[codes == cohort])
+        frames.append(
+            pd.DataFrame(
+                [{**cohort_df.iloc[cohort].to_dict(), **row} for row in posthoc_rows],
+                index=np.full(len(posthoc_rows), cohort_df.index[cohort]),
+            )
+        )
+
+    # Frames are in test order, so a stable sort on the cohort position keeps
+    # the per-cohort row order of statistical_tests().
+    tests_df = pd.concat([frame.astype(object) for frame in frames]).infer_objects()
+    return tests_df.sort_index(kind="stable").reset_index(drop=True)
+
+
+def save_cohort_plots(analysis_df, cohort_df, output_dir):
+    for cohort in cohort_df.itertuples(index=False):
+        cohort_output_dir = output_dir / cohort.cohort
+        cohort_output_dir.mkdir(parents=True, exist_ok=True)
+        save_plots(
+            analysis_df[analysis_df["cohort"] == cohort.cohort],
+            cohort_output_dir,
+            cohort.citation_window,
+            f"{cohort.venue.upper()} {cohort.year}",
+        )
+
+
+def analyze_cohorts(cohorts, output_dir=OUTPUT_DIR, plots=False, results_store=None, options=None):
+    """Run the test battery for all `cohorts` and write the pooled outputs.
+
+    With a `results_store` path, the merge diagnostics, descriptive statistics
+    and tests of every cohort are also recorded there as one run, with
+    `options` as its metadata.
+    """
+    output_dir.mkdir(parents=True, exist_ok=True)
+    analysis_df, cohort_df, unmatched_df, errors_df = load_cohorts(cohorts)
+    valid_cohort_df = cohort_df.loc[cohort_df["status"] == "analyzed", COHORT_COLUMNS]
+    valid_cohort_df = valid_cohort_df.reset_index(drop=True)
+    cohort_df["n_analyzed"] = (
+        cohort_df["cohort"].map(analysis_df["cohort"].value_counts()).fillna(0).astype(int)
+    )
+
+    cohort_df.to_csv(output_dir / "cohorts.csv", index=False)
+    unmatched_df.to_csv(output_dir / "unmatched_rows.csv", index=False)
+    errors_df.to_csv(output_dir / "badge_hierarchy_errors.csv", index=False)
+    analysis_df.to_csv(output_dir / "analysis_dataset.csv", index=False)
+
+    stats_df = cohort_descriptive_statistics(analysis_df, valid_cohort_df)
+    stats_df.to_csv(output_dir / "descriptive_statistics.csv", index=False)
+    tests_df = cohort_statistical_tests(analysis_df, valid_cohort_df)
+    tests_df.to_csv(output_dir / "statistical_tests.csv", index=False)
+    if plots:
+        save_cohort_plots(analysis_df, valid_cohort_df, output_dir)
+    if results_store is not None:
+        store = ResultsStore(results_store)
+        try:
+            with store.run("cohort_analysis", options, code_digest()) as run:
+                run.add_merge_diagnostics(cohort_df)
+                run.add_descriptive_statistics(stats_df)
+                run.add_statistical_tests(tests_df)
+        finally:
+            store.close()
+
+    key_tests = tests_df[
+        tests_df["test"].isin(["Spearman rank correlation", "Kruskal-Wallis H", "Mann-Whitney U"])
+    ]
+    summary = {
+        "cohorts": len(cohort_df),
+        "analyzed_cohorts": len(valid_cohort_df),
+        "invalid_cohorts": cohort_df.loc[
+            cohort_df["status"] == "invalid", ["cohort", "error"]
+        ].to_dict(orient="records"),
+        "papers_analyzed": len(analysis_df),
+        "cohorts_significant_at_alpha": {
+            test: int((group["p_value"] < ALPHA).sum())
+            for test, group in key_tests.groupby("test", sort=False)
+        },
+        "supported_claim": (
+            "For each cohort, the analysis evaluates whether a statistically detectable "
+            "association is observed between badge level and citation count in that "
+            "citation snapshot. P-values are not adjusted across cohorts, and the "
+            "analysis does not estimate a causal effect."
+        ),
+    }
+    with (output_dir / "summary.json").open("w", encoding="utf-8") as handle:
+        json.dump(clean_for_json(summary), handle, indent=2)
+    return cohort_df, tests_df, summary
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(
+        description="Analyze badge level against citations for every venue/year cohort."
+    )
+    parser.add_argument(
+        "--manifest",
+        type=Path,
+        help=(
+            "CSV listing the cohorts with columns "
+            f"{', '.join(MANIFEST_COLUMNS)} (default: discover them in --dataset-dir)."
+        ),
+    )
+    parser.add_argument(
+        "--dataset-dir",
+        type=Path,
+        default=DATASET_DIR,
+        help=f"Directory searched for cohorts without a manifest (default: {repo_relative(DATASET_DIR)}).",
+    )
+    parser.add_argument(
+        "--output-dir",
+        type=lambda value: (REPO_ROOT / value).resolve(),
+        default=OUTPUT_DIR,
+        help=f"Output directory (default: {repo_relative(OUTPUT_DIR)}).",
+    )
+    parser.add_argument(
+        "--plots",
+        action="store_true",
+        help="Also write the badge category plots of each cohort to <output-dir>/<cohort>/.",
+    )
+    parser.add_argument(
+        "--results-store",
+        nargs="?",
+        const=RESULTS_STORE_FILE,
+        type=Path,
+        metavar="PATH",
+        help=(
+            "Also record the results of every cohort in a SQLite results store "
+            f"(default file: {repo_relative(RESULTS_STORE_FILE)})."
+        ),
+    )
+    return parser.parse_args(argv)
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    if args.manifest:
+        cohorts = load_manifest(args.manifest)
+    else:
+        cohorts = discover_cohorts(args.dataset_dir)
+    if not cohorts:
+        raise ValueError("No cohorts found; pass --manifest or check --dataset-dir")
+
+    cohort_df, _, summary = analyze_cohorts(
+        cohorts, args.output_dir, args.plots, args.results_store, vars(args)
+    )
+    print(
+        f"Analyzed {summary['analyzed_cohorts']} of {summary['cohorts']} cohorts "
+        f"({summary['papers_analyzed']} papers)"
+    )
+    print(f"  Output: {repo_relative(args.output_dir)}")
+    print(f"  Cohorts with p < {ALPHA}: {summary['cohorts_significant_at_alpha']}")
+    for invalid in summary["invalid_cohorts"]:
+        print(f"  Skipped {invalid['cohort']}: {invalid['error']}")
+    if args.results_store:
+        print(f"  Results recorded in {repo_relative(args.results_store)}")
+    print()
+
+
+if __name__ == "__main__":
+    main()
@@ -1,26 +1,35 @@
+import argparse
+import hashlib
+import importlib.metadata
 import itertools
 import json
 import os
+import re
 import shutil
+import sys
 import tempfile
+import types
+from concurrent.futures import ProcessPoolExecutor
 from pathlib import Path
 
+import numpy as np
+import pandas as pd
+
+import instrumentation
+from citation_panel import CitationPanel
+from results_store import ResultsStore
+
+# SciPy, matplotlib and seaborn take several times longer to import than the
+# rest of the module together, so they are imported inside the statistics and
+# plotting functions that use them (see plotting_libraries()). The validate
+# command never loads them and stats never loads the plotting stack.
+
 
 REPO_ROOT = Path(__file__).resolve().parent
 os.environ.setdefault(
     "MPLCONFIGDIR", str(Path(tempfile.gettempdir()) / "reproducibility-impact-matplotlib")
 )
 
-import matplotlib
-
-matplotlib.use("Agg")
-
-import matplotlib.pyplot as plt
-import numpy as np
-import pandas as pd
-import seaborn as sns
-from scipy.stats import kruskal, ks_2samp, mannwhitneyu, spearmanr
-
 
 BADGE_FILE = REPO_ROOT / "dataset" / "sc2022_reproducibility.csv"
 SNAPSHOTS = [
@@ -64,35 +73,264 @@ CATEGORY_LEVELS = {
     "Functional only": 2,
     "Replicable": 3,
 }
+# analyze_snapshot() stages run by each command, in pipeline order. Every
+# command validates and merges the inputs first.
+COMMAND_STAGES = {
+    "validate": ["merge", "analysis_dataset"],
+    "stats": [
+        "merge",
+        "analysis_dataset",
+        "descriptive_statistics",
+        "statistical_tests",
+        "summary",
+    ],
+    "plots": ["merge", "analysis_dataset", "plots", "appendix_figures"],
+    "all": [
+        "merge",
+        "analysis_dataset",
+        "descriptive_statistics",
+        "statistical_tests",
+        "plots",
+        "appendix_figures",
+        "summary",
+    ],
+}
+BUILD_MANIFEST_DIR = REPO_ROOT / ".cache" / "analysis-build"
+CITATION_PANEL_DIR = REPO_ROOT / ".cache" / "citation-panel"
+RESULTS_STORE_FILE = REPO_ROOT / "outputs" / "results.sqlite"
 ALPHA = 0.05
-
-
+CONFIDENCE_LEVEL = 0.95
+BOOTSTRAP_CHUNK_VALUES = 2_000_000  # resampled values held in memory per chunk
+# Permutations are drawn in blocks with their own spawned seed, so a seeded run
+# gives the same p-values whatever the number of worker processes.
+PERMUTATION_BLOCK_SIZE = 10000
+PERMUTATION_BATCH_VALUES = 2_000_000  # permuted labels held in memory per batch
+DOI_PREFIXES = ("https://doi.org/", "http://dx.doi.org/", "doi:")
+# normalize_dois() works on the whole column joined with NUL, which is neither
+# whitespace nor a cased or case-ignorable character.
+DOI_SEPARATOR = "\x00"
+_DOI_PREFIX_PATTERN = "|".join(re.escape(prefix) for prefix in DOI_PREFIXES)
+_DOI_LEADING = re.compile(rf"\x00(?:\s+(?:{_DOI_PREFIX_PATTERN})?|{_DOI_PREFIX_PATTERN})")
+_DOI_TRAILING = re.compile(r"\x00(?:\s+/*|/+)")  # matched on the reversed text
+FIXED_WIDTH_SORT_BYTES = 1 << 30
+CITATION_CHUNK_ROWS = 500_000
+MAX_REPORTED_ERRORS = 20  # rows quoted in a citation validation error
+
+
+# Row-at-a-time reference for normalize_dois(); kept to check the vectorized
+# version against and for values it cannot join.
 def normalize_doi(value):
     doi = "" if pd.isna(value) else str(value)
     doi = doi.strip().lower()
-    for prefix in ("https://doi.org/", "http://dx.doi.org/", "doi:"):
+    for prefix in DOI_PREFIXES:
         if doi.startswith(prefix):
             doi = doi[len(prefix) :]
             break
     return doi.rstrip("/")
 
 
-def load_citations(path):
-    df = pd.read_csv(path)
-    required = {"DOI", "Citations"}
-    missing = required - set(df.columns)
+def normalize_dois(values):
+    """Vectorized normalize_doi() over a Series of raw DOI values.
+
+    The column is joined into one NUL-separated string and lowercased in one
+    call. Leading whitespace plus a DOI prefix, and trailing whitespace plus
+    slashes, are then removed from every entry by one regex pass each; the
+    trailing pass runs on the reversed text so that both patterns are anchored
+    on the separator. This equals normalize_doi() entry by entry:
+
+    - lower() only looks beyond a character for the final sigma rule, which
+      stops at characters that are neither cased nor case-ignorable, such as
+      NUL, so each entry is lowercased as on its own. Lowercasing neither
+      creates nor removes whitespace, so it commutes with strip().
+    - re's \\s matches exactly the characters of str.isspace().
+    - The prefixes contain no whitespace and start differently, so at most one
+      of them follows the leading whitespace, and stripping trailing
+      whitespace before or after removing it gives the same string. Removing
+      the trailing slashes after the trailing whitespace is rstrip("/") after
+      strip().
+
+    Values that contain NUL themselves fall back to normalize_doi().
+    """
+    if values.empty:
+        return values.astype(object)
+    dois = values.where(values.notna(), "") if values.hasnans else values
+    if pd.api.types.infer_dtype(dois, skipna=False) not in ("string", "empty"):
+        dois = dois.map(str)
+    text = DOI_SEPARATOR + DOI_SEPARATOR.join(dois) + DOI_SEPARATOR
+    if text.count(DOI_SEPARATOR) != len(dois) + 1:
+        return values.map(normalize_doi)
+    text = _DOI_LEADING.sub(DOI_SEPARATOR, text.lower())
+    text = _DOI_TRAILING.sub(DOI_SEPARATOR, text[::-1])[::-1]
+    return pd.Series(
+        text[1:-1].split(DOI_SEPARATOR), index=values.index, dtype=object, name=values.name
+    )
+
+
+def lexicographic_order(values):
+    """Stable argsort of strings in Python's str order.
+
+    Strings are sorted as a fixed-width unicode array when that copy fits in
+    FIXED_WIDTH_SORT_BYTES, which is several times faster than comparing
+    Python objects. The fixed-width type drops trailing NULs, so arrays where
+    that changes a length are sorted as objects.
+    """
+    values = np.asarray(values, dtype=object)
+    lengths = np.fromiter(map(len, values), dtype=np.int64, count=len(values))
+    width = max(int(lengths.max(initial=0)), 1)
+    if len(values) * width * 4 <= FIXED_WIDTH_SORT_BYTES:
+        fixed = values.astype(f"<U{width}")
+        if np.array_equal(np.char.str_len(fixed), lengths):
+            return np.argsort(fixed, kind="stable")
+    return np.argsort(values, kind="stable")
+
+
+class DOIIndex:
+    """Interned normalized DOIs with dense integer keys.
+
+    Keys are positions in `dois`, assigned in first-seen order, so DOI columns
+    keyed against one index can be matched, counted and ordered as integers
+    instead of hashing and comparing the strings again.
+    """
+
+    def __init__(self):
+        self.dois = pd.Index([], dtype=object)
+        self._ranks = None
+
+    def __len__(self):
+        return len(self.dois)
+
+    def keys(self, dois):
+        """Integer key of each DOI in `dois`, interning the ones not seen before."""
+        codes, uniques = pd.factorize(np.asarray(dois, dtype=object), use_na_sentinel=False)
+        unique_keys = self.dois.get_indexer(uniques)
+        new = unique_keys < 0
+        if new.any():
+            unique_keys[new] = np.arange(len(self.dois), len(self.dois) + new.sum())
+            self.dois = self.dois.append(pd.Index(uniques[new], dtype=object))
+            self._ranks = None
+        return unique_keys[codes]
+
+    def ranks(self):
+        """Position of every interned DOI in sorted DOI order, indexed by key."""
+        if self._ranks is None:
+            ranks = np.empty(len(self.dois), dtype=np.int64)
+            ranks[lexicographic_order(self.dois)] = np.arange(len(self.dois))
+            self._ranks = ranks
+        return self._ranks
+
+
+def stream_citations(path, chunk_size=CITATION_CHUNK_ROWS):
+    """Read and validate a citation CSV in chunks of `chunk_size` rows.
+
+    Returns (citations_df, errors_df). Only the DOI and Citations columns are
+    parsed, and each chunk is normalized, converted and checked on its own, so
+    peak memory is the compact result plus one chunk. Duplicate normalized
+    DOIs, also across chunks, are found through a running set of the DOIs seen
+    so far. Every non-numeric count and every repeated DOI is recorded in
+    errors_df (row, DOI, CitationDOI, raw Citations value, error, and the row
+    where a repeated DOI first appeared) instead of stopping at the first
+    problem. Rows are numbered from 1 after the header.
+    """
+    missing = {"DOI", "Citations"} - set(pd.read_csv(path, nrows=0).columns)
     if missing:
         raise ValueError(f"{path} is missing columns: {sorted(missing)}")
 
-    df = df[["DOI", "Citations"]].copy()
-    df["CitationDOI"] = df["DOI"]
-    df["DOI"] = df["DOI"].map(normalize_doi)
-    df["Citations"] = pd.to_numeric(df["Citations"], errors="coerce")
-    validate_no_duplicate_dois(df, path)
-    validate_numeric_citations(df, path)
+    seen = set()
+    frames, error_frames = [], []
+    reader = pd.read_csv(
+        path, usecols=["DOI", "Citations"], dtype={"DOI": object}, chunksize=chunk_size
+    )
+    for chunk in reader:
+        df = pd.DataFrame(
+            {
+                "DOI": normalize_dois(chunk["DOI"]),
+                "Citations": pd.to_numeric(chunk["Citations"], errors="coerce"),
+                "CitationDOI": chunk["DOI"],
+            }
+        )
+        repeated = np.zeros(len(df), dtype=bool)
+        for position, doi in enumerate(df["DOI"]):
+            if doi in seen:
+                repeated[position] = True
+            else:
+                seen.add(doi)
+        report = df.assign(row=chunk.index + 1, Citations=chunk["Citations"])
+        error_frames.append(
+            report[df["Citations"].isna()].assign(error="non-numeric citation count")
+        )
+        error_frames.append(
+            report[repeated].assign(error="duplicate DOI after normalization")
+        )
+        frames.append(compact_citations(df))
+
+    citations_df = (
+        pd.concat(frames) if frames else pd.DataFrame(columns=["DOI", "Citations", "CitationDOI"])
+    )
+    error_columns = ["row", "DOI", "CitationDOI", "Citations", "error", "first_row"]
+    errors_df = pd.concat(
+        [frame.astype(object) for frame in error_frames if not frame.empty]
+        or [pd.DataFrame(columns=error_columns)]
+    )
+    errors_df = errors_df.reindex(columns=error_columns).sort_values("row", kind="stable")
+    duplicates = errors_df["error"] == "duplicate DOI after normalization"
+    if duplicates.any():
+        # Only repeated DOIs are looked up again to report where they first appeared.
+        candidates = citations_df[citations_df["DOI"].isin(set(errors_df.loc[duplicates, "DOI"]))]
+        first_rows = candidates.drop_duplicates("DOI")
+        errors_df.loc[duplicates, "first_row"] = errors_df.loc[duplicates, "DOI"].map(
+            pd.Series(first_rows.index + 1, index=first_rows["DOI"])
+        )
+    errors_df["first_row"] = pd.to_numeric(errors_df["first_row"]).astype("Int64")
+    return citations_df, errors_df.reset_index(drop=True)
+
+
+def compact_citations(df):
+    """Store integer citation counts as int32 when they fit."""
+    citations = df["Citations"]
+    if (
+        pd.api.types.is_integer_dtype(citations)
+        and citations.between(np.iinfo(np.int32).min, np.iinfo(np.int32).max).all()
+    ):
+        df["Citations"] = citations.astype(np.int32)
     return df
 
 
+def load_citations(path, chunk_size=CITATION_CHUNK_ROWS):
+    citations_df, errors_df = stream_citations(path, chunk_size)
+    if not errors_df.empty:
+        raise ValueError(citation_error_summary(errors_df, path))
+    return citations_df
+
+
+def citation_error_summary(errors_df, label):
+    counts = errors_df["error"].value_counts()
+    problems = ", ".join(f"{count} {error}" for error, count in counts.items())
+    shown = errors_df.head(MAX_REPORTED_ERRORS).to_dict(orient="records")
+    more = len(errors_df) - len(shown)
+    return (
+        f"Invalid citation rows in {label} ({problems}): {shown}"
+        + (f" and {more} more" if more > 0 else "")
+    )
+
+
+def update_citation_panel(snapshots, directory=CITATION_PANEL_DIR):
+    """Add snapshots that are new or whose citation file changed to the panel store."""
+    panel = CitationPanel(directory)
+    for snapshot in snapshots:
+        digest = file_digest(snapshot["citation_file"])
+        if not panel.is_current(snapshot["label"], digest):
+            panel.add_snapshot(
+                snapshot["label"],
+                load_citations(snapshot["citation_file"]),
+                digest,
+                {
+                    "citation_window": snapshot["citation_window"],
+                    "citation_file": repo_relative(snapshot["citation_file"]),
+                },
+            )
+    return panel
+
+
 def load_badges(path):
     df = pd.read_csv(path)
     df = df.rename(columns={"aa": "Available", "af": "Functional", "ar": "Replicable"})
@@ -103,7 +341,7 @@ def load_badges(path):
 
     df = df[["DOI", *BADGE_COLUMNS]].copy()
     df["BadgeDOI"] = df["DOI"]
-    df["DOI"] = df["DOI"].map(normalize_doi)
+    df["DOI"] = normalize_dois(df["DOI"])
     for column in BADGE_COLUMNS:
         df[column] = pd.to_numeric(df[column], errors="coerce")
     validate_no_duplicate_dois(df, path)
@@ -112,21 +350,13 @@ def load_badges(path):
 
 
 def validate_no_duplicate_dois(df, label):
-    duplicated = df[df["DOI"].duplicated(keep=False)].sort_values("DOI")
-    if not duplicated.empty:
-        duplicate_values = duplicated["DOI"].tolist()
+    keys = DOIIndex().keys(df["DOI"])
+    duplicated = np.bincount(keys)[keys] > 1
+    if duplicated.any():
+        duplicate_values = df.loc[duplicated, "DOI"].sort_values().tolist()
         raise ValueError(f"Duplicate DOI values after normalization in {label}: {duplicate_values}")
 
 
-def validate_numeric_citations(df, label):
-    invalid = df[df["Citations"].isna()]
-    if not invalid.empty:
-        raise ValueError(
-            f"Non-numeric citation counts in {label}: "
-            f"{invalid[['DOI', 'CitationDOI', 'Citations']].to_dict(orient='records')}"
-        )
-
-
 def validate_binary_badges(df, label):
     for column in BADGE_COLUMNS:
         invalid = df[~df[column].isin([0, 1])]
@@ -138,29 +368,65 @@ def validate_binary_badges(df, label):
 
 
 def build_outer_merge(citations_df, badges_df):
-    return citations_df.merge(
-        badges_df,
-        on="DOI",
-        how="outer",
-        indicator=True,
-        suffixes=("_citation", "_badge"),
-    )
-
+    """Outer join on DOI with a `_merge` indicator, as DataFrame.merge(how="outer").
+
+    Both DOI columns are interned in one DOIIndex, so rows are matched by
+    integer key and ordered by DOI with a single lexicographic sort of the
+    distinct DOIs. Tables with duplicate DOIs use DataFrame.merge().
+    """
+    doi_index = DOIIndex()
+    keys = doi_index.keys(pd.concat([citations_df["DOI"], badges_df["DOI"]], ignore_index=True))
+    citation_keys, badge_keys = keys[: len(citations_df)], keys[len(citations_df) :]
+    if (np.bincount(citation_keys) > 1).any() or (np.bincount(badge_keys) > 1).any():
+        return citations_df.merge(
+            badges_df,
+            on="DOI",
+            how="outer",
+            indicator=True,
+            suffixes=("_citation", "_badge"),
+        )
 
-def save_merge_diagnostics(merged_df, citations_df, badges_df, output_dir):
-    diagnostics = pd.DataFrame(
+    order = np.argsort(doi_index.ranks())
+    citation_rows = np.full(len(doi_index), -1)
+    citation_rows[citation_keys] = np.arange(len(citations_df))
+    badge_rows = np.full(len(doi_index), -1)
+    badge_rows[badge_keys] = np.arange(len(badges_df))
+    citation_rows, badge_rows = citation_rows[order], badge_rows[order]
+
+    left = citations_df.drop(columns="DOI").reset_index(drop=True)
+    right = badges_df.drop(columns="DOI").reset_index(drop=True)
+    overlapping = left.columns.intersection(right.columns)
+    left = left.rename(columns={column: f"{column}_citation" for column in overlapping})
+    right = right.rename(columns={column: f"{column}_badge" for column in overlapping})
+    # Reindexing with -1 yields all-missing rows, upcasting dtypes like merge().
+    merged = pd.concat(
         [
-            {
-                "citation_rows": len(citations_df),
-                "badge_rows": len(badges_df),
-                "present_in_both": int((merged_df["_merge"] == "both").sum()),
-                "only_in_citations": int((merged_df["_merge"] == "left_only").sum()),
-                "only_in_badge_file": int((merged_df["_merge"] == "right_only").sum()),
-            }
-        ]
+            left.reindex(citation_rows).reset_index(drop=True),
+            right.reindex(badge_rows).reset_index(drop=True),
+        ],
+        axis=1,
     )
-    diagnostics.to_csv(output_dir / "merge_diagnostics.csv", index=False)
+    merged.insert(
+        citations_df.columns.get_loc("DOI"), "DOI", doi_index.dois.to_numpy()[order]
+    )
+    merged["_merge"] = pd.Categorical.from_codes(
+        np.select([badge_rows < 0, citation_rows < 0], [0, 1], default=2),
+        categories=["left_only", "right_only", "both"],
+    )
+    return merged
+
 
+def merge_diagnostics(merged_df, citations_df, badges_df):
+    return {
+        "citation_rows": len(citations_df),
+        "badge_rows": len(badges_df),
+        "present_in_both": int((merged_df["_merge"] == "both").sum()),
+        "only_in_citations": int((merged_df["_merge"] == "left_only").sum()),
+        "only_in_badge_file": int((merged_df["_merge"] == "right_only").sum()),
+    }
+
+
+def unmatched_rows(merged_df):
     unmatched = merged_df.loc[merged_df["_merge"] != "both"].copy()
     unmatched = unmatched.rename(columns={"_merge": "merge_status"})
     unmatched_columns = [
@@ -173,10 +439,13 @@ def save_merge_diagnostics(merged_df, citations_df, badges_df, output_dir):
         "Replicable",
         "merge_status",
     ]
-    unmatched.reindex(columns=unmatched_columns).to_csv(
-        output_dir / "unmatched_rows.csv", index=False
-    )
+    return unmatched.reindex(columns=unmatched_columns)
 
+
+def save_merge_diagnostics(merged_df, citations_df, badges_df, output_dir):
+    diagnostics = pd.DataFrame([merge_diagnostics(merged_df, citations_df, badges_df)])
+    diagnostics.to_csv(output_dir / "merge_diagnostics.csv", index=False)
+    unmatched_rows(merged_df).to_csv(output_dir / "unmatched_rows.csv", index=False)
     return diagnostics.iloc[0].to_dict()
 
 
@@ -191,7 +460,7 @@ def create_analysis_dataset(merged_df):
     for column in BADGE_COLUMNS:
         analysis_df[column] = analysis_df[column].astype(int)
 
-    analysis_df["BadgeCategory"] = analysis_df.apply(assign_badge_category, axis=1)
+    analysis_df["BadgeCategory"] = badge_categories(analysis_df)
     analysis_df["BadgeLevel"] = analysis_df["BadgeCategory"].map(CATEGORY_LEVELS)
 
     output_columns = [
@@ -205,12 +474,31 @@ def create_analysis_dataset(merged_df):
         "BadgeCategory",
         "BadgeLevel",
     ]
-    analysis_df = analysis_df[output_columns].sort_values("DOI").reset_index(drop=True)
+    analysis_df = analysis_df[output_columns]
+    # build_outer_merge() already orders rows by DOI.
+    if not analysis_df["DOI"].is_monotonic_increasing:
+        analysis_df = analysis_df.sort_values("DOI")
+    analysis_df = analysis_df.reset_index(drop=True)
     validate_no_duplicate_dois(analysis_df, "analysis dataset")
     validate_binary_badges(analysis_df, "analysis dataset")
     return analysis_df
 
 
+def badge_categories(df):
+    """Vectorized assign_badge_category over all rows of `df`."""
+    return pd.Series(
+        np.select(
+            [df["Replicable"] == 1, df["Functional"] == 1, df["Available"] == 1],
+            ["Replicable", "Functional only", "Available only"],
+            default="No badge",
+        ),
+        index=df.index,
+        dtype=object,
+    )
+
+
+# Row-at-a-time reference for badge_categories(); kept to check the vectorized
+# version against.
 def assign_badge_category(row):
     if row["Replicable"] == 1:
         return "Replicable"
@@ -222,32 +510,17 @@ def assign_badge_category(row):
 
 
 def hierarchy_errors(df):
-    rows = []
-    replicable_errors = df[
-        (df["Replicable"] == 1) & ((df["Functional"] != 1) | (df["Available"] != 1))
-    ]
-    functional_errors = df[(df["Functional"] == 1) & (df["Available"] != 1)]
+    identifier_columns = ["DOI", "CitationDOI", "BadgeDOI"]
+    replicable_errors = df.loc[
+        (df["Replicable"] == 1) & ((df["Functional"] != 1) | (df["Available"] != 1)),
+        identifier_columns,
+    ].assign(error="Replicable does not imply Functional and Available")
+    functional_errors = df.loc[
+        (df["Functional"] == 1) & (df["Available"] != 1), identifier_columns
+    ].assign(error="Functional does not imply Available")
 
-    for _, row in replicable_errors.iterrows():
-        rows.append(
-            {
-                "DOI": row["DOI"],
-                "CitationDOI": row["CitationDOI"],
-                "BadgeDOI": row["BadgeDOI"],
-                "error": "Replicable does not imply Functional and Available",
-            }
-        )
-    for _, row in functional_errors.iterrows():
-        rows.append(
-            {
-                "DOI": row["DOI"],
-                "CitationDOI": row["CitationDOI"],
-                "BadgeDOI": row["BadgeDOI"],
-                "error": "Functional does not imply Available",
-            }
-        )
-
-    return pd.DataFrame(rows, columns=["DOI", "CitationDOI", "BadgeDOI", "error"])
+    errors = pd.concat([replicable_errors, functional_errors], ignore_index=True)
+    return errors.astype(object)
 
 
 def save_hierarchy_diagnostics(analysis_df, output_dir):
@@ -261,47 +534,224 @@ def save_hierarchy_diagnostics(analysis_df, output_dir):
     return errors
 
 
-def descriptive_statistics(analysis_df):
+class GroupIndex:
+    """Citations of an analysis frame grouped by badge category, built once per snapshot.
+
+    One stable argsort of the category codes puts the rows in CATEGORY_ORDER,
+    so `values(category)` is a contiguous view of `citations` that keeps the
+    original row order within the category. The average ranks of all citations
+    (as rankdata() gives them, in the same grouped order) are computed on first
+    use and shared by the rank-based tests.
+    """
+
+    def __init__(self, analysis_df):
+        categories = pd.Categorical(analysis_df["BadgeCategory"], categories=CATEGORY_ORDER)
+        if (categories.codes < 0).any():
+            raise ValueError("BadgeCategory has values outside the badge categories")
+        # Category codes equal the BadgeLevel of each row.
+        self.codes = categories.codes.astype(np.int64)
+        self.order = np.argsort(self.codes, kind="stable")
+        self.sizes = np.bincount(self.codes, minlength=len(CATEGORY_ORDER))
+        self.bounds = np.concatenate([[0], np.cumsum(self.sizes)])
+        self.citations = analysis_df["Citations"].to_numpy()[self.order]
+        self.n_total = len(self.order)
+        self._ranks = None
+
+    def values(self, category):
+        position = CATEGORY_ORDER.index(category)
+        return self.citations[self.bounds[position] : self.bounds[position + 1]]
+
+    def ranks(self):
+        """(ranks, tie_counts): average ranks of `citations` and the size of each
+        run of tied citation values, in increasing value order."""
+        if self._ranks is None:
+            from scipy.stats import rankdata
+
+            values = self.citations.astype(float)
+            _, tie_counts = np.unique(values, return_counts=True)
+            self._ranks = (rankdata(values), tie_counts)
+        return self._ranks
+
+    def row_ranks(self):
+        """Average ranks of the citations in the row order of the analysis frame."""
+        ranks, _ = self.ranks()
+        row_ranks = np.empty_like(ranks)
+        row_ranks[self.order] = ranks
+        return row_ranks
+
+
+def descriptive_statistics(analysis_df, bootstrap_resamples=0, seed=None, groups=None):
+    if groups is None:
+        groups = GroupIndex(analysis_df)
     rows = []
-    for category in CATEGORY_ORDER:
-        values = analysis_df.loc[analysis_df["BadgeCategory"] == category, "Citations"]
-        if values.empty:
+    category_seeds = np.random.SeedSequence(seed).spawn(len(CATEGORY_ORDER))
+    for category, category_seed in zip(CATEGORY_ORDER, category_seeds):
+        values = groups.values(category)
+        if not len(values):
             rows.append({"BadgeCategory": category, "n": 0})
             continue
-        q25 = values.quantile(0.25)
-        q75 = values.quantile(0.75)
+        # Linear interpolation, as Series.quantile().
+        q25, q75 = np.percentile(values, [25, 75])
         rows.append(
             {
                 "BadgeCategory": category,
-                "n": int(values.count()),
+                "n": len(values),
                 "mean": values.mean(),
-                "median": values.median(),
-                "std": values.std(),
+                "median": np.median(values),
+                "std": values.std(ddof=1) if len(values) > 1 else np.nan,
                 "min": values.min(),
                 "q25": q25,
                 "q75": q75,
                 "IQR": q75 - q25,
                 "max": values.max(),
+                **descriptive_bootstrap_columns(
+                    values.astype(float), bootstrap_resamples, category_seed
+                ),
             }
         )
     return pd.DataFrame(rows)
 
 
+BOOTSTRAP_STATISTICS = ["mean", "median", "std", "q25", "q75", "IQR"]
+
+
+def bootstrap_descriptive_statistics(
+    values, n_resamples, seed=None, chunk_values=BOOTSTRAP_CHUNK_VALUES
+):
+    """Bootstrap distributions of the BOOTSTRAP_STATISTICS of `values`.
+
+    Each chunk draws an index matrix of as many resamples as fit in
+    `chunk_values` resampled values, sorts the resampled rows once and reads
+    every statistic from the sorted matrix, using the same linear quantile
+    interpolation as pandas. Memory is bounded by chunk_values, whatever n.
+    """
+    rng = np.random.default_rng(seed)
+    n_values = len(values)
+    lower_position = 0.25 * (n_values - 1)
+    upper_position = 0.75 * (n_values - 1)
+    middle_position = 0.5 * (n_values - 1)
+    distributions = {name: np.empty(n_resamples) for name in BOOTSTRAP_STATISTICS}
+
+    def sorted_quantile(sorted_rows, position):
+        below = int(np.floor(position))
+        above = min(below + 1, n_values - 1)
+        fraction = position - below
+        return sorted_rows[:, below] + fraction * (sorted_rows[:, above] - sorted_rows[:, below])
+
+    chunk_rows = max(1, chunk_values // max(n_values, 1))
+    for start in range(0, n_resamples, chunk_rows):
+        size = min(chunk_rows, n_resamples - start)
+        resampled = np.sort(values[rng.integers(0, n_values, size=(size, n_values))], axis=1)
+        chunk = slice(start, start + size)
+        q25 = sorted_quantile(resampled, lower_position)
+        q75 = sorted_quantile(resampled, upper_position)
+        distributions["mean"][chunk] = resampled.mean(axis=1)
+        distributions["median"][chunk] = sorted_quantile(resampled, middle_position)
+        distributions["std"][chunk] = (
+            resampled.std(axis=1, ddof=1) if n_values > 1 else np.nan
+        )
+        distributions["q25"][chunk] = q25
+        distributions["q75"][chunk] = q75
+        distributions["IQR"][chunk] = q75 - q25
+    return distributions
+
+
+def descriptive_bootstrap_columns(values, bootstrap_resamples, seed):
+    if bootstrap_resamples <= 0:
+        return {}
+    distributions = bootstrap_descriptive_statistics(values, bootstrap_resamples, seed)
+    tail = (1 - CONFIDENCE_LEVEL) / 2 * 100
+    columns = {}
+    for name in BOOTSTRAP_STATISTICS:
+        if np.isnan(distributions[name]).all():
+            lower = upper = np.nan
+        else:
+            lower, upper = np.percentile(distributions[name], [tail, 100 - tail])
+        columns[f"{name}_ci_lower"] = lower
+        columns[f"{name}_ci_upper"] = upper
+    columns["bootstrap_resamples"] = bootstrap_resamples
+    return columns
+
+
 def cliffs_delta(x_values, y_values):
-    greater = 0
-    lesser = 0
-    for x in x_values:
-        for y in y_values:
-            if x > y:
-                greater += 1
-            elif x < y:
-                lesser += 1
-    total = len(x_values) * len(y_values)
+    x_array = np.asarray(x_values, dtype=float)
+    y_sorted = np.sort(np.asarray(y_values, dtype=float))
+    total = len(x_array) * len(y_sorted)
     if total == 0:
         return None
+    # For each x, searchsorted counts the y values strictly below and strictly
+    # above it, which replaces the pairwise comparison loop with O((n+m) log m).
+    greater = int(np.searchsorted(y_sorted, x_array, side="left").sum())
+    lesser = int((len(y_sorted) - np.searchsorted(y_sorted, x_array, side="right")).sum())
     return (greater - lesser) / total
 
 
+def cliffs_delta_bootstrap_ci(
+    x_values,
+    y_values,
+    n_resamples,
+    seed=None,
+    confidence=CONFIDENCE_LEVEL,
+    chunk_values=BOOTSTRAP_CHUNK_VALUES,
+):
+    """Percentile bootstrap confidence interval for Cliff's delta.
+
+    Both groups are resampled with replacement, in chunks of as many resamples
+    as fit in `chunk_values` resampled values, so memory stays bounded whatever
+    the group sizes. Within a chunk, delta is counted as in cliffs_delta(): the
+    resampled second group is sorted and searchsorted gives, for each value of
+    the first group, the values strictly below and above it.
+    """
+    x_array = np.asarray(x_values, dtype=float)
+    y_array = np.asarray(y_values, dtype=float)
+    n_x, n_y = len(x_array), len(y_array)
+    if n_resamples <= 0 or n_x == 0 or n_y == 0:
+        return None, None
+
+    # Values are replaced by their code among the pooled distinct values, and
+    # resample row r is shifted by r * n_codes. The sorted rows of a chunk then
+    # form one sorted array, and a single searchsorted serves the whole chunk.
+    pooled = np.unique(np.concatenate([x_array, y_array]))
+    x_codes = np.searchsorted(pooled, x_array)
+    y_codes = np.searchsorted(pooled, y_array)
+    n_codes = len(pooled)
+    chunk_rows = max(1, chunk_values // (n_x + n_y))
+
+    rng = np.random.default_rng(seed)
+    deltas = np.empty(n_resamples)
+    for start in range(0, n_resamples, chunk_rows):
+        size = min(chunk_rows, n_resamples - start)
+        shift = np.arange(size)[:, np.newaxis] * n_codes
+        # Sorted queries make searchsorted walk the array in order.
+        x_rows = np.sort(x_codes[rng.integers(0, n_x, size=(size, n_x))], axis=1) + shift
+        y_sorted = np.sort(y_codes[rng.integers(0, n_y, size=(size, n_y))], axis=1) + shift
+        y_sorted = y_sorted.ravel()
+        row_start = np.arange(size)[:, np.newaxis] * n_y
+        greater = (np.searchsorted(y_sorted, x_rows, side="left") - row_start).sum(axis=1)
+        lesser = (row_start + n_y - np.searchsorted(y_sorted, x_rows, side="right")).sum(axis=1)
+        deltas[start : start + size] = (greater - lesser) / (n_x * n_y)
+
+    tail = (1 - confidence) / 2 * 100
+    lower, upper = np.percentile(deltas, [tail, 100 - tail])
+    return float(lower), float(upper)
+
+
+def effect_size_ci_columns(x_values, y_values, bootstrap_resamples, seed):
+    if bootstrap_resamples <= 0:
+        return {}
+    ci_lower, ci_upper = cliffs_delta_bootstrap_ci(
+        x_values, y_values, bootstrap_resamples, seed=seed
+    )
+    return {
+        "effect_size_ci_lower": ci_lower,
+        "effect_size_ci_upper": ci_upper,
+        "effect_size_ci_method": (
+            f"{CONFIDENCE_LEVEL:.0%} percentile bootstrap of Cliff's delta, "
+            f"{bootstrap_resamples} resamples"
+        ),
+    }
+
+
 def test_row(
     test,
     comparison,
@@ -316,7 +766,10 @@ def test_row(
     status="computed",
     interpretation=None,
     notes=None,
+    **extra_columns,
 ):
+    # Optional analyses (e.g. bootstrap intervals) pass extra columns; they only
+    # appear in statistical_tests.csv when at least one row provides them.
     return {
         "test": test,
         "comparison": comparison,
@@ -331,49 +784,268 @@ def test_row(
         "status": status,
         "interpretation": interpretation,
         "notes": notes,
+        **extra_columns,
+    }
+
+
+def permutation_context(analysis_df, groups=None):
+    """Precompute the ranked data shared by every batch of permutations.
+
+    Citations are ranked once (average ranks for ties), or taken from `groups`.
+    Permuting BadgeLevel then only moves labels, so Spearman reduces to a dot
+    product with the fixed citation ranks, Kruskal-Wallis to per-group rank
+    sums, and Mann-Whitney to the rank sum of Replicable within the pooled
+    Replicable/No badge ranks.
+    """
+    from scipy.stats import rankdata
+
+    if groups is None:
+        groups = GroupIndex(analysis_df)
+    citations = analysis_df["Citations"].to_numpy(dtype=float)
+    levels = groups.codes
+    citation_ranks = groups.row_ranks()
+    _, tie_counts = groups.ranks()
+    level_ranks = rankdata(levels)
+    n_total = len(levels)
+    group_sizes = groups.sizes
+
+    pair_mask = np.isin(levels, [CATEGORY_LEVELS["Replicable"], CATEGORY_LEVELS["No badge"]])
+    pair_is_replicable = levels[pair_mask] == CATEGORY_LEVELS["Replicable"]
+    return {
+        "n_total": n_total,
+        "levels": levels,
+        "citation_ranks": citation_ranks,
+        # Ranks of the permuted levels, looked up by level code.
+        "level_rank_lookup": np.array(
+            [
+                level_ranks[levels == level][0] if group_sizes[level] else 0.0
+                for level in range(len(CATEGORY_ORDER))
+            ]
+        ),
+        "level_rank_mean": level_ranks.mean(),
+        "level_rank_std": level_ranks.std(),
+        "citation_rank_mean": citation_ranks.mean(),
+        "citation_rank_std": citation_ranks.std(),
+        "group_sizes": group_sizes,
+        "kruskal_tie_correction": 1 - (tie_counts**3 - tie_counts).sum() / (n_total**3 - n_total),
+        "pair_ranks": rankdata(citations[pair_mask]),
+        "pair_is_replicable": pair_is_replicable,
+        "pair_first_size": int(pair_is_replicable.sum()),
+    }
+
+
+def permutation_statistics(context, permuted_levels, permuted_pair):
+    """Spearman rho, Kruskal-Wallis H and centred Mann-Whitney U per permutation row."""
+    n_total = context["n_total"]
+    level_ranks = context["level_rank_lookup"][permuted_levels]
+    rho = (
+        level_ranks @ context["citation_ranks"]
+        - n_total * context["level_rank_mean"] * context["citation_rank_mean"]
+    ) / (n_total * context["level_rank_std"] * context["citation_rank_std"])
+
+    rank_square_sum = np.zeros(len(permuted_levels))
+    for level, size in enumerate(context["group_sizes"]):
+        if size:
+            group_rank_sum = (permuted_levels == level) @ context["citation_ranks"]
+            rank_square_sum += group_rank_sum**2 / size
+    h_statistic = (
+        12 / (n_total * (n_total + 1)) * rank_square_sum - 3 * (n_total + 1)
+    ) / context["kruskal_tie_correction"]
+
+    first_size = context["pair_first_size"]
+    second_size = len(context["pair_ranks"]) - first_size
+    u_statistic = permuted_pair @ context["pair_ranks"] - first_size * (first_size + 1) / 2
+    u_distance = np.abs(u_statistic - first_size * second_size / 2)
+    return np.abs(rho), h_statistic, u_distance
+
+
+def permutation_block_counts(context, observed, n_permutations, seed_sequence):
+    """Count permutations at least as extreme as `observed` within one seeded block."""
+    rng = np.random.default_rng(seed_sequence)
+    batch_size = max(1, PERMUTATION_BATCH_VALUES // max(context["n_total"], 1))
+    counts = np.zeros(3, dtype=np.int64)
+    for start in range(0, n_permutations, batch_size):
+        size = min(batch_size, n_permutations - start)
+        permuted_levels = rng.permuted(np.tile(context["levels"], (size, 1)), axis=1)
+        permuted_pair = rng.permuted(
+            np.tile(context["pair_is_replicable"], (size, 1)), axis=1
+        ).astype(float)
+        for index, statistics in enumerate(
+            permutation_statistics(context, permuted_levels, permuted_pair)
+        ):
+            # Relative tolerance so ties with the observed statistic are counted
+            # despite floating-point noise.
+            tolerance = 1e-9 * max(1.0, abs(observed[index]))
+            counts[index] += int((statistics >= observed[index] - tolerance).sum())
+    return counts
+
+
+_PERMUTATION_CONTEXT = None
+
+
+def _init_permutation_worker(context, observed):
+    global _PERMUTATION_CONTEXT
+    _PERMUTATION_CONTEXT = (context, observed)
+
+
+def _permutation_block_in_worker(block):
+    context, observed = _PERMUTATION_CONTEXT
+    return permutation_block_counts(context, observed, *block)
+
+
+def permutation_p_values(analysis_df, n_permutations, seed=None, jobs=1, groups=None):
+    """Monte Carlo permutation p-values for the Spearman, Kruskal-Wallis and
+    Replicable vs No badge Mann-Whitney tests.
+
+    BadgeLevel labels are permuted across papers for Spearman and
+    Kruskal-Wallis, and Replicable/No badge membership is permuted within the
+    pooled pair for Mann-Whitney. All three statistics are computed on the
+    ranked citations for whole batches of permutations at once, and blocks of
+    permutations can be spread over `jobs` processes. P-values use the
+    (count + 1) / (n + 1) estimator and are two-sided for Spearman and
+    Mann-Whitney.
+    """
+    context = permutation_context(analysis_df, groups)
+    identity_pair = context["pair_is_replicable"][np.newaxis, :].astype(float)
+    observed = [
+        float(statistic[0])
+        for statistic in permutation_statistics(
+            context, context["levels"][np.newaxis, :], identity_pair
+        )
+    ]
+
+    block_sizes = [
+        min(PERMUTATION_BLOCK_SIZE, n_permutations - start)
+        for start in range(0, n_permutations, PERMUTATION_BLOCK_SIZE)
+    ]
+    blocks = list(zip(block_sizes, np.random.SeedSequence(seed).spawn(len(block_sizes))))
+    if jobs <= 1 or len(blocks) <= 1:
+        block_counts = [
+            permutation_block_counts(context, observed, *block) for block in blocks
+        ]
+    else:
+        with ProcessPoolExecutor(
+            max_workers=min(jobs, len(blocks)),
+            initializer=_init_permutation_worker,
+            initargs=(context, observed),
+        ) as executor:
+            block_counts = list(executor.map(_permutation_block_in_worker, blocks))
+
+    counts = np.sum(block_counts, axis=0)
+    p_values = (counts + 1) / (n_permutations + 1)
+    return {
+        "Spearman rank correlation": float(p_values[0]),
+        "Kruskal-Wallis H": float(p_values[1]),
+        "Mann-Whitney U": float(p_values[2]),
+    }
+
+
+def permutation_columns(permutation_results, test, n_permutations):
+    if not permutation_results:
+        return {}
+    return {
+        "permutation_p_value": permutation_results[test],
+        "permutations": n_permutations,
     }
 
 
-def statistical_tests(analysis_df):
+def rank_spearman(groups):
+    """Spearman rho of badge level vs citations and its two-sided p-value.
+
+    Computed as scipy.stats.spearmanr does, from the shared citation ranks of
+    `groups`. Rows are in level order, so each level's rank is the mean
+    position of its category. Constant input gives NaN.
+    """
+    from scipy.stats import t as student_t
+
+    ranks, tie_counts = groups.ranks()
+    if (groups.sizes > 0).sum() < 2 or len(tie_counts) < 2:
+        return np.nan, np.nan
+    level_ranks = np.repeat(groups.bounds[:-1] + (groups.sizes + 1) / 2, groups.sizes)
+    rho = np.corrcoef(level_ranks, ranks)[1, 0]
+    dof = groups.n_total - 2
+    with np.errstate(divide="ignore"):
+        t_statistic = rho * np.sqrt((dof / ((rho + 1.0) * (1.0 - rho))).clip(0))
+    return rho, 2 * student_t.sf(abs(t_statistic), dof)
+
+
+def rank_kruskal(groups):
+    """Kruskal-Wallis H across the badge categories and its p-value.
+
+    Computed as scipy.stats.kruskal does, from the shared citation ranks of
+    `groups`, whose categories are contiguous. An empty category gives NaN.
+    """
+    from scipy.stats import chi2
+
+    if (groups.sizes == 0).any():
+        return np.nan, np.nan
+    ranks, tie_counts = groups.ranks()
+    n_total = groups.n_total
+    tie_counts = tie_counts.astype(float)
+    ties = 1 - np.sum(tie_counts**3 - tie_counts) / (n_total**3 - n_total)
+    rank_square_sum = sum(
+        np.sum(ranks[start:end]) ** 2 / int(size)
+        for start, end, size in zip(groups.bounds[:-1], groups.bounds[1:], groups.sizes)
+    )
+    with np.errstate(divide="ignore", invalid="ignore"):
+        h_statistic = (
+            12.0 / (n_total * (n_total + 1)) * rank_square_sum - 3 * (n_total + 1)
+        ) / ties
+    return h_statistic, chi2.sf(h_statistic, len(CATEGORY_ORDER) - 1)
+
+
+def statistical_tests(
+    analysis_df,
+    bootstrap_resamples=0,
+    seed=None,
+    permutations=0,
+    permutation_jobs=1,
+    groups=None,
+):
+    if groups is None:
+        groups = GroupIndex(analysis_df)
     rows = []
     n_total = len(analysis_df)
+    permutation_results = None
+    if permutations > 0:
+        permutation_results = permutation_p_values(
+            analysis_df, permutations, seed, permutation_jobs, groups
+        )
+
+    from scipy.stats import ks_2samp, mannwhitneyu
 
-    spearman_result = spearmanr(analysis_df["BadgeLevel"], analysis_df["Citations"])
+    spearman_rho, spearman_p = rank_spearman(groups)
     rows.append(
         test_row(
             "Spearman rank correlation",
             "Ordinal badge level vs citations",
-            statistic=spearman_result.statistic,
-            p_value=spearman_result.pvalue,
+            statistic=spearman_rho,
+            p_value=spearman_p,
             n_total=n_total,
-            interpretation=association_interpretation(spearman_result.pvalue),
+            interpretation=association_interpretation(spearman_p),
             notes="Badge level is encoded as No badge=0, Available only=1, Functional only=2, Replicable=3.",
+            **permutation_columns(
+                permutation_results, "Spearman rank correlation", permutations
+            ),
         )
     )
 
-    grouped = [
-        analysis_df.loc[analysis_df["BadgeCategory"] == category, "Citations"]
-        for category in CATEGORY_ORDER
-    ]
-    kruskal_result = kruskal(*grouped)
+    kruskal_h, kruskal_p = rank_kruskal(groups)
     rows.append(
         test_row(
             "Kruskal-Wallis H",
             "Citations across mutually exclusive badge categories",
-            statistic=kruskal_result.statistic,
-            p_value=kruskal_result.pvalue,
+            statistic=kruskal_h,
+            p_value=kruskal_p,
             n_total=n_total,
-            interpretation=category_difference_interpretation(kruskal_result.pvalue),
+            interpretation=category_difference_interpretation(kruskal_p),
             notes="Omnibus non-parametric test across the four mutually exclusive badge categories.",
+            **permutation_columns(permutation_results, "Kruskal-Wallis H", permutations),
         )
     )
 
-    replicable = analysis_df.loc[
-        analysis_df["BadgeCategory"] == "Replicable", "Citations"
-    ].tolist()
-    no_badge = analysis_df.loc[
-        analysis_df["BadgeCategory"] == "No badge", "Citations"
-    ].tolist()
+    replicable = groups.values("Replicable")
+    no_badge = groups.values("No badge")
 
     mann_whitney = mannwhitneyu(replicable, no_badge, alternative="two-sided")
     rows.append(
@@ -386,10 +1058,14 @@ def statistical_tests(analysis_df):
             n_2=len(no_badge),
             interpretation=two_group_interpretation(mann_whitney.pvalue),
             notes="Pre-specified conservative comparison between the highest badge level and no recorded badge.",
+            **permutation_columns(permutation_results, "Mann-Whitney U", permutations),
         )
     )
 
     delta = cliffs_delta(replicable, no_badge)
+    bootstrap_columns = effect_size_ci_columns(
+        replicable, no_badge, bootstrap_resamples, seed
+    )
     rows.append(
         test_row(
             "Cliff's delta",
@@ -399,6 +1075,7 @@ def statistical_tests(analysis_df):
             n_1=len(replicable),
             n_2=len(no_badge),
             interpretation="Effect size only; positive values mean Replicable citation counts tend to be larger than No badge.",
+            **bootstrap_columns,
         )
     )
 
@@ -416,8 +1093,8 @@ def statistical_tests(analysis_df):
         )
     )
 
-    if kruskal_result.pvalue < ALPHA:
-        rows.extend(posthoc_pairwise_tests(analysis_df))
+    if kruskal_p < ALPHA:
+        rows.extend(posthoc_pairwise_tests(analysis_df, bootstrap_resamples, seed, groups))
     else:
         rows.append(
             test_row(
@@ -449,23 +1126,26 @@ def two_group_interpretation(p_value):
     return "No statistically detectable difference between the two groups at alpha=0.05."
 
 
-def posthoc_pairwise_tests(analysis_df):
+def posthoc_pairwise_tests(analysis_df, bootstrap_resamples=0, seed=None, groups=None):
+    from scipy.stats import mannwhitneyu
+
+    if groups is None:
+        groups = GroupIndex(analysis_df)
     rows = []
     pairs = list(itertools.combinations(CATEGORY_ORDER, 2))
     raw_results = []
     for first, second in pairs:
-        first_values = analysis_df.loc[
-            analysis_df["BadgeCategory"] == first, "Citations"
-        ].tolist()
-        second_values = analysis_df.loc[
-            analysis_df["BadgeCategory"] == second, "Citations"
-        ].tolist()
+        first_values = groups.values(first)
+        second_values = groups.values(second)
         result = mannwhitneyu(first_values, second_values, alternative="two-sided")
         raw_results.append((first, second, first_values, second_values, result))
 
     correction_factor = len(raw_results)
     for first, second, first_values, second_values, result in raw_results:
         adjusted_p = min(result.pvalue * correction_factor, 1.0)
+        bootstrap_columns = effect_size_ci_columns(
+            first_values, second_values, bootstrap_resamples, seed
+        )
         rows.append(
             test_row(
                 "Post-hoc Mann-Whitney U",
@@ -473,38 +1153,68 @@ def posthoc_pairwise_tests(analysis_df):
                 statistic=result.statistic,
                 p_value=result.pvalue,
                 adjusted_p_value=adjusted_p,
+                effect_size=cliffs_delta(first_values, second_values),
+                effect_size_name="Cliff's delta",
                 n_1=len(first_values),
                 n_2=len(second_values),
                 interpretation=two_group_interpretation(adjusted_p),
                 notes="Bonferroni-adjusted post-hoc test run because the Kruskal-Wallis omnibus test was significant.",
+                **bootstrap_columns,
             )
         )
     return rows
 
 
-def save_plots(analysis_df, output_dir, citation_window):
+def plotting_libraries():
+    """Import matplotlib with the Agg backend and seaborn; return (pyplot, seaborn)."""
+    import matplotlib
+
+    matplotlib.use("Agg")
+    import matplotlib.pyplot as plt
+    import seaborn as sns
+
+    return plt, sns
+
+
+def save_plots(analysis_df, output_dir, citation_window, cohort_name="SC 2022", groups=None):
+    if groups is None:
+        groups = GroupIndex(analysis_df)
+    _, sns = plotting_libraries()
     sns.set_theme(style="whitegrid")
-    plot_df = analysis_df.copy()
-    plot_df["BadgeCategory"] = pd.Categorical(
-        plot_df["BadgeCategory"], categories=CATEGORY_ORDER, ordered=True
+    # Only the plotted columns, built from the grouped citations instead of a
+    # copy of the whole analysis frame.
+    plot_df = pd.DataFrame(
+        {
+            "BadgeCategory": pd.Categorical.from_codes(
+                np.repeat(np.arange(len(CATEGORY_ORDER)), groups.sizes),
+                categories=CATEGORY_ORDER,
+                ordered=True,
+            ),
+            "Citations": groups.citations,
+            "LogCitations": np.log1p(groups.citations),
+        }
     )
-    plot_df["LogCitations"] = np.log1p(plot_df["Citations"])
 
-    save_boxplot(
-        plot_df,
-        output_dir / "citations_by_badge_category.png",
-        "Citations",
-        f"SC 2022 citations by badge category ({citation_window})",
-        "Citation count",
-    )
-    save_boxplot(
-        plot_df,
-        output_dir / "log_citations_by_badge_category.png",
-        "LogCitations",
-        f"SC 2022 log citations by badge category ({citation_window})",
-        "log(1 + citation count)",
-    )
-    save_count_plot(plot_df, output_dir / "badge_category_counts.png", citation_window)
+    with instrumentation.stage("citations_by_badge_category.png"):
+        save_boxplot(
+            plot_df,
+            output_dir / "citations_by_badge_category.png",
+            "Citations",
+            f"{cohort_name} citations by badge category ({citation_window})",
+            "Citation count",
+        )
+    with instrumentation.stage("log_citations_by_badge_category.png"):
+        save_boxplot(
+            plot_df,
+            output_dir / "log_citations_by_badge_category.png",
+            "LogCitations",
+            f"{cohort_name} log citations by badge category ({citation_window})",
+            "log(1 + citation count)",
+        )
+    with instrumentation.stage("badge_category_counts.png"):
+        save_count_plot(
+            plot_df, output_dir / "badge_category_counts.png", citation_window, cohort_name
+        )
 
 
 def save_appendix_figure_copies(output_dir, figure_suffix):
@@ -515,10 +1225,18 @@ def save_appendix_figure_copies(output_dir, figure_suffix):
         "log_citations_by_badge_category.png": f"log_citations_by_badge_category_{figure_suffix}.png",
     }
     for source_name, target_name in figure_map.items():
-        shutil.copyfile(output_dir / source_name, figures_dir / target_name)
+        # Copy to a temporary name and rename it into place, so parallel
+        # snapshot workers never expose a partially written appendix figure.
+        with tempfile.NamedTemporaryFile(
+            dir=figures_dir, prefix=f".{target_name}.", delete=False
+        ) as handle:
+            temporary_path = Path(handle.name)
+        shutil.copy(output_dir / source_name, temporary_path)
+        os.replace(temporary_path, figures_dir / target_name)
 
 
 def save_boxplot(plot_df, path, y_column, title, y_label):
+    plt, sns = plotting_libraries()
     fig, ax = plt.subplots(figsize=(8, 5))
     sns.boxplot(
         data=plot_df,
@@ -549,7 +1267,7 @@ def save_boxplot(plot_df, path, y_column, title, y_label):
     plt.close(fig)
 
 
-def save_count_plot(plot_df, path, citation_window):
+def save_count_plot(plot_df, path, citation_window, cohort_name="SC 2022"):
     counts = (
         plot_df["BadgeCategory"]
         .value_counts()
@@ -557,6 +1275,7 @@ def save_count_plot(plot_df, path, citation_window):
         .reset_index()
     )
     counts.columns = ["BadgeCategory", "Papers"]
+    plt, sns = plotting_libraries()
 
     fig, ax = plt.subplots(figsize=(8, 5))
     sns.barplot(
@@ -567,7 +1286,7 @@ def save_count_plot(plot_df, path, citation_window):
         color="#457b9d",
         ax=ax,
     )
-    ax.set_title(f"SC 2022 papers by badge category ({citation_window})")
+    ax.set_title(f"{cohort_name} papers by badge category ({citation_window})")
     ax.set_xlabel("Mutually exclusive badge category")
     ax.set_ylabel("Paper count")
     ax.tick_params(axis="x", rotation=15)
@@ -578,14 +1297,7 @@ def save_count_plot(plot_df, path, citation_window):
     plt.close(fig)
 
 
-def write_summary(
-    output_dir,
-    snapshot,
-    merge_diagnostics,
-    analysis_df,
-    stats_df,
-    tests_df,
-):
+def write_summary(output_dir, snapshot, merge_diagnostics, analysis_df, stats_df, tests_df):
     group_counts = (
         analysis_df["BadgeCategory"].value_counts().reindex(CATEGORY_ORDER).fillna(0)
     )
@@ -609,6 +1321,21 @@ def write_summary(
         json.dump(clean_for_json(summary), handle, indent=2)
 
 
+def add_summary_timings(output_dir, timings):
+    """Add the stage timings of this run to an existing summary.json.
+
+    Timings are not an input of the summary stage, so recording them never
+    reruns it. The patched file no longer matches the build manifest, and the
+    next run rewrites the summary from the exported CSVs, without stale timings.
+    """
+    path = output_dir / "summary.json"
+    with path.open(encoding="utf-8") as handle:
+        summary = json.load(handle)
+    summary["timings"] = clean_for_json(timings)
+    with path.open("w", encoding="utf-8") as handle:
+        json.dump(summary, handle, indent=2)
+
+
 def clean_for_json(value):
     if isinstance(value, dict):
         return {key: clean_for_json(item) for key, item in value.items()}
@@ -621,49 +1348,603 @@ def clean_for_json(value):
     return value
 
 
-def analyze_snapshot(snapshot, badges_df):
+def file_digest(path):
+    digest = hashlib.sha256()
+    with open(path, "rb") as handle:
+        for block in iter(lambda: handle.read(1 << 20), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def combined_digest(*parts):
+    digest = hashlib.sha256()
+    for part in parts:
+        digest.update(str(part).encode("utf-8"))
+        digest.update(b"\0")
+    return digest.hexdigest()
+
+
+def local_module_files(module=None, found=None):
+    """Source files of `module` (default: this one) and of the repository
+    modules it imports, directly or through its own imports, sorted."""
+    module = module or sys.modules[__name__]
+    found = set() if found is None else found
+    path = getattr(module, "__file__", None)
+    if not path or Path(path).resolve().parent != REPO_ROOT or Path(path).resolve() in found:
+        return sorted(found)
+    found.add(Path(path).resolve())
+    for value in list(vars(module).values()):
+        # Imported modules, and the modules of imported functions and classes.
+        imported = value if isinstance(value, types.ModuleType) else sys.modules.get(
+            getattr(value, "__module__", None) or ""
+        )
+        if imported is not None:
+            local_module_files(imported, found)
+    return sorted(found)
+
+
+def code_digest():
+    # Outputs depend on this module, the repository modules it imports, and the
+    # numerical/plotting libraries, whose versions are read from their metadata
+    # so they need not be imported.
+    return combined_digest(
+        *(file_digest(path) for path in local_module_files()),
+        np.__version__,
+        pd.__version__,
+        *(
+            importlib.metadata.version(name)
+            for name in ["matplotlib", "seaborn", "scipy"]
+        ),
+    )
+
+
+def repo_relative(path):
+    path = Path(path)
+    try:
+        return str(path.resolve().relative_to(REPO_ROOT))
+    except ValueError:
+        return str(path)
+
+
+class BuildManifest:
+    """Input and output hashes of each analyze_snapshot stage for one snapshot.
+
+    A stage is current when its input hash matches the recorded one and every
+    output it produced still exists with the recorded content hash; current
+    stages are skipped unless `force` is set. `labels` are attached to the
+    instrumentation records of the stages. With `selection`, stages not listed
+    in it are neither run nor checked, and keep their recorded entry.
+    """
+
+    def __init__(self, path, force=False, labels=None, selection=None):
+        self.path = Path(path)
+        self.force = force
+        self.labels = labels or {}
+        self.selection = selection
+        self.stages = {}
+        if self.path.exists():
+            with self.path.open(encoding="utf-8") as handle:
+                self.stages = json.load(handle)
+
+    def is_current(self, stage, input_hash):
+        entry = self.stages.get(stage)
+        if self.force or entry is None or entry["inputs"] != input_hash:
+            return False
+        for output, output_hash in entry["outputs"].items():
+            path = REPO_ROOT / output
+            if not path.exists() or file_digest(path) != output_hash:
+                return False
+        return True
+
+    def selected(self, stage):
+        return self.selection is None or stage in self.selection
+
+    def run(self, stage, input_hash, outputs, build_function):
+        """Run `build_function` unless the stage is unselected or current; return whether it ran."""
+        if not self.selected(stage):
+            return False
+        if self.is_current(stage, input_hash):
+            instrumentation.skipped(stage, **self.labels)
+            return False
+        with instrumentation.stage(stage, **self.labels):
+            build_function()
+        self.stages[stage] = {
+            "inputs": input_hash,
+            "outputs": {repo_relative(path): file_digest(path) for path in outputs},
+        }
+        self.save()
+        return True
+
+    def save(self):
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        temporary_path = self.path.with_name(f".{self.path.name}.tmp")
+        with temporary_path.open("w", encoding="utf-8") as handle:
+            json.dump(self.stages, handle, indent=2, sort_keys=True)
+        os.replace(temporary_path, self.path)
+
+
+def analyze_snapshot(
+    snapshot, badges_df, test_options=None, force=False, citation_panel=None, stages=None
+):
+    """Run the analysis stages for one snapshot, skipping stages that are current.
+
+    Stage inputs are hashed from the code, the citation and badge files, and the
+    outputs of upstream stages (see BuildManifest). In-memory results are only
+    computed when a stage that needs them has to run, or for the return value.
+    `test_options` are keyword arguments for statistical_tests(). With a
+    `citation_panel`, citations are read from its memory-mapped column for the
+    snapshot instead of parsing the CSV. While instrumentation is enabled, the
+    stage timings are also written to timings.csv and to summary.json.
+
+    `stages` limits the run to some stages (default: all); the returned tests_df
+    is None unless statistical_tests is one of them.
+    """
+    test_options = test_options or {}
     output_dir = snapshot["output_dir"]
     output_dir.mkdir(parents=True, exist_ok=True)
+    labels = {"snapshot": snapshot["label"]}
+    manifest = BuildManifest(
+        BUILD_MANIFEST_DIR / f"{snapshot['label']}.json", force, labels, stages
+    )
+    code_hash = code_digest()
+    source_hash = combined_digest(
+        code_hash, file_digest(snapshot["citation_file"]), file_digest(BADGE_FILE)
+    )
+    results = {}
+
+    def merged():
+        if "merged" not in results:
+            with instrumentation.stage("load_citations", **labels):
+                if citation_panel is not None:
+                    citations_df = citation_panel.snapshot_frame(snapshot["label"])
+                else:
+                    citations_df = load_citations(snapshot["citation_file"])
+            results["citations"] = citations_df
+            with instrumentation.stage("build_outer_merge", **labels):
+                results["merged"] = build_outer_merge(citations_df, badges_df)
+        return results["merged"]
+
+    def analysis():
+        if "analysis" not in results:
+            merged_df = merged()
+            with instrumentation.stage("create_analysis_dataset", **labels):
+                results["analysis"] = create_analysis_dataset(merged_df)
+        return results["analysis"]
+
+    def groups():
+        if "groups" not in results:
+            results["groups"] = GroupIndex(analysis())
+        return results["groups"]
+
+    def stats():
+        if "stats" not in results:
+            results["stats"] = descriptive_statistics(
+                analysis(),
+                test_options.get("bootstrap_resamples", 0),
+                test_options.get("seed"),
+                groups(),
+            )
+        return results["stats"]
+
+    def tests():
+        if "tests" not in results:
+            results["tests"] = statistical_tests(analysis(), **test_options, groups=groups())
+        return results["tests"]
+
+    def write_merge_outputs():
+        merged_df = merged()
+        save_merge_diagnostics(merged_df, results["citations"], badges_df, output_dir)
+
+    def write_analysis_outputs():
+        save_hierarchy_diagnostics(analysis(), output_dir)
+        analysis().to_csv(output_dir / "analysis_dataset.csv", index=False)
+
+    manifest.run(
+        "merge",
+        source_hash,
+        [output_dir / "merge_diagnostics.csv", output_dir / "unmatched_rows.csv"],
+        write_merge_outputs,
+    )
+    manifest.run(
+        "analysis_dataset",
+        source_hash,
+        [output_dir / "badge_hierarchy_errors.csv", output_dir / "analysis_dataset.csv"],
+        write_analysis_outputs,
+    )
+    dataset_hash = combined_digest(code_hash, file_digest(output_dir / "analysis_dataset.csv"))
+
+    manifest.run(
+        "descriptive_statistics",
+        combined_digest(
+            dataset_hash,
+            test_options.get("bootstrap_resamples", 0),
+            test_options.get("seed"),
+        ),
+        [output_dir / "descriptive_statistics.csv"],
+        lambda: stats().to_csv(output_dir / "descriptive_statistics.csv", index=False),
+    )
+    manifest.run(
+        "statistical_tests",
+        combined_digest(
+            dataset_hash,
+            # The number of permutation workers does not change the results.
+            *sorted(
+                (name, value)
+                for name, value in test_options.items()
+                if name != "permutation_jobs"
+            ),
+        ),
+        [output_dir / "statistical_tests.csv"],
+        lambda: tests().to_csv(output_dir / "statistical_tests.csv", index=False),
+    )
 
-    citations_df = load_citations(snapshot["citation_file"])
-    merged_df = build_outer_merge(citations_df, badges_df)
-    merge_diagnostics = save_merge_diagnostics(
-        merged_df, citations_df, badges_df, output_dir
+    plot_names = [
+        "citations_by_badge_category.png",
+        "log_citations_by_badge_category.png",
+        "badge_category_counts.png",
+    ]
+    manifest.run(
+        "plots",
+        combined_digest(dataset_hash, snapshot["citation_window"]),
+        [output_dir / name for name in plot_names],
+        lambda: save_plots(
+            analysis(), output_dir, snapshot["citation_window"], groups=groups()
+        ),
     )
+    # The input hashes of this stage and of the summary read the outputs of
+    # other stages, which are missing when a command has not run them yet.
+    if manifest.selected("appendix_figures"):
+        manifest.run(
+            "appendix_figures",
+            combined_digest(
+                snapshot["figure_suffix"],
+                *(file_digest(output_dir / name) for name in plot_names[:2]),
+            ),
+            [
+                REPO_ROOT / "figures" / f"{name[:-len('.png')]}_{snapshot['figure_suffix']}.png"
+                for name in plot_names[:2]
+            ],
+            lambda: save_appendix_figure_copies(output_dir, snapshot["figure_suffix"]),
+        )
 
-    analysis_df = create_analysis_dataset(merged_df)
-    save_hierarchy_diagnostics(analysis_df, output_dir)
-    analysis_df.to_csv(output_dir / "analysis_dataset.csv", index=False)
+    def exported(key, name):
+        # Stages that were current are read back instead of recomputing their
+        # bootstraps and permutations, so the summary matches the CSV on disk.
+        if key in results:
+            return results[key]
+        return pd.read_csv(output_dir / name, float_precision="round_trip")
+
+    def write_summary_output():
+        merge_diagnostics = pd.read_csv(output_dir / "merge_diagnostics.csv").iloc[0].to_dict()
+        write_summary(
+            output_dir,
+            snapshot,
+            merge_diagnostics,
+            analysis(),
+            exported("stats", "descriptive_statistics.csv"),
+            exported("tests", "statistical_tests.csv"),
+        )
 
-    stats_df = descriptive_statistics(analysis_df)
-    stats_df.to_csv(output_dir / "descriptive_statistics.csv", index=False)
+    if manifest.selected("summary"):
+        manifest.run(
+            "summary",
+            combined_digest(
+                code_hash,
+                snapshot["label"],
+                snapshot["citation_window"],
+                repo_relative(snapshot["citation_file"]),
+                *(
+                    file_digest(output_dir / name)
+                    for name in [
+                        "merge_diagnostics.csv",
+                        "analysis_dataset.csv",
+                        "descriptive_statistics.csv",
+                        "statistical_tests.csv",
+                    ]
+                ),
+            ),
+            [output_dir / "summary.json"],
+            write_summary_output,
+        )
 
-    tests_df = statistical_tests(analysis_df)
-    tests_df.to_csv(output_dir / "statistical_tests.csv", index=False)
+    tests_df = None
+    if "tests" in results:
+        tests_df = results["tests"]
+    elif manifest.selected("statistical_tests"):
+        tests_df = pd.read_csv(
+            output_dir / "statistical_tests.csv", float_precision="round_trip"
+        )
+    analysis_df = analysis()
+    if instrumentation.enabled():
+        instrumentation.write_timings_csv(
+            output_dir / "timings.csv", instrumentation.stage_rows(**labels)
+        )
+        if manifest.selected("summary"):
+            add_summary_timings(
+                output_dir, instrumentation.summary(instrumentation.stage_rows(**labels))
+            )
+    return analysis_df, tests_df
 
-    save_plots(analysis_df, output_dir, snapshot["citation_window"])
-    save_appendix_figure_copies(output_dir, snapshot["figure_suffix"])
-    write_summary(output_dir, snapshot, merge_diagnostics, analysis_df, stats_df, tests_df)
 
-    return analysis_df, tests_df
+def snapshot_keys(snapshot):
+    """Results store cohort columns of a snapshot, as cohort_analysis.py labels SC 2022."""
+    return {
+        "cohort": snapshot["label"],
+        "venue": "sc",
+        "year": 2022,
+        "snapshot": snapshot["figure_suffix"],
+        "citation_window": snapshot["citation_window"],
+    }
 
 
-def main():
-    badges_df = load_badges(BADGE_FILE)
-    for snapshot in SNAPSHOTS:
-        analysis_df, tests_df = analyze_snapshot(snapshot, badges_df)
-        counts = analysis_df["BadgeCategory"].value_counts().reindex(CATEGORY_ORDER)
-        print(f"Analyzed {snapshot['label']} ({snapshot['citation_window']})")
-        print(f"  Output: {snapshot['output_dir'].relative_to(REPO_ROOT)}")
-        print(f"  Group counts: {counts.to_dict()}")
-        key_tests = tests_df.loc[
-            tests_df["test"].isin(
-                ["Spearman rank correlation", "Kruskal-Wallis H", "Mann-Whitney U"]
-            ),
-            ["test", "statistic", "p_value", "interpretation"],
-        ]
-        print(key_tests.to_string(index=False))
+def store_results(path, snapshots, stages, options):
+    """Add the exported results of `snapshots` to the results store as one run.
+
+    The results are read back from each output directory, so snapshots whose
+    stages were current in this run are recorded as well. Only the outputs of
+    `stages` are stored.
+    """
+    store = ResultsStore(path)
+    try:
+        with store.run("correlation_analysis", options, code_digest()) as run:
+            for snapshot in snapshots:
+                keys = snapshot_keys(snapshot)
+                output_dir = snapshot["output_dir"]
+                run.add_merge_diagnostics(
+                    pd.read_csv(output_dir / "merge_diagnostics.csv").assign(**keys)
+                )
+                if "descriptive_statistics" in stages:
+                    run.add_descriptive_statistics(
+                        pd.read_csv(
+                            output_dir / "descriptive_statistics.csv", float_precision="round_trip"
+                        ).assign(**keys)
+                    )
+                if "statistical_tests" in stages:
+                    run.add_statistical_tests(
+                        pd.read_csv(
+                            output_dir / "statistical_tests.csv", float_precision="round_trip"
+                        ).assign(**keys)
+                    )
+    finally:
+        store.close()
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(
+        description="Analyze SC 2022 badge level against frozen citation snapshots."
+    )
+    parser.add_argument(
+        "command",
+        nargs="?",
+        choices=list(COMMAND_STAGES),
+        default="all",
+        help=(
+            "Stages to run: validate (check and merge the inputs), stats (statistics, "
+            "tests and summary), plots (figures), or all (default: all)."
+        ),
+    )
+    parser.add_argument(
+        "--snapshot",
+        action="append",
+        choices=[snapshot["label"] for snapshot in SNAPSHOTS],
+        metavar="LABEL",
+        help=(
+            "Analyze only this snapshot; repeat for several (default: all of "
+            f"{', '.join(snapshot['label'] for snapshot in SNAPSHOTS)})."
+        ),
+    )
+    parser.add_argument(
+        "--bootstrap-resamples",
+        type=int,
+        default=0,
+        help=(
+            "Add bootstrap confidence intervals for Cliff's delta and for the descriptive "
+            "statistics of each badge category using this many resamples (default: 0, disabled)."
+        ),
+    )
+    parser.add_argument(
+        "--seed",
+        type=int,
+        default=None,
+        help="Random seed for resampling-based statistics.",
+    )
+    parser.add_argument(
+        "--permutations",
+        type=int,
+        default=0,
+        help=(
+            "Add permutation p-values for the Spearman, Kruskal-Wallis and Mann-Whitney "
+            "tests using this many permutations (default: 0, disabled)."
+        ),
+    )
+    parser.add_argument(
+        "--permutation-jobs",
+        type=int,
+        default=1,
+        help="Processes used for permutation blocks; 0 uses every CPU (default: 1).",
+    )
+    parser.add_argument(
+        "--jobs",
+        type=int,
+        default=1,
+        help="Number of snapshots analyzed in parallel processes; 0 uses every CPU (default: 1).",
+    )
+    parser.add_argument(
+        "--force",
+        action="store_true",
+        help="Rebuild every stage even if its inputs are unchanged since the last run.",
+    )
+    parser.add_argument(
+        "--citation-panel",
+        nargs="?",
+        const=CITATION_PANEL_DIR,
+        type=Path,
+        metavar="DIR",
+        help=(
+            "Read citations from the DOI x snapshot panel store, adding new or changed "
+            f"snapshots to it first (default directory: {repo_relative(CITATION_PANEL_DIR)})."
+        ),
+    )
+    parser.add_argument(
+        "--results-store",
+        nargs="?",
+        const=RESULTS_STORE_FILE,
+        type=Path,
+        metavar="PATH",
+        help=(
+            "Also record the merge diagnostics, descriptive statistics and tests of this run "
+            f"in a SQLite results store (default file: {repo_relative(RESULTS_STORE_FILE)})."
+        ),
+    )
+    parser.add_argument(
+        "--timings",
+        action="store_true",
+        help=(
+            "Record wall time, CPU time and peak RSS of every stage in timings.csv and "
+            "summary.json of each snapshot."
+        ),
+    )
+    parser.add_argument(
+        "--trace-memory",
+        action="store_true",
+        help="With --timings, also record the peak traced Python allocation of each stage (slower).",
+    )
+    parser.add_argument(
+        "--chrome-trace",
+        type=Path,
+        metavar="PATH",
+        help="Write the stage timings of the whole run as a Chrome trace file (implies --timings).",
+    )
+    return parser.parse_args(argv)
+
+
+def test_options_from_args(args):
+    return {
+        "bootstrap_resamples": args.bootstrap_resamples,
+        "seed": args.seed,
+        "permutations": args.permutations,
+        "permutation_jobs": args.permutation_jobs or os.cpu_count() or 1,
+    }
+
+
+def print_snapshot_summary(snapshot, analysis_df, tests_df, merge_diagnostics=None):
+    counts = analysis_df["BadgeCategory"].value_counts().reindex(CATEGORY_ORDER)
+    print(f"Analyzed {snapshot['label']} ({snapshot['citation_window']})")
+    print(f"  Output: {snapshot['output_dir'].relative_to(REPO_ROOT)}")
+    if merge_diagnostics is not None:
+        print(f"  Merge: {merge_diagnostics}")
+    print(f"  Group counts: {counts.to_dict()}")
+    if tests_df is None:
         print()
+        return
+    columns = ["test", "statistic", "p_value", "interpretation"]
+    if "permutation_p_value" in tests_df.columns:
+        columns.insert(3, "permutation_p_value")
+    key_tests = tests_df.loc[
+        tests_df["test"].isin(
+            ["Spearman rank correlation", "Kruskal-Wallis H", "Mann-Whitney U"]
+        ),
+        columns,
+    ]
+    print(key_tests.to_string(index=False))
+    print()
+
+
+_WORKER_BADGES = None
+_WORKER_CITATION_PANEL = None
+
+
+def _init_snapshot_worker(badges_df, citation_panel, instrumentation_options):
+    global _WORKER_BADGES, _WORKER_CITATION_PANEL
+    _WORKER_BADGES = badges_df
+    _WORKER_CITATION_PANEL = citation_panel
+    if instrumentation_options is not None:
+        instrumentation.enable(**instrumentation_options)
+
+
+def _analyze_snapshot_in_worker(snapshot, test_options, force, stages):
+    result = analyze_snapshot(
+        snapshot, _WORKER_BADGES, test_options, force, _WORKER_CITATION_PANEL, stages
+    )
+    # Stage records are returned to the parent for the run-wide trace.
+    return result, instrumentation.stage_rows(snapshot=snapshot["label"])
+
+
+def analyze_snapshots(
+    snapshots,
+    badges_df,
+    jobs=1,
+    test_options=None,
+    force=False,
+    citation_panel=None,
+    stages=None,
+):
+    """Analyze `snapshots` and return their (analysis_df, tests_df) results in order.
+
+    With jobs > 1 the snapshots run in a process pool. The badge table is loaded
+    once by the caller and handed to each worker when it starts.
+    """
+    if jobs <= 1 or len(snapshots) <= 1:
+        return [
+            analyze_snapshot(snapshot, badges_df, test_options, force, citation_panel, stages)
+            for snapshot in snapshots
+        ]
+    with ProcessPoolExecutor(
+        max_workers=min(jobs, len(snapshots)),
+        initializer=_init_snapshot_worker,
+        initargs=(badges_df, citation_panel, instrumentation.options()),
+    ) as executor:
+        futures = [
+            executor.submit(
+                _analyze_snapshot_in_worker, snapshot, test_options, force, stages
+            )
+            for snapshot in snapshots
+        ]
+        results = []
+        for future in futures:
+            result, stage_rows = future.result()
+            if instrumentation.enabled():
+                instrumentation.RECORDER.extend(stage_rows)
+            results.append(result)
+        return results
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    if args.timings or args.chrome_trace:
+        instrumentation.enable(trace_memory=args.trace_memory)
+    with instrumentation.stage("load_badges"):
+        badges_df = load_badges(BADGE_FILE)
+    jobs = args.jobs or os.cpu_count() or 1
+    snapshots = [
+        snapshot for snapshot in SNAPSHOTS if not args.snapshot or snapshot["label"] in args.snapshot
+    ]
+    citation_panel = None
+    if args.citation_panel:
+        with instrumentation.stage("update_citation_panel"):
+            citation_panel = update_citation_panel(SNAPSHOTS, args.citation_panel)
+    results = analyze_snapshots(
+        snapshots,
+        badges_df,
+        jobs,
+        test_options_from_args(args),
+        args.force,
+        citation_panel,
+        COMMAND_STAGES[args.command],
+    )
+    for snapshot, (analysis_df, tests_df) in zip(snapshots, results):
+        merge_diagnostics = None
+        if args.command == "validate":
+            merge_diagnostics = (
+                pd.read_csv(snapshot["output_dir"] / "merge_diagnostics.csv").iloc[0].to_dict()
+            )
+        print_snapshot_summary(snapshot, analysis_df, tests_df, merge_diagnostics)
+    if args.results_store:
+        store_results(args.results_store, snapshots, COMMAND_STAGES[args.command], vars(args))
+        print(f"Results recorded in {repo_relative(args.results_store)}")
+    if args.chrome_trace:
+        instrumentation.write_chrome_trace(args.chrome_trace)
+        print(f"Chrome trace written to {args.chrome_trace}")
 
 
 if __name__ == "__main__":
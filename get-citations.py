@@ -1,18 +1,300 @@
+import argparse
 import json
 import requests
 import csv
+import glob
+import gzip
+import queue
 import re
+import sqlite3
+import threading
+import time
+from collections import Counter, deque
+from concurrent.futures import Future, ProcessPoolExecutor, ThreadPoolExecutor
+from datetime import datetime
+from urllib.parse import parse_qsl, quote, urlencode, urlparse, urlunparse
 from pyalex import Works
 import os  # Import os to handle file paths
 
+import instrumentation
+from transport import DEFAULT_MAX_RETRIES, Transport
+
 
 DATASET_DIR = "dataset"
 DBLP_URLS_FILE = os.path.join(DATASET_DIR, "dblp-urls-sc.txt")
+OPENALEX_HOST = "api.openalex.org"
+OPENCITATIONS_HOST = "opencitations.net"
+DEFAULT_WORKERS = 8
+DEFAULT_RATE_LIMIT = 10.0  # requests per second, per host
+DEFAULT_BURST = 1  # requests a host may receive back to back within its rate limit
+DBLP_PAGE_SIZE = 1000  # the DBLP search API returns at most 1000 hits per request
+DBLP_PAGES_IN_FLIGHT = 2  # parsed DBLP pages buffered ahead of the lookup stage
+OPENALEX_BATCH_SIZE = 50  # DOIs per OR-filter request
+OPENALEX_MAX_BATCH_SIZE = 100  # values OpenAlex accepts in one OR-filter
+SNAPSHOT_DIR_PATTERN = re.compile(r"^data-(?P<month>[a-z]{3})-(?P<year>\d{4})$")
+CACHE_FILE = os.path.join(".cache", "citation-responses.sqlite")
+DEFAULT_CACHE_TTL_DAYS = 7.0
+DEFAULT_CACHE_MAX_ENTRIES = 200000
+DEFAULT_MAX_AGE_DAYS = 62.0  # a monthly baseline, dated the 1st of its month, stays reusable for a month
+TIMINGS_FILE = os.path.join(DATASET_DIR, "fetch_timings")  # .csv stage rows and .json summary
+DEFAULT_TITLE_THRESHOLD = 0.8  # minimum trigram Jaccard similarity of a title match
+TITLE_CANDIDATE_WORDS = 3  # rarest title words whose postings give the match candidates
+TITLE_SEARCH_RESULTS = 10  # OpenAlex title-search results scored against the DBLP title
+OPENALEX_SNAPSHOT_DOI = re.compile(rb'"doi"\s*:\s*"([^"]+)"')  # raw "doi" values in a works line
+DOI_PREFIXES = ("https://doi.org/", "http://doi.org/", "https://dx.doi.org/", "http://dx.doi.org/", "doi:")
+
+
+# Shared by every source; main() replaces it with one configured from the command line.
+TRANSPORT = Transport(DEFAULT_RATE_LIMIT, DEFAULT_BURST, pool_size=DEFAULT_WORKERS)
+PRINT_LOCK = threading.Lock()
+
+
+def log(*args):
+    """print() that keeps messages from concurrent lookups on separate lines."""
+    with PRINT_LOCK:
+        print(*args, flush=True)
+
+
+class ResponseCache:
+    """SQLite-backed store of successful API results keyed by (source, key).
+
+    Entries older than `ttl_days` are treated as misses, and once the table holds
+    more than `max_entries` rows the least recently fetched ones are evicted.
+    Values are stored as JSON so citation counts and DBLP pages round-trip.
+    """
+
+    def __init__(self, path, ttl_days=DEFAULT_CACHE_TTL_DAYS, max_entries=DEFAULT_CACHE_MAX_ENTRIES):
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self.path = path
+        self.ttl = ttl_days * 86400 if ttl_days else None
+        self.max_entries = max_entries
+        self._lock = threading.Lock()
+        self._connection = sqlite3.connect(path, check_same_thread=False)
+        with self._connection:
+            self._connection.execute(
+                "CREATE TABLE IF NOT EXISTS responses ("
+                "source TEXT NOT NULL, key TEXT NOT NULL, value TEXT NOT NULL, "
+                "fetched_at REAL NOT NULL, PRIMARY KEY (source, key))"
+            )
+            self._connection.execute(
+                "CREATE INDEX IF NOT EXISTS responses_fetched_at ON responses (fetched_at)"
+            )
+
+    def get(self, source, key, ignore_ttl=False):
+        with self._lock:
+            row = self._connection.execute(
+                "SELECT value, fetched_at FROM responses WHERE source = ? AND key = ?",
+                (source, key),
+            ).fetchone()
+        if row is None:
+            return None
+        value, fetched_at = row
+        if not ignore_ttl and self.ttl is not None and time.time() - fetched_at > self.ttl:
+            return None
+        return json.loads(value)
+
+    def set(self, source, key, value):
+        with self._lock, self._connection:
+            self._connection.execute(
+                "INSERT OR REPLACE INTO responses (source, key, value, fetched_at) VALUES (?, ?, ?, ?)",
+                (source, key, json.dumps(value), time.time()),
+            )
+
+    def values(self, source):
+        """Return every cached value of `source`, regardless of its age."""
+        with self._lock:
+            rows = self._connection.execute(
+                "SELECT value FROM responses WHERE source = ?", (source,)
+            ).fetchall()
+        return [json.loads(value) for (value,) in rows]
+
+    def validators(self):
+        """Store of HTTP validators and bodies for Transport conditional requests."""
+        return CachedValidators(self)
+
+    def evict(self):
+        with self._lock, self._connection:
+            if self.ttl is not None:
+                self._connection.execute(
+                    "DELETE FROM responses WHERE fetched_at < ?", (time.time() - self.ttl,)
+                )
+            if self.max_entries:
+                self._connection.execute(
+                    "DELETE FROM responses WHERE rowid IN ("
+                    "SELECT rowid FROM responses ORDER BY fetched_at DESC LIMIT -1 OFFSET ?)",
+                    (self.max_entries,),
+                )
+
+    def close(self):
+        self.evict()
+        self._connection.close()
+
+
+def normalize_title(title):
+    return " ".join(re.findall(r"\w+", title.lower()))
+
+
+def title_trigrams(normalized_title):
+    padded = f"  {normalized_title} "
+    return frozenset(padded[start:start + 3] for start in range(len(padded) - 2))
+
+
+def title_similarity(first, second):
+    """Jaccard similarity of the character trigrams of two normalized titles."""
+    first, second = title_trigrams(first), title_trigrams(second)
+    return len(first & second) / len(first | second) if first or second else 0.0
+
+
+class TitleIndex:
+    """In-memory fuzzy index from paper titles to DOIs.
+
+    Titles are normalized to lowercase words. The candidates for a query are the
+    indexed titles sharing at least two of its TITLE_CANDIDATE_WORDS rarest
+    indexed words (or its only one), so the postings of common words are never
+    scanned and few candidates are scored. A candidate matches when the
+    Jaccard similarity of the character trigrams reaches `threshold`. Only the
+    normalized titles are stored; trigrams are built for the candidates of a
+    query, after discarding titles too short to reach the threshold.
+    """
+
+    def __init__(self, threshold=DEFAULT_TITLE_THRESHOLD):
+        self.threshold = threshold
+        self._titles = []  # (normalized title, DOI)
+        self._ids = {}
+        self._postings = {}
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return len(self._titles)
+
+    def add(self, title, doi):
+        if not isinstance(title, str) or not isinstance(doi, str) or not is_doi(doi):
+            return
+        normalized = normalize_title(title)
+        with self._lock:
+            if not normalized or normalized in self._ids:
+                return
+            self._ids[normalized] = len(self._titles)
+            self._titles.append((normalized, doi))
+            for word in set(normalized.split()):
+                self._postings.setdefault(word, []).append(self._ids[normalized])
+
+    def add_dblp_hits(self, hits):
+        for hit in hits:
+            self.add(hit['info'].get('title'), dblp_ee(hit['info']))
+
+    def match(self, title):
+        """Return (DOI, similarity) of the closest indexed title, or None below the threshold."""
+        normalized = normalize_title(title)
+        with self._lock:
+            if normalized in self._ids:
+                return self._titles[self._ids[normalized]][1], 1.0
+            postings = sorted(
+                (self._postings[word] for word in set(normalized.split()) if word in self._postings),
+                key=len,
+            )[:TITLE_CANDIDATE_WORDS]
+            shared = Counter()
+            for posting in postings:
+                shared.update(posting)
+            required = min(2, len(postings))
+            candidates = [self._titles[entry] for entry, count in shared.items() if count >= required]
+        trigrams = title_trigrams(normalized)
+        # A title has at most len + 1 distinct trigrams, so shorter ones cannot match.
+        min_length = self.threshold * len(trigrams) - 1
+        best = None
+        for candidate, doi in candidates:
+            if len(candidate) < min_length:
+                continue
+            other = title_trigrams(candidate)
+            score = len(trigrams & other) / len(trigrams | other)
+            if best is None or score > best[1]:
+                best = (doi, score)
+        if best is None or best[1] < self.threshold:
+            return None
+        return best
+
+    def load_cache(self, cache):
+        """Index the titles of cached DBLP listings and resolved OpenAlex title searches."""
+        for page in cache.values("dblp"):
+            self.add_dblp_hits(page.get("hits", []))
+        for work in cache.values("openalex-title"):
+            self.add(work.get("title"), work.get("doi"))
+
+
+def resolve_title_doi(title):
+    """Return the DOI link the title index holds for `title`, or None on a miss."""
+    if TITLE_INDEX is None:
+        return None
+    match = TITLE_INDEX.match(title)
+    if match is None:
+        return None
+    log("Title index resolved ", title, " to ", match[0], " (similarity ", round(match[1], 3), ")")
+    return match[0]
+
+
+def remember_title(work):
+    """Add a work found by an OpenAlex title search to the title index and the cache."""
+    if TITLE_INDEX is not None:
+        TITLE_INDEX.add(work.get('title'), work.get('doi'))
+    if RESPONSE_CACHE is not None and work.get('doi'):
+        RESPONSE_CACHE.set(
+            "openalex-title", normalize_doi(work['doi']), {"title": work.get('title'), "doi": work['doi']}
+        )
+
+
+class CachedValidators:
+    """ETag/Last-Modified validators kept in a ResponseCache under the "http" source."""
+
+    def __init__(self, cache):
+        self.cache = cache
+
+    def get(self, url):
+        # Validators are checked by the server, so their age does not matter.
+        return self.cache.get("http", url, ignore_ttl=True)
+
+    def set(self, url, entry):
+        self.cache.set("http", url, entry)
+
+
+# Configured by main(); None disables caching. In offline mode every lookup is
+# answered from the cache, ignoring the TTL, and misses are reported as errors.
+RESPONSE_CACHE = None
+OFFLINE = False
+TITLE_INDEX = None  # TitleIndex consulted before OpenAlex title searches; None disables it
+
+
+def cached_lookup(source, key, fetch_function):
+    """Return the cached result for (source, key), calling `fetch_function` on a miss.
+
+    Only integer citation counts and dicts (DBLP pages) are stored; error strings
+    and other failures are returned to the caller without being cached.
+    """
+    if RESPONSE_CACHE is not None:
+        cached = RESPONSE_CACHE.get(source, key, ignore_ttl=OFFLINE)
+        if cached is not None:
+            return cached
+    if OFFLINE:
+        return f"No cached {source} response for {key} (offline mode)"
+    value = fetch_function()
+    if RESPONSE_CACHE is not None and isinstance(value, (int, dict)):
+        RESPONSE_CACHE.set(source, key, value)
+    return value
+
 
 def is_doi(doi):
     doi_pattern = re.compile(r'^(https?://)?doi\.org/10\.\d{4,}/\S+$')
     return bool(doi_pattern.match(doi))
 
+def normalize_doi(doi):
+    doi = doi.strip().lower()
+    for prefix in DOI_PREFIXES:
+        if doi.startswith(prefix):
+            doi = doi[len(prefix):]
+            break
+    return doi.rstrip("/")
+
 def extract_scedition_from_url(url):
     match = re.search(r'sc(\d+)', url)
     if match:
@@ -21,66 +303,707 @@ def extract_scedition_from_url(url):
         return ""
         
 def get_citations_opencitations(key):
-    api_url = f"https://opencitations.net/index/api/v1/citations/{key}"
-    response = requests.get(api_url)
+    if not is_doi(key):
+        key = resolve_title_doi(key) or key
+    if not is_doi(key):
+        return f"{key} has no DOI and is not in the title index"
+    return cached_lookup("opencitations", normalize_doi(key), lambda: fetch_citations_opencitations(key))
+
+def fetch_citations_opencitations(key):
+    """Return the number of works citing DOI `key` in the OpenCitations Index.
+
+    The citation-count operation answers with the count alone ([{"count": "N"}])
+    instead of one record per citing work, so the response stays a few dozen
+    bytes however often the paper is cited.
+    """
+    api_url = f"https://{OPENCITATIONS_HOST}/index/api/v1/citation-count/{normalize_doi(key)}"
+    try:
+        response = TRANSPORT.get(api_url, "opencitations")
+    except requests.RequestException as e:
+        return f"Failed to fetch citations for {key}: {e}"
     if response.status_code == 200:
         opencitationsdata = response.json()
-        citations = len(opencitationsdata)
-        return citations
+        if not opencitationsdata:
+            return f"OpenCitations returned no count for {key}"
+        return int(opencitationsdata[0]["count"])
     else:
         error_message = f"Failed to fetch citations for {key}. Status code: {response.status_code}"
         return error_message
 
 def get_citations_openalex(key):
+    if not is_doi(key):
+        doi = resolve_title_doi(key)
+        if doi is not None:
+            return get_citations_openalex(doi)
+    cache_key = normalize_doi(key) if is_doi(key) else key
+    return cached_lookup("openalex", cache_key, lambda: fetch_citations_openalex(key))
+
+
+def get_openalex_json(url, source):
+    response = TRANSPORT.get(url, source)
+    if response.status_code != 200:
+        raise requests.HTTPError(f"OpenAlex status code: {response.status_code} for {url}")
+    return response.json()
+
+
+def openalex_list_url(query, per_page):
+    """URL of a pyalex list query; pyalex only builds the URL, TRANSPORT sends it."""
+    return f"{query.url}&per-page={per_page}"
+
+
+def fetch_citations_openalex(key):
     try:
         if is_doi(key):
-            specific_work = Works()[key]
+            specific_work = get_openalex_json(
+                f"https://{OPENALEX_HOST}/works/{quote(key, safe='')}", "openalex"
+            )
         else:
             words = re.findall(r'\b\w+\b', key)
             parsed_key = ' '.join(words)
-            specific_work_array = Works().search_filter(title=parsed_key).get()
-            specific_work = specific_work_array[0]
+            query = Works().search_filter(title=parsed_key).select(["doi", "title", "cited_by_count"])
+            specific_work_array = get_openalex_json(
+                openalex_list_url(query, TITLE_SEARCH_RESULTS), "openalex-title-search"
+            )["results"]
+            threshold = TITLE_INDEX.threshold if TITLE_INDEX is not None else 0.0
+            scored = [
+                (title_similarity(normalize_title(key), normalize_title(work.get('title') or "")), work)
+                for work in specific_work_array
+            ]
+            score, specific_work = max(scored, key=lambda pair: pair[0], default=(0.0, None))
+            if specific_work is None or score < threshold:
+                return f"No OpenAlex work matches title {key} (best similarity {score:.2f})"
+            remember_title(specific_work)
         return specific_work['cited_by_count']
     except Exception as e:
-        print("An error occurred: ", str(e))
+        log("An error occurred: ", str(e))
         return str(e)
     
-def fetch_citations_from_url(url, get_citations_function):
-    citations_table = {}
-    dblpresponse = requests.get(url)
-    if dblpresponse.status_code == 200:
-        data = json.loads(dblpresponse.text)
-        n = int(data['result']['hits']['@total'])
-        paper_citations = {}
-        for i in range(n):
+def get_citations_openalex_batch(dois):
+    """Fetch cited_by_count for many DOIs with a single OpenAlex OR-filter request.
+
+    Returns a dict keyed by the DOIs exactly as given. DOIs that OpenAlex does not
+    return are left out so the caller can fall back to single lookups.
+    """
+    citations = {}
+    originals = {}
+    for doi in dois:
+        normalized = normalize_doi(doi)
+        cached = RESPONSE_CACHE.get("openalex", normalized, ignore_ttl=OFFLINE) if RESPONSE_CACHE else None
+        if cached is not None:
+            citations[doi] = cached
+        else:
+            originals.setdefault(normalized, []).append(doi)
+    if not originals or OFFLINE:
+        return citations
+    try:
+        query = Works().filter_or(doi=list(originals)).select(["doi", "cited_by_count"])
+        works = get_openalex_json(openalex_list_url(query, len(originals)), "openalex-batch")["results"]
+    except Exception as e:
+        log("An error occurred in batched OpenAlex lookup: ", str(e))
+        return citations
+    for work in works:
+        normalized = normalize_doi(work.get('doi') or "")
+        if normalized in originals and RESPONSE_CACHE is not None:
+            RESPONSE_CACHE.set("openalex", normalized, work['cited_by_count'])
+        for doi in originals.get(normalized, []):
+            citations[doi] = work['cited_by_count']
+    return citations
+
+
+def openalex_snapshot_partitions(directory):
+    """Return the *.gz JSON Lines partitions below an OpenAlex works snapshot directory."""
+    partitions = sorted(glob.glob(os.path.join(directory, "**", "*.gz"), recursive=True))
+    if not partitions:
+        raise ValueError(f"No *.gz partitions found in OpenAlex snapshot {directory}")
+    return partitions
+
+
+SNAPSHOT_DOIS = frozenset()  # DOIs wanted by the partition scans of this process
+
+
+def init_snapshot_worker(dois):
+    global SNAPSHOT_DOIS
+    SNAPSHOT_DOIS = dois
+
+
+def newer_work(entry, previous):
+    return previous is None or (entry["updated_date"] or "") > (previous["updated_date"] or "")
+
+
+def scan_openalex_partition(path, dois=None):
+    """Extract the citation counts of the wanted DOIs from one snapshot partition.
+
+    Returns {normalized DOI: {"cited_by_count", "counts_by_year", "updated_date"}}.
+    The partition is decompressed as a stream and a line is only parsed as JSON
+    when one of its raw "doi" values is wanted, so the scan costs little more
+    than the decompression. `dois` defaults to the set given to the worker.
+    """
+    dois = SNAPSHOT_DOIS if dois is None else dois
+    found = {}
+    with gzip.open(path, "rb") as handle:
+        for line in handle:
+            candidates = OPENALEX_SNAPSHOT_DOI.findall(line)
+            if not any(normalize_doi(value.decode("utf-8", "replace")) in dois for value in candidates):
+                continue
+            work = json.loads(line)
+            doi = normalize_doi(work.get("doi") or "")
+            if doi not in dois or not isinstance(work.get("cited_by_count"), int):
+                continue
+            entry = {
+                "cited_by_count": work["cited_by_count"],
+                "counts_by_year": {
+                    int(count["year"]): count["cited_by_count"] for count in work.get("counts_by_year") or []
+                },
+                "updated_date": work.get("updated_date"),
+            }
+            # A work updated between partitions keeps its most recent record.
+            if newer_work(entry, found.get(doi)):
+                found[doi] = entry
+    return found
+
+
+def scan_openalex_snapshot(directory, dois, jobs=1):
+    """Look up normalized `dois` in a local OpenAlex works snapshot, without network access.
+
+    Partitions are scanned in parallel by `jobs` worker processes, each holding
+    one copy of the DOI set. Returns the merged scan_openalex_partition() result.
+    """
+    partitions = openalex_snapshot_partitions(directory)
+    dois = frozenset(dois)
+    found = {}
+    if jobs > 1 and len(partitions) > 1:
+        with ProcessPoolExecutor(
+            max_workers=min(jobs, len(partitions)), initializer=init_snapshot_worker, initargs=(dois,)
+        ) as executor:
+            results = list(executor.map(scan_openalex_partition, partitions))
+    else:
+        results = [scan_openalex_partition(partition, dois) for partition in partitions]
+    for partition_found in results:
+        for doi, entry in partition_found.items():
+            if newer_work(entry, found.get(doi)):
+                found[doi] = entry
+    log("OpenAlex snapshot resolved ", len(found), " of ", len(dois), " DOIs from ", len(partitions), " partitions")
+    return found
+
+
+def snapshot_citations_function(snapshot_works):
+    """Build a get_citations_function that answers from a scanned OpenAlex snapshot."""
+
+    def get_citations_snapshot(key):
+        if not is_doi(key):
+            key = resolve_title_doi(key) or key
+        if not is_doi(key):
+            return f"{key} has no DOI and is not in the title index"
+        entry = snapshot_works.get(normalize_doi(key))
+        if entry is None:
+            return f"{key} is not in the OpenAlex snapshot"
+        return entry["cited_by_count"]
+
+    return get_citations_snapshot
+
+
+def write_counts_by_year_csv(csv_filename, snapshot_works, keys):
+    """Write the per-year citation counts of the DOI `keys` found in the snapshot."""
+    with open(csv_filename, 'w', newline='', encoding='utf-8') as csvfile:
+        csv_writer = csv.writer(csvfile)
+        csv_writer.writerow(['DOI', 'Year', 'Citations'])
+        for key in dict.fromkeys(keys):
+            doi = key if isinstance(key, str) and is_doi(key) else None
+            if doi is None and isinstance(key, str) and TITLE_INDEX is not None:
+                match = TITLE_INDEX.match(key)
+                doi = match[0] if match else None
+            entry = snapshot_works.get(normalize_doi(doi)) if doi else None
+            for year, citations in sorted((entry or {}).get("counts_by_year", {}).items()):
+                csv_writer.writerow([key, year, citations])
+
+
+def prefetch_citations(hits, batch_citations_function, executor, batch_size):
+    dois = []
+    seen = set()
+    for hit in hits:
+        doi = dblp_ee(hit['info'])
+        if isinstance(doi, str) and is_doi(doi) and doi not in seen:
+            seen.add(doi)
+            dois.append(doi)
+    batches = [dois[start:start + batch_size] for start in range(0, len(dois), batch_size)]
+    prefetched = {}
+    for citations in executor.map(batch_citations_function, batches):
+        prefetched.update(citations)
+    log("Batched lookup resolved ", len(prefetched), " of ", len(dois), " DOIs")
+    return prefetched
+
+
+def dblp_ee(info):
+    """Return the `ee` link of a DBLP hit as one string, or None when it has none.
+
+    DBLP returns a list for records with several electronic editions; the first
+    DOI link is used then, or the first link when none of them is a DOI.
+    """
+    ee = info.get('ee')
+    if isinstance(ee, list):
+        links = [link for link in ee if isinstance(link, str)]
+        return next((link for link in links if is_doi(link)), links[0] if links else None)
+    return ee
+
+
+def record_key(info):
+    """Return the output CSV key of a DBLP hit: its `ee` link, or its title without one."""
+    ee = dblp_ee(info)
+    return ee if ee is not None else info.get('title')
+
+
+def known_record_key(key):
+    """Key used to match a record against a baseline snapshot or checkpoint journal."""
+    if isinstance(key, str) and is_doi(key):
+        return normalize_doi(key)
+    return key
+
+
+def load_baseline_citations(csv_filename, fetched_at):
+    """Read a previous snapshot CSV into {known_record_key: (key, citations, fetched_at)}."""
+    baseline = {}
+    with open(csv_filename, newline='', encoding='utf-8') as csvfile:
+        for row in csv.DictReader(csvfile):
             try:
-                doi = data['result']['hits']['hit'][i]['info']['ee']
-                if is_doi(doi):
-                    result_citations = get_citations_function(doi)
-                else:
-                    title = data['result']['hits']['hit'][i]['info']['title']
-                    result_citations = get_citations_function(title)
-                if isinstance(result_citations, int):
-                    paper_citations[doi] = result_citations
-                    print("Num of citations for ", doi, " record ", i, ": ", result_citations)
-                else:
-                    print("Num of citations not found at ", url, " record ", i, " found: ", result_citations)
-            except KeyError:
-                print("DOI not found at ", url, " record ", i, ": Trying now with title")
+                citations = int(row['Citations'])
+            except (TypeError, ValueError):
+                continue
+            baseline[known_record_key(row['DOI'])] = (row['DOI'], citations, fetched_at)
+    return baseline
+
+
+class CheckpointJournal:
+    """Append-only JSON Lines record of the rows written for one output CSV.
+
+    Every row is flushed as it is written, so an interrupted run can reuse the
+    journal on the next start and only look up the records that were missing.
+    The journal is removed once the output CSV is complete.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self._handle = None
+
+    def load(self):
+        entries = {}
+        if not os.path.exists(self.path):
+            return entries
+        with open(self.path, encoding='utf-8') as handle:
+            for line in handle:
                 try:
-                    title = data['result']['hits']['hit'][i]['info']['title']
-                    result_citations = get_citations_function(title)
-                    if isinstance(result_citations, int):
-                        paper_citations[title] = result_citations
-                        print("Num of citations for ", doi, " record ", i, ": ", result_citations)
-                    else:
-                        print("Num of citations not found at ", url, " record ", i)
-                except Exception as e:
-                    print("An error occurred: ", str(e))
-        citations_table = paper_citations
-    else:
-        print("Error, no response from dblp")
-    return citations_table
+                    entry = json.loads(line)
+                except json.JSONDecodeError:
+                    # A run killed mid-write can leave a truncated last line.
+                    continue
+                entries[known_record_key(entry['key'])] = (
+                    entry['key'],
+                    entry['citations'],
+                    entry['fetched_at'],
+                )
+        return entries
+
+    def record(self, key, citations, fetched_at):
+        if self._handle is None:
+            self._handle = open(self.path, 'a', encoding='utf-8')
+        self._handle.write(json.dumps({"key": key, "citations": citations, "fetched_at": fetched_at}) + "\n")
+        self._handle.flush()
+
+    def complete(self):
+        if self._handle is not None:
+            self._handle.close()
+            self._handle = None
+        if os.path.exists(self.path):
+            os.remove(self.path)
+
+
+def lookup_record_citations(url, i, info, get_citations_function):
+    """Resolve the citation count of DBLP hit `i`, preferring its DOI over its title.
+
+    Returns a (key, citations) pair, or None when no count could be found. The key
+    is the DBLP `ee` link when the hit has one and the title otherwise.
+    """
+    doi = None
+    try:
+        doi = dblp_ee(info)
+        if doi is None:
+            raise KeyError('ee')
+        if is_doi(doi):
+            result_citations = get_citations_function(doi)
+        else:
+            title = info['title']
+            result_citations = get_citations_function(title)
+        if isinstance(result_citations, int):
+            log("Num of citations for ", doi, " record ", i, ": ", result_citations)
+            return doi, result_citations
+        log("Num of citations not found at ", url, " record ", i, " found: ", result_citations)
+    except KeyError:
+        log("DOI not found at ", url, " record ", i, ": Trying now with title")
+        try:
+            title = info['title']
+            result_citations = get_citations_function(title)
+            if isinstance(result_citations, int):
+                log("Num of citations for ", doi, " record ", i, ": ", result_citations)
+                return title, result_citations
+            log("Num of citations not found at ", url, " record ", i)
+        except Exception as e:
+            log("An error occurred: ", str(e))
+    return None
+
+
+def dblp_page_url(url, offset, page_size):
+    """Return `url` with its DBLP `f` (first hit) and `h` (hits per page) parameters set."""
+    parts = urlparse(url)
+    query = [(name, value) for name, value in parse_qsl(parts.query, keep_blank_values=True) if name not in ("f", "h")]
+    query += [("h", str(page_size)), ("f", str(offset))]
+    return urlunparse(parts._replace(query=urlencode(query, safe=":/")))
+
+
+def fetch_dblp_page(url):
+    page = cached_lookup("dblp", url, lambda: download_dblp_page(url))
+    if not isinstance(page, dict):
+        log("Error, no response from dblp: ", page)
+        return None
+    return page
+
+
+def download_dblp_page(url):
+    dblpresponse = TRANSPORT.get(url, "dblp")
+    if dblpresponse.status_code != 200:
+        return f"DBLP status code: {dblpresponse.status_code}"
+    data = json.loads(dblpresponse.text)
+    hits = data['result']['hits']
+    return {"total": int(hits['@total']), "hits": hits.get('hit', [])}
+
+
+def iter_dblp_pages(url, page_size=DBLP_PAGE_SIZE):
+    """Yield the hit lists of a DBLP query page by page, following the `f` offset."""
+    offset = 0
+    while True:
+        page = fetch_dblp_page(dblp_page_url(url, offset, page_size))
+        if page is None or not page["hits"]:
+            return
+        yield page["hits"]
+        offset += len(page["hits"])
+        if offset >= page["total"]:
+            return
+
+
+def produce_dblp_pages(url, page_size, pages, listed_pages=None):
+    try:
+        for hits in listed_pages if listed_pages is not None else iter_dblp_pages(url, page_size):
+            pages.put(hits)
+    except Exception as e:
+        log("An error occurred while listing DBLP: ", str(e))
+    finally:
+        pages.put(None)
+
+
+def iter_citations_from_url(
+    url,
+    get_citations_function,
+    workers=DEFAULT_WORKERS,
+    batch_citations_function=None,
+    batch_size=OPENALEX_BATCH_SIZE,
+    page_size=DBLP_PAGE_SIZE,
+    known_citations=None,
+    listed_pages=None,
+):
+    """Yield (key, citations) for every DBLP hit at `url`, in DBLP hit order.
+
+    A producer thread pages through the DBLP listing while citation lookups for
+    already parsed pages run on a bounded thread pool, so lookups start as soon as
+    the first page arrives. When `batch_citations_function` is given, the DOIs of
+    each page are first resolved in chunks of `batch_size` and
+    `get_citations_function` is only called for the misses. Records found in
+    `known_citations` ({known_record_key: (key, citations, fetched_at)}) are
+    yielded without any lookup. `listed_pages` replaces the DBLP download with
+    hit lists that were already listed. Results are yielded as soon as every
+    earlier record has finished.
+    """
+    known_citations = known_citations or {}
+    pages = queue.Queue(maxsize=DBLP_PAGES_IN_FLIGHT)
+    producer = threading.Thread(
+        target=produce_dblp_pages, args=(url, page_size, pages, listed_pages), daemon=True
+    )
+    producer.start()
+    workers = max(1, workers)
+    pending = deque()
+    offset = 0
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        while True:
+            hits = pages.get()
+            if hits is None:
+                break
+            if TITLE_INDEX is not None:
+                TITLE_INDEX.add_dblp_hits(hits)
+            known = [known_citations.get(known_record_key(record_key(hit['info']))) for hit in hits]
+            lookup_function = get_citations_function
+            if batch_citations_function is not None:
+                unknown_hits = [hit for hit, entry in zip(hits, known) if entry is None]
+                prefetched = prefetch_citations(unknown_hits, batch_citations_function, executor, batch_size)
+
+                def lookup_function(key, prefetched=prefetched):
+                    if key in prefetched:
+                        return prefetched[key]
+                    return get_citations_function(key)
+
+            for i, (hit, entry) in enumerate(zip(hits, known), start=offset):
+                if entry is None:
+                    pending.append(executor.submit(lookup_record_citations, url, i, hit['info'], lookup_function))
+                else:
+                    reused = Future()
+                    reused.set_result((record_key(hit['info']), entry[1]))
+                    pending.append(reused)
+                # Bound the number of finished-but-unwritten results held in memory.
+                while len(pending) > workers * 4 or (pending and pending[0].done()):
+                    result = pending.popleft().result()
+                    if result is not None:
+                        yield result
+            offset += len(hits)
+        while pending:
+            result = pending.popleft().result()
+            if result is not None:
+                yield result
+    producer.join()
+
+
+def fetch_citations_from_url(url, get_citations_function, **kwargs):
+    """Collect iter_citations_from_url() into a {key: citations} table."""
+    return dict(iter_citations_from_url(url, get_citations_function, **kwargs))
+
+
+def write_citations_csv(csv_filename, rows, journal=None, known_citations=None):
+    """Stream (key, citations) rows into `csv_filename` as they arrive.
+
+    Rows are flushed one by one so an interrupted run leaves every finished
+    record on disk. Repeated keys keep their first row. With a `journal`, each
+    row is also checkpointed together with its fetch time, taken from
+    `known_citations` for reused rows and the current time otherwise.
+    """
+    known_citations = known_citations or {}
+    written = set()
+    with open(csv_filename, 'w', newline='', encoding='utf-8') as csvfile:
+        csv_writer = csv.writer(csvfile)
+        csv_writer.writerow(['DOI', 'Citations'])  # Write header row
+        for doi, citations in rows:
+            if doi in written:
+                log("Skipping repeated record ", doi)
+                continue
+            written.add(doi)
+            csv_writer.writerow([doi, citations])
+            csvfile.flush()
+            if journal is not None:
+                entry = known_citations.get(known_record_key(doi))
+                journal.record(doi, citations, entry[2] if entry else time.time())
+    if journal is not None:
+        journal.complete()
+    return len(written)
+
+
+def load_known_citations(csv_filename, baseline_dir, baseline_date, max_age_days, journal):
+    """Collect reusable counts from the baseline snapshot and the checkpoint journal.
+
+    Entries fetched more than `max_age_days` ago are dropped so those records
+    are looked up again; journal entries take precedence over the baseline.
+    """
+    known = {}
+    if baseline_dir:
+        baseline_csv = os.path.join(baseline_dir, os.path.basename(csv_filename))
+        if os.path.exists(baseline_csv):
+            known.update(load_baseline_citations(baseline_csv, baseline_date))
+        else:
+            log("No baseline snapshot found at ", baseline_csv, "; fetching every record")
+    if journal is not None:
+        known.update(journal.load())
+    if max_age_days is not None:
+        cutoff = time.time() - max_age_days * 86400
+        known = {key: entry for key, entry in known.items() if entry[2] >= cutoff}
+    return known
+
+
+def baseline_snapshot_date(baseline_dir):
+    """Timestamp of the first day of the month named by a dataset/data-<mon>-<yyyy> directory.
+
+    The day of the fetch is unknown, so the earliest day of the month is used;
+    counts are never treated as fresher than they are. Returns None when the
+    directory name does not follow the snapshot layout.
+    """
+    match = SNAPSHOT_DIR_PATTERN.match(os.path.basename(os.path.normpath(baseline_dir)))
+    if not match:
+        return None
+    return datetime.strptime(f"{match['month']}-{match['year']}", "%b-%Y").timestamp()
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Fetch live citation counts from DBLP/OpenAlex.")
+    parser.add_argument(
+        "--source",
+        choices=["openalex", "opencitations"],
+        default="openalex",
+        help=(
+            "Citation count API: OpenAlex, or the count-only citation-count operation of the "
+            "OpenCitations Index (default: openalex)."
+        ),
+    )
+    parser.add_argument(
+        "--workers",
+        type=int,
+        default=DEFAULT_WORKERS,
+        help=f"Maximum number of concurrent citation lookups (default: {DEFAULT_WORKERS}).",
+    )
+    parser.add_argument(
+        "--rate-limit",
+        type=float,
+        default=DEFAULT_RATE_LIMIT,
+        help=(
+            "Maximum requests per second sent to each host; 0 disables limiting "
+            f"(default: {DEFAULT_RATE_LIMIT:g})."
+        ),
+    )
+    parser.add_argument(
+        "--burst",
+        type=int,
+        default=DEFAULT_BURST,
+        help=f"Requests a host may receive back to back within its rate limit (default: {DEFAULT_BURST}).",
+    )
+    parser.add_argument(
+        "--max-retries",
+        type=int,
+        default=DEFAULT_MAX_RETRIES,
+        help=(
+            "Retries of throttled (429), failed (5xx) or dropped requests, with exponential "
+            f"backoff or the server's Retry-After (default: {DEFAULT_MAX_RETRIES})."
+        ),
+    )
+    parser.add_argument(
+        "--batch-size",
+        type=int,
+        default=OPENALEX_BATCH_SIZE,
+        help=(
+            f"DOIs resolved per batched OpenAlex request, at most {OPENALEX_MAX_BATCH_SIZE}; "
+            f"0 disables batching (default: {OPENALEX_BATCH_SIZE})."
+        ),
+    )
+    parser.add_argument(
+        "--page-size",
+        type=int,
+        default=DBLP_PAGE_SIZE,
+        help=f"DBLP hits requested per page (default: {DBLP_PAGE_SIZE}).",
+    )
+    parser.add_argument(
+        "--baseline",
+        metavar="DIR",
+        help=(
+            "Previous snapshot directory (e.g. dataset/data-jul-2026); counts found there "
+            "are reused unless older than --max-age-days."
+        ),
+    )
+    parser.add_argument(
+        "--baseline-date",
+        type=lambda value: datetime.strptime(value, "%Y-%m-%d").timestamp(),
+        help=(
+            "Fetch date of the baseline snapshot as YYYY-MM-DD (default: the first day of the "
+            "month in a data-<mon>-<yyyy> directory name; required for other directories)."
+        ),
+    )
+    parser.add_argument(
+        "--max-age-days",
+        type=float,
+        default=DEFAULT_MAX_AGE_DAYS,
+        help=(
+            "Reused baseline and checkpoint counts older than this many days are fetched again; "
+            "the default covers a monthly refresh of a data-<mon>-<yyyy> baseline, which is dated "
+            f"the first day of its month (default: {DEFAULT_MAX_AGE_DAYS:g})."
+        ),
+    )
+    parser.add_argument(
+        "--no-resume",
+        action="store_true",
+        help="Ignore and overwrite checkpoint journals left by an interrupted run.",
+    )
+    parser.add_argument(
+        "--cache",
+        default=CACHE_FILE,
+        help=f"SQLite file caching DBLP and citation responses (default: {CACHE_FILE}).",
+    )
+    parser.add_argument("--no-cache", action="store_true", help="Disable the response cache.")
+    parser.add_argument(
+        "--cache-ttl-days",
+        type=float,
+        default=DEFAULT_CACHE_TTL_DAYS,
+        help=(
+            "Age in days after which cached responses are re-fetched; 0 keeps them forever "
+            f"(default: {DEFAULT_CACHE_TTL_DAYS:g})."
+        ),
+    )
+    parser.add_argument(
+        "--cache-max-entries",
+        type=int,
+        default=DEFAULT_CACHE_MAX_ENTRIES,
+        help=(
+            "Maximum cached responses kept; the oldest are evicted first "
+            f"(default: {DEFAULT_CACHE_MAX_ENTRIES})."
+        ),
+    )
+    parser.add_argument(
+        "--offline",
+        action="store_true",
+        help="Replay DBLP and citation responses from the cache only, without network access.",
+    )
+    parser.add_argument(
+        "--openalex-snapshot",
+        metavar="DIR",
+        help=(
+            "Read citation counts from a local OpenAlex works snapshot (a directory of *.gz "
+            "JSON Lines partitions) instead of the live OpenAlex API."
+        ),
+    )
+    parser.add_argument(
+        "--snapshot-jobs",
+        type=int,
+        default=0,
+        help="Worker processes scanning snapshot partitions; 0 uses every CPU (default: 0).",
+    )
+    parser.add_argument(
+        "--title-threshold",
+        type=float,
+        default=DEFAULT_TITLE_THRESHOLD,
+        help=(
+            "Minimum trigram similarity for resolving a DOI-less record by title, in the local "
+            f"title index and in OpenAlex title searches (default: {DEFAULT_TITLE_THRESHOLD:g})."
+        ),
+    )
+    parser.add_argument(
+        "--timings",
+        action="store_true",
+        help=(
+            f"Record stage timings and per-source request latency, error and retry counts in "
+            f"{TIMINGS_FILE}.csv and {TIMINGS_FILE}.json."
+        ),
+    )
+    parser.add_argument(
+        "--chrome-trace",
+        metavar="PATH",
+        help="Write stages and individual requests as a Chrome trace file (implies --timings).",
+    )
+    args = parser.parse_args(argv)
+    if not 0 <= args.batch_size <= OPENALEX_MAX_BATCH_SIZE:
+        parser.error(f"--batch-size must be between 0 and {OPENALEX_MAX_BATCH_SIZE}")
+    if args.baseline and args.baseline_date is None:
+        # File modification times reflect the checkout, not the fetch, and would
+        # make every count of an old snapshot look fresh.
+        args.baseline_date = baseline_snapshot_date(args.baseline)
+        if args.baseline_date is None:
+            parser.error(
+                f"--baseline-date is required: the fetch date of {args.baseline} cannot be derived "
+                "from its name (expected data-<mon>-<yyyy>)"
+            )
+    if args.offline and args.no_cache:
+        parser.error("--offline requires the response cache")
+    if args.openalex_snapshot and args.source != "openalex":
+        parser.error("--openalex-snapshot requires --source openalex")
+    return args
+
 
 def main():
     """Fetch live citation counts from DBLP/OpenAlex.
@@ -88,26 +1011,100 @@ def main():
     This optional script is not used by the frozen reproducibility analysis in
     correlation_analysis.py.
     """
-    os.makedirs(DATASET_DIR, exist_ok=True)
-
-    with open(DBLP_URLS_FILE, "r") as file:
-        for line in file:
-            url = line.strip()
-            print("*****************************************************************************************************")
-            print("Retrieving citations from ", url, " with openalex")
-            result_table = fetch_citations_from_url(url, get_citations_openalex)
+    global RESPONSE_CACHE, OFFLINE, TITLE_INDEX, TRANSPORT
 
-            scedition = extract_scedition_from_url(url)
-            csv_filename = os.path.join(DATASET_DIR, f'{scedition}_citations.csv')
+    args = parse_args()
+    if args.timings or args.chrome_trace:
+        instrumentation.enable(trace_requests=bool(args.chrome_trace))
+    OFFLINE = args.offline
+    if not args.no_cache:
+        RESPONSE_CACHE = ResponseCache(args.cache, args.cache_ttl_days, args.cache_max_entries)
+    TRANSPORT = Transport(
+        args.rate_limit,
+        args.burst,
+        pool_size=max(1, args.workers),
+        max_retries=args.max_retries,
+        validators=RESPONSE_CACHE.validators() if RESPONSE_CACHE is not None else None,
+    )
+    TITLE_INDEX = TitleIndex(args.title_threshold)
+    if RESPONSE_CACHE is not None:
+        with instrumentation.stage("title_index"):
+            TITLE_INDEX.load_cache(RESPONSE_CACHE)
+        log("Title index holds ", len(TITLE_INDEX), " cached titles")
+    os.makedirs(DATASET_DIR, exist_ok=True)
 
-            with open(csv_filename, 'w', newline='', encoding='utf-8') as csvfile:
-                csv_writer = csv.writer(csvfile)
-                csv_writer.writerow(['DOI', 'Citations'])  # Write header row
-                for doi, citations in result_table.items():
-                    csv_writer.writerow([doi, citations])
+    try:
+        with open(DBLP_URLS_FILE, "r") as file:
+            for line in file:
+                url = line.strip()
+                print("*****************************************************************************************************")
+                source = "an OpenAlex snapshot" if args.openalex_snapshot else args.source
+                print("Retrieving citations from ", url, " with ", source)
+                scedition = extract_scedition_from_url(url)
+                csv_filename = os.path.join(DATASET_DIR, f'{scedition}_citations.csv')
+                journal = CheckpointJournal(f"{csv_filename}.journal")
+                if args.no_resume:
+                    journal.complete()
+                known_citations = load_known_citations(
+                    csv_filename, args.baseline, args.baseline_date, args.max_age_days, journal
+                )
+                if known_citations:
+                    print("Reusing ", len(known_citations), " baseline/checkpoint counts")
+                get_citations_function = get_citations_openalex
+                batch_citations_function = get_citations_openalex_batch if args.batch_size > 0 else None
+                if args.source == "opencitations":
+                    get_citations_function = get_citations_opencitations
+                    batch_citations_function = None
+                listed_pages = None
+                if args.openalex_snapshot:
+                    # The snapshot is scanned once for every DOI of the listing.
+                    with instrumentation.stage("dblp_listing", edition=scedition):
+                        listed_pages = list(iter_dblp_pages(url, args.page_size))
+                    keys = [record_key(hit['info']) for hits in listed_pages for hit in hits]
+                    for hits in listed_pages:
+                        TITLE_INDEX.add_dblp_hits(hits)
+                    resolved = [
+                        key if is_doi(key) else (TITLE_INDEX.match(key) or (key,))[0]
+                        for key in keys
+                        if isinstance(key, str)
+                    ]
+                    dois = {normalize_doi(key) for key in resolved if is_doi(key)}
+                    with instrumentation.stage("openalex_snapshot_scan", edition=scedition):
+                        snapshot_works = scan_openalex_snapshot(
+                            args.openalex_snapshot, dois, args.snapshot_jobs or os.cpu_count() or 1
+                        )
+                    get_citations_function = snapshot_citations_function(snapshot_works)
+                    batch_citations_function = None
+                rows = iter_citations_from_url(
+                    url,
+                    get_citations_function,
+                    workers=args.workers,
+                    batch_citations_function=batch_citations_function,
+                    batch_size=args.batch_size,
+                    page_size=args.page_size,
+                    known_citations=known_citations,
+                    listed_pages=listed_pages,
+                )
+                with instrumentation.stage("fetch_citations", edition=scedition):
+                    write_citations_csv(csv_filename, rows, journal=journal, known_citations=known_citations)
+                if args.openalex_snapshot:
+                    by_year_filename = os.path.join(DATASET_DIR, f'{scedition}_citations_by_year.csv')
+                    write_counts_by_year_csv(by_year_filename, snapshot_works, keys)
+                    print(f'Citations per year written to {by_year_filename}')
 
-            print(f'Results for URL {url} written to {csv_filename}\n')
+                print(f'Results for URL {url} written to {csv_filename}\n')
 
+    finally:
+        TRANSPORT.close()
+        if RESPONSE_CACHE is not None:
+            RESPONSE_CACHE.close()
+        if instrumentation.enabled():
+            rows = instrumentation.stage_rows()
+            instrumentation.write_timings_csv(f"{TIMINGS_FILE}.csv", rows)
+            with open(f"{TIMINGS_FILE}.json", "w", encoding="utf-8") as handle:
+                json.dump(instrumentation.summary(rows), handle, indent=2)
+            if args.chrome_trace:
+                instrumentation.write_chrome_trace(args.chrome_trace, rows)
 
 if __name__ == "__main__":
     main()
@@ -0,0 +1,329 @@
+"""Stage timing, memory and HTTP instrumentation for the analysis and fetch scripts.
+
+Instrumentation is off unless a script calls enable(). While it is off,
+stage() returns one shared no-op context manager and the request recorders
+return immediately, so instrumented code pays a function call per stage or
+request and nothing else.
+
+When enabled, every stage records its wall time, the CPU time of the process,
+the peak resident set size of the process so far and, with `trace_memory`, the
+peak traced Python allocation within the stage (tracemalloc slows allocation
+down noticeably, so it is opt-in). Stages nest and inherit the labels of the
+enclosing stage, e.g. the snapshot being analyzed. HTTP requests are counted
+per source in a latency histogram together with their retries and errors.
+
+Results are available as timings.csv rows (stage_rows()), as a summary() dict
+for summary.json, and as a Chrome trace (write_chrome_trace()) that can be
+opened in chrome://tracing or https://ui.perfetto.dev.
+"""
+
+import contextlib
+import csv
+import json
+import os
+import threading
+import time
+import tracemalloc
+
+try:
+    import resource
+except ImportError:  # not available on Windows
+    resource = None
+
+
+# Upper bounds in seconds of the request latency histogram buckets; the last
+# bucket holds everything slower.
+LATENCY_BUCKETS = (0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+STAGE_COLUMNS = [
+    "stage",
+    "path",
+    "labels",
+    "status",
+    "start_seconds",
+    "wall_seconds",
+    "cpu_seconds",
+    "max_rss_mb",
+    "traced_peak_mb",
+    "pid",
+    "thread",
+]
+
+
+class Recorder:
+    """Collected stage rows and per-source request statistics of one process."""
+
+    def __init__(self, trace_memory=False, trace_requests=False, started=None):
+        self.trace_memory = trace_memory
+        self.trace_requests = trace_requests
+        # Stage start times are relative to this; worker processes share it
+        # with the parent so their rows line up.
+        self.started = time.time() if started is None else started
+        self.stages = []
+        self.requests = {}
+        self.request_events = []
+        self._lock = threading.Lock()
+        self._local = threading.local()
+        if trace_memory and not tracemalloc.is_tracing():
+            tracemalloc.start()
+
+    def _stack(self):
+        if not hasattr(self._local, "stack"):
+            self._local.stack = []
+        return self._local.stack
+
+    def _row(self, name, labels, status, start, wall, cpu, traced_peak):
+        stack = self._stack()
+        return {
+            "stage": name,
+            "path": "/".join([frame["name"] for frame in stack] + [name]),
+            "labels": labels,
+            "status": status,
+            "start_seconds": start - self.started,
+            "wall_seconds": wall,
+            "cpu_seconds": cpu,
+            "max_rss_mb": max_rss_mb(),
+            "traced_peak_mb": None if traced_peak is None else traced_peak / 2**20,
+            "pid": os.getpid(),
+            "thread": threading.current_thread().name,
+        }
+
+    def _labels(self, labels):
+        stack = self._stack()
+        inherited = dict(stack[-1]["labels"]) if stack else {}
+        inherited.update(labels)
+        return inherited
+
+    @contextlib.contextmanager
+    def stage(self, name, **labels):
+        stack = self._stack()
+        frame = {"name": name, "labels": self._labels(labels), "peak": 0}
+        if self.trace_memory:
+            # The enclosing stage keeps the peak reached so far; the counter is
+            # then reset so this stage measures its own peak.
+            if stack:
+                stack[-1]["peak"] = max(stack[-1]["peak"], tracemalloc.get_traced_memory()[1])
+            tracemalloc.reset_peak()
+        start = time.time()
+        wall_start = time.perf_counter()
+        cpu_start = time.process_time()
+        stack.append(frame)
+        try:
+            yield
+        finally:
+            stack.pop()
+            wall = time.perf_counter() - wall_start
+            cpu = time.process_time() - cpu_start
+            traced_peak = None
+            if self.trace_memory:
+                traced_peak = max(frame["peak"], tracemalloc.get_traced_memory()[1])
+                if stack:
+                    stack[-1]["peak"] = max(stack[-1]["peak"], traced_peak)
+            row = self._row(name, frame["labels"], "ran", start, wall, cpu, traced_peak)
+            with self._lock:
+                self.stages.append(row)
+
+    def skipped(self, name, **labels):
+        row = self._row(name, self._labels(labels), "skipped", time.time(), 0.0, 0.0, None)
+        with self._lock:
+            self.stages.append(row)
+
+    def _source(self, source):
+        if source not in self.requests:
+            self.requests[source] = {
+                "requests": 0,
+                "errors": 0,
+                "retries": 0,
+                "total_seconds": 0.0,
+                "max_seconds": 0.0,
+                "latency_histogram": [0] * (len(LATENCY_BUCKETS) + 1),
+            }
+        return self.requests[source]
+
+    def request(self, source, start, seconds, error=False):
+        bucket = next(
+            (index for index, bound in enumerate(LATENCY_BUCKETS) if seconds <= bound),
+            len(LATENCY_BUCKETS),
+        )
+        with self._lock:
+            stats = self._source(source)
+            stats["requests"] += 1
+            stats["errors"] += int(bool(error))
+            stats["total_seconds"] += seconds
+            stats["max_seconds"] = max(stats["max_seconds"], seconds)
+            stats["latency_histogram"][bucket] += 1
+            if self.trace_requests:
+                self.request_events.append(
+                    (source, start, seconds, bool(error), threading.current_thread().name)
+                )
+
+    def retry(self, source):
+        with self._lock:
+            self._source(source)["retries"] += 1
+
+    def extend(self, rows):
+        """Add stage rows recorded in another process."""
+        with self._lock:
+            self.stages.extend(rows)
+
+
+RECORDER = None  # set by enable(); None keeps instrumentation off
+_DISABLED_STAGE = contextlib.nullcontext()
+
+
+def enable(trace_memory=False, trace_requests=False, started=None):
+    global RECORDER
+    RECORDER = Recorder(trace_memory, trace_requests, started)
+    return RECORDER
+
+
+def disable():
+    global RECORDER
+    if RECORDER is not None and RECORDER.trace_memory:
+        tracemalloc.stop()
+    RECORDER = None
+
+
+def enabled():
+    return RECORDER is not None
+
+
+def options():
+    """Arguments that enable() the same instrumentation in a worker process, or None."""
+    if RECORDER is None:
+        return None
+    return {
+        "trace_memory": RECORDER.trace_memory,
+        "trace_requests": RECORDER.trace_requests,
+        "started": RECORDER.started,
+    }
+
+
+def stage(name, **labels):
+    """Context manager timing one pipeline stage; a shared no-op while disabled."""
+    if RECORDER is None:
+        return _DISABLED_STAGE
+    return RECORDER.stage(name, **labels)
+
+
+def skipped(name, **labels):
+    """Record a stage that did not run, e.g. because its outputs were current."""
+    if RECORDER is not None:
+        RECORDER.skipped(name, **labels)
+
+
+def record_request(source, start, seconds, error=False):
+    """Record one HTTP request to `source` that started at time.time() `start`."""
+    if RECORDER is not None:
+        RECORDER.request(source, start, seconds, error)
+
+
+def record_retry(source):
+    if RECORDER is not None:
+        RECORDER.retry(source)
+
+
+def max_rss_mb():
+    if resource is None:
+        return None
+    # ru_maxrss is in kilobytes on Linux and in bytes on macOS.
+    scale = 2**20 if os.uname().sysname == "Darwin" else 2**10
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / scale
+
+
+def stage_rows(**labels):
+    """Recorded stage rows, optionally only those whose labels include `labels`."""
+    if RECORDER is None:
+        return []
+    with RECORDER._lock:
+        rows = list(RECORDER.stages)
+    return [
+        row for row in rows if all(row["labels"].get(key) == value for key, value in labels.items())
+    ]
+
+
+def write_timings_csv(path, rows):
+    with open(path, "w", newline="", encoding="utf-8") as handle:
+        writer = csv.DictWriter(handle, fieldnames=STAGE_COLUMNS)
+        writer.writeheader()
+        for row in rows:
+            writer.writerow({**row, "labels": json.dumps(row["labels"], sort_keys=True)})
+
+
+def summary(rows):
+    """Stage totals and request statistics for a summary.json section."""
+    stages = {}
+    for row in rows:
+        entry = stages.setdefault(
+            row["path"], {"status": row["status"], "wall_seconds": 0.0, "cpu_seconds": 0.0}
+        )
+        entry["wall_seconds"] += row["wall_seconds"]
+        entry["cpu_seconds"] += row["cpu_seconds"]
+        if row["traced_peak_mb"] is not None:
+            entry["traced_peak_mb"] = max(entry.get("traced_peak_mb", 0.0), row["traced_peak_mb"])
+    result = {
+        "stages": stages,
+        "max_rss_mb": max(
+            (row["max_rss_mb"] for row in rows if row["max_rss_mb"] is not None), default=None
+        ),
+    }
+    if RECORDER is not None and RECORDER.requests:
+        bucket_names = [f"<={bound:g}s" for bound in LATENCY_BUCKETS] + ["slower"]
+        with RECORDER._lock:
+            result["http"] = {
+                source: {**stats, "latency_histogram": dict(zip(bucket_names, stats["latency_histogram"]))}
+                for source, stats in RECORDER.requests.items()
+            }
+    return result
+
+
+def write_chrome_trace(path, rows=None):
+    """Write stages (and traced requests) as complete events of the Chrome trace format."""
+    rows = stage_rows() if rows is None else rows
+    started = RECORDER.started if RECORDER is not None else 0.0
+    threads = {}
+
+    def thread_id(pid, name):
+        return threads.setdefault((pid, name), len(threads) + 1)
+
+    events = [
+        {
+            "name": row["stage"],
+            "cat": "stage",
+            "ph": "X",
+            "ts": (row["start_seconds"] + started) * 1e6,
+            "dur": row["wall_seconds"] * 1e6,
+            "pid": row["pid"],
+            "tid": thread_id(row["pid"], row["thread"]),
+            "args": {
+                "labels": row["labels"],
+                "status": row["status"],
+                "cpu_seconds": row["cpu_seconds"],
+                "max_rss_mb": row["max_rss_mb"],
+                "traced_peak_mb": row["traced_peak_mb"],
+            },
+        }
+        for row in rows
+    ]
+    if RECORDER is not None:
+        pid = os.getpid()
+        with RECORDER._lock:
+            request_events = list(RECORDER.request_events)
+        events += [
+            {
+                "name": source,
+                "cat": "http",
+                "ph": "X",
+                "ts": start * 1e6,
+                "dur": seconds * 1e6,
+                "pid": pid,
+                "tid": thread_id(pid, thread),
+                "args": {"error": error},
+            }
+            for source, start, seconds, error, thread in request_events
+        ]
+    events += [
+        {"name": "thread_name", "ph": "M", "pid": pid, "tid": tid, "args": {"name": name}}
+        for (pid, name), tid in threads.items()
+    ]
+    with open(path, "w", encoding="utf-8") as handle:
+        json.dump({"traceEvents": events, "displayTimeUnit": "ms"}, handle)
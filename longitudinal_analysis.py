@@ -0,0 +1,229 @@
+"""Longitudinal citation-growth analysis across the frozen citation snapshots.
+
+correlation_analysis.py treats each snapshot as a separate cross-section. This
+script aligns all snapshots by normalized DOI through the citation panel store,
+computes per-paper citation growth between consecutive snapshots and over the
+whole observation window, and runs the same test battery on the monthly growth
+rate instead of the citation level.
+
+Run it from the repository root:
+
+    python longitudinal_analysis.py
+"""
+
+import argparse
+import json
+from datetime import datetime
+
+import numpy as np
+import pandas as pd
+
+from citation_panel import MISSING
+from correlation_analysis import (
+    BADGE_FILE,
+    CATEGORY_ORDER,
+    CITATION_PANEL_DIR,
+    REPO_ROOT,
+    SNAPSHOTS,
+    build_outer_merge,
+    clean_for_json,
+    create_analysis_dataset,
+    descriptive_statistics,
+    load_badges,
+    print_snapshot_summary,
+    repo_relative,
+    save_hierarchy_diagnostics,
+    save_merge_diagnostics,
+    statistical_tests,
+    update_citation_panel,
+)
+
+
+OUTPUT_DIR = REPO_ROOT / "outputs" / "sc2022_longitudinal"
+
+
+def snapshot_month(snapshot):
+    """Months since year 0 at which a snapshot was taken.
+
+    Uses the optional ISO `snapshot_date` of a snapshot and otherwise the month
+    named in its `citation_window` (e.g. "November 2023").
+    """
+    if snapshot.get("snapshot_date"):
+        date = datetime.strptime(snapshot["snapshot_date"], "%Y-%m-%d")
+        return date.year * 12 + date.month - 1 + (date.day - 1) / 30.4375
+    date = datetime.strptime(snapshot["citation_window"], "%B %Y")
+    return date.year * 12 + date.month - 1
+
+
+def citation_growth(panel, snapshots):
+    """Per-paper citation growth across `snapshots`, computed on the panel matrix.
+
+    Returns (interval_df, growth_df). interval_df has one row per paper and
+    consecutive snapshot pair with the citation delta and monthly rate.
+    growth_df has one row per paper present in both the first and the last
+    snapshot, with the overall delta and monthly growth rate.
+    """
+    snapshots = sorted(snapshots, key=snapshot_month)
+    labels = [snapshot["label"] for snapshot in snapshots]
+    months = np.array([snapshot_month(snapshot) for snapshot in snapshots])
+    if len(labels) < 2:
+        raise ValueError("Longitudinal analysis needs at least two snapshots")
+    if np.any(np.diff(months) <= 0):
+        raise ValueError("Snapshots must be taken in distinct months")
+
+    counts = panel.counts(labels).astype(float)
+    counts[counts == MISSING] = np.nan
+    dois = np.asarray(panel.dois, dtype=object)
+
+    interval_months = np.diff(months)
+    deltas = np.diff(counts, axis=1)
+    rates = deltas / interval_months
+    n_dois, n_intervals = deltas.shape
+    interval_df = pd.DataFrame(
+        {
+            "DOI": np.repeat(dois, n_intervals),
+            "from_snapshot": np.tile(labels[:-1], n_dois),
+            "to_snapshot": np.tile(labels[1:], n_dois),
+            "months": np.tile(interval_months, n_dois),
+            "citation_delta": deltas.ravel(),
+            "monthly_rate": rates.ravel(),
+        }
+    )
+    interval_df = interval_df[interval_df["citation_delta"].notna()].reset_index(drop=True)
+
+    observed = ~np.isnan(counts[:, 0]) & ~np.isnan(counts[:, -1])
+    total_months = months[-1] - months[0]
+    last_frame = panel.snapshot_frame(labels[-1]).set_index("DOI")
+    growth_df = pd.DataFrame(
+        {
+            "DOI": dois[observed],
+            "CitationDOI": last_frame["CitationDOI"].reindex(dois[observed]).to_numpy(),
+            "FirstCitations": counts[observed, 0],
+            "LastCitations": counts[observed, -1],
+            "CitationDelta": counts[observed, -1] - counts[observed, 0],
+            "Months": total_months,
+        }
+    )
+    growth_df["MonthlyGrowth"] = growth_df["CitationDelta"] / total_months
+    return interval_df, growth_df
+
+
+def analyze_growth(badges_df, snapshots=SNAPSHOTS, output_dir=OUTPUT_DIR, test_options=None):
+    """Run the merge, validation and test battery on monthly citation growth."""
+    output_dir.mkdir(parents=True, exist_ok=True)
+    panel = update_citation_panel(snapshots, CITATION_PANEL_DIR)
+    interval_df, growth_df = citation_growth(panel, snapshots)
+    interval_df.to_csv(output_dir / "interval_growth.csv", index=False)
+
+    # The test battery reads the outcome from the Citations column, so the
+    # monthly growth rate takes its place for this analysis.
+    outcome_df = growth_df[["DOI", "CitationDOI", "MonthlyGrowth"]].rename(
+        columns={"MonthlyGrowth": "Citations"}
+    )
+    merged_df = build_outer_merge(outcome_df, badges_df)
+    merge_diagnostics = save_merge_diagnostics(merged_df, outcome_df, badges_df, output_dir)
+    analysis_df = create_analysis_dataset(merged_df)
+    save_hierarchy_diagnostics(analysis_df, output_dir)
+
+    growth_columns = growth_df.drop(columns=["CitationDOI"]).set_index("DOI")
+    growth_dataset = analysis_df.drop(columns=["Citations"]).join(growth_columns, on="DOI")
+    growth_dataset.to_csv(output_dir / "growth_dataset.csv", index=False)
+
+    stats_df = descriptive_statistics(
+        analysis_df,
+        (test_options or {}).get("bootstrap_resamples", 0),
+        (test_options or {}).get("seed"),
+    )
+    stats_df.to_csv(output_dir / "descriptive_statistics.csv", index=False)
+    tests_df = statistical_tests(analysis_df, **(test_options or {}))
+    tests_df.to_csv(output_dir / "statistical_tests.csv", index=False)
+
+    ordered = sorted(snapshots, key=snapshot_month)
+    group_counts = analysis_df["BadgeCategory"].value_counts().reindex(CATEGORY_ORDER).fillna(0)
+    summary = {
+        "analysis": "longitudinal citation growth",
+        "outcome": "MonthlyGrowth = (last - first citation count) / months between snapshots",
+        "snapshots": [
+            {
+                "label": snapshot["label"],
+                "citation_window": snapshot["citation_window"],
+                "citation_file": repo_relative(snapshot["citation_file"]),
+            }
+            for snapshot in ordered
+        ],
+        "months_observed": snapshot_month(ordered[-1]) - snapshot_month(ordered[0]),
+        "badge_file": repo_relative(BADGE_FILE),
+        "merge_diagnostics": merge_diagnostics,
+        "group_counts": {category: int(group_counts[category]) for category in CATEGORY_ORDER},
+        "statistical_tests": tests_df.to_dict(orient="records"),
+        "descriptive_statistics": stats_df.to_dict(orient="records"),
+        "supported_claim": (
+            "The analysis evaluates whether a statistically detectable association "
+            "is observed between SC 2022 badge level and the monthly citation growth "
+            "between the first and last citation snapshot. It does not estimate a "
+            "causal effect."
+        ),
+    }
+    with (output_dir / "summary.json").open("w", encoding="utf-8") as handle:
+        json.dump(clean_for_json(summary), handle, indent=2)
+    return analysis_df, tests_df
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(
+        description="Analyze SC 2022 badge level against citation growth across snapshots."
+    )
+    parser.add_argument(
+        "--output-dir",
+        type=lambda value: (REPO_ROOT / value).resolve(),
+        default=OUTPUT_DIR,
+        help=f"Output directory (default: {repo_relative(OUTPUT_DIR)}).",
+    )
+    parser.add_argument(
+        "--bootstrap-resamples",
+        type=int,
+        default=0,
+        help="Add bootstrap confidence intervals using this many resamples (default: 0).",
+    )
+    parser.add_argument(
+        "--permutations",
+        type=int,
+        default=0,
+        help="Add permutation p-values using this many permutations (default: 0).",
+    )
+    parser.add_argument(
+        "--seed",
+        type=int,
+        default=None,
+        help="Random seed for resampling-based statistics.",
+    )
+    return parser.parse_args(argv)
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    badges_df = load_badges(BADGE_FILE)
+    test_options = {
+        "bootstrap_resamples": args.bootstrap_resamples,
+        "permutations": args.permutations,
+        "seed": args.seed,
+    }
+    analysis_df, tests_df = analyze_growth(
+        badges_df, output_dir=args.output_dir, test_options=test_options
+    )
+    ordered = sorted(SNAPSHOTS, key=snapshot_month)
+    print_snapshot_summary(
+        {
+            "label": "longitudinal citation growth",
+            "citation_window": (
+                f"{ordered[0]['citation_window']} to {ordered[-1]['citation_window']}"
+            ),
+            "output_dir": args.output_dir,
+        },
+        analysis_df,
+        tests_df,
+    )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,220 @@
+"""SQLite store of analysis results across runs, snapshots and cohorts.
+
+Every run of an analysis script becomes one row of `runs` (script, start and
+end time, options and code digest) and its results are added in the same
+transaction to three tables:
+
+- merge_diagnostics: one row per cohort-snapshot with the merge counts;
+- descriptive_statistics: one row per cohort-snapshot and badge category;
+- statistical_tests: one row per test_row() of a cohort-snapshot.
+
+Each row carries the run id and the cohort columns (cohort, venue, year,
+snapshot, citation_window), so questions like "how did the Mann-Whitney p-value
+move across snapshots and venues" are one indexed query:
+
+    SELECT cohort, snapshot, p_value FROM statistical_tests
+    WHERE test = 'Mann-Whitney U' AND run_id IN (SELECT max(run_id) FROM runs GROUP BY script)
+
+Columns outside a table's fixed set, such as bootstrap intervals or
+permutation p-values, are kept as a JSON object in its `extra` column. A run
+that fails leaves nothing behind, and readers never see a half-written run.
+
+The CSV and JSON files in outputs/ remain the primary export; this module
+only deals with storage and has no knowledge of how the results are computed.
+"""
+
+import contextlib
+import json
+import sqlite3
+import time
+from pathlib import Path
+
+import pandas as pd
+
+
+COHORT_COLUMNS = ["cohort", "venue", "year", "snapshot", "citation_window"]
+# Fixed columns of each result table, as {table column: frame column}.
+TABLE_COLUMNS = {
+    "merge_diagnostics": {
+        "citation_rows": "citation_rows",
+        "badge_rows": "badge_rows",
+        "present_in_both": "present_in_both",
+        "only_in_citations": "only_in_citations",
+        "only_in_badge_file": "only_in_badge_file",
+        "status": "status",
+        "error": "error",
+    },
+    "descriptive_statistics": {
+        "badge_category": "BadgeCategory",
+        "n": "n",
+        "mean": "mean",
+        "median": "median",
+        "std": "std",
+        "min": "min",
+        "q25": "q25",
+        "q75": "q75",
+        "iqr": "IQR",
+        "max": "max",
+    },
+    "statistical_tests": {
+        "test": "test",
+        "comparison": "comparison",
+        "statistic": "statistic",
+        "p_value": "p_value",
+        "adjusted_p_value": "adjusted_p_value",
+        "effect_size": "effect_size",
+        "effect_size_name": "effect_size_name",
+        "n_1": "n_1",
+        "n_2": "n_2",
+        "n_total": "n_total",
+        "status": "status",
+        "interpretation": "interpretation",
+        "notes": "notes",
+    },
+}
+COLUMN_TYPES = {
+    "citation_rows": "INTEGER",
+    "badge_rows": "INTEGER",
+    "present_in_both": "INTEGER",
+    "only_in_citations": "INTEGER",
+    "only_in_badge_file": "INTEGER",
+    "n": "INTEGER",
+    "statistic": "REAL",
+    "p_value": "REAL",
+    "adjusted_p_value": "REAL",
+    "effect_size": "REAL",
+    "n_1": "INTEGER",
+    "n_2": "INTEGER",
+    "n_total": "INTEGER",
+    "mean": "REAL",
+    "median": "REAL",
+    "std": "REAL",
+    "min": "REAL",
+    "q25": "REAL",
+    "q75": "REAL",
+    "iqr": "REAL",
+    "max": "REAL",
+}
+INDEXES = {
+    "merge_diagnostics": [["cohort"], ["snapshot"]],
+    "descriptive_statistics": [["cohort"], ["snapshot"], ["badge_category"]],
+    "statistical_tests": [["test", "comparison"], ["cohort"], ["snapshot"]],
+}
+
+
+def schema():
+    statements = [
+        "CREATE TABLE IF NOT EXISTS runs ("
+        "run_id INTEGER PRIMARY KEY, script TEXT NOT NULL, started_at REAL NOT NULL, "
+        "finished_at REAL, options TEXT, code_digest TEXT)"
+    ]
+    for table, columns in TABLE_COLUMNS.items():
+        definitions = ["run_id INTEGER NOT NULL REFERENCES runs (run_id)"]
+        definitions += [
+            f"{column} {'INTEGER' if column == 'year' else 'TEXT'}" for column in COHORT_COLUMNS
+        ]
+        definitions += [f"{column} {COLUMN_TYPES.get(column, 'TEXT')}" for column in columns]
+        definitions.append("extra TEXT")
+        statements.append(f"CREATE TABLE IF NOT EXISTS {table} ({', '.join(definitions)})")
+        for index_columns in [["run_id"]] + INDEXES[table]:
+            name = f"{table}_{'_'.join(index_columns)}"
+            statements.append(
+                f"CREATE INDEX IF NOT EXISTS {name} ON {table} ({', '.join(index_columns)})"
+            )
+    return statements
+
+
+def sql_values(frame, column):
+    """Values of a frame column that SQLite can bind, None where missing or absent.
+
+    Converting to object dtype turns NumPy scalars into Python numbers; NaN and
+    NA become None (NULL).
+    """
+    if column not in frame.columns:
+        return [None] * len(frame)
+    values = frame[column]
+    return values.astype(object).where(values.notna(), None).tolist()
+
+
+class ResultsStore:
+    """Append-only SQLite results store; each run() is one transaction."""
+
+    def __init__(self, path):
+        self.path = Path(path)
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        # Transactions are managed explicitly in run().
+        self._connection = sqlite3.connect(self.path, isolation_level=None)
+        # Readers keep querying earlier runs while a run is being written.
+        self._connection.execute("PRAGMA journal_mode=WAL")
+        for statement in schema():
+            self._connection.execute(statement)
+
+    @contextlib.contextmanager
+    def run(self, script, options=None, code_digest=None):
+        """Record one run; yields a RunWriter and commits when the block succeeds.
+
+        An exception inside the block rolls back the run and everything added
+        to it.
+        """
+        connection = self._connection
+        connection.execute("BEGIN IMMEDIATE")
+        try:
+            run_id = connection.execute(
+                "INSERT INTO runs (script, started_at, options, code_digest) VALUES (?, ?, ?, ?)",
+                (script, time.time(), json.dumps(options, sort_keys=True, default=str), code_digest),
+            ).lastrowid
+            yield RunWriter(connection, run_id)
+            connection.execute(
+                "UPDATE runs SET finished_at = ? WHERE run_id = ?", (time.time(), run_id)
+            )
+        except BaseException:
+            connection.execute("ROLLBACK")
+            raise
+        connection.execute("COMMIT")
+
+    def query(self, sql, params=()):
+        """Return the result of a SELECT as a DataFrame."""
+        return pd.read_sql_query(sql, self._connection, params=params)
+
+    def close(self):
+        self._connection.close()
+
+
+class RunWriter:
+    """Adds result frames to the run being recorded by ResultsStore.run()."""
+
+    def __init__(self, connection, run_id):
+        self._connection = connection
+        self.run_id = run_id
+
+    def _add(self, table, frame):
+        columns = TABLE_COLUMNS[table]
+        known = set(COHORT_COLUMNS) | set(columns.values())
+        extra_columns = [column for column in frame.columns if column not in known]
+        names = ["run_id", *COHORT_COLUMNS, *columns, "extra"]
+        extra = [None] * len(frame)
+        if extra_columns:
+            extra_values = zip(*(sql_values(frame, column) for column in extra_columns))
+            extra = [json.dumps(dict(zip(extra_columns, values))) for values in extra_values]
+        rows = zip(
+            [self.run_id] * len(frame),
+            *(sql_values(frame, column) for column in COHORT_COLUMNS),
+            *(sql_values(frame, column) for column in columns.values()),
+            extra,
+        )
+        self._connection.executemany(
+            f"INSERT INTO {table} ({', '.join(names)}) VALUES ({', '.join('?' * len(names))})",
+            rows,
+        )
+
+    def add_merge_diagnostics(self, frame):
+        """Rows of merge_diagnostics() counts, with the cohort columns."""
+        self._add("merge_diagnostics", frame)
+
+    def add_descriptive_statistics(self, frame):
+        """Rows of descriptive_statistics(), with the cohort columns."""
+        self._add("descriptive_statistics", frame)
+
+    def add_statistical_tests(self, frame):
+        """Rows of test_row(), with the cohort columns."""
+        self._add("statistical_tests", frame)
@@ -0,0 +1,78 @@
+"""badge_categories() and hierarchy_errors() against row-at-a-time references."""
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from correlation_analysis import (
+    BADGE_FILE,
+    SNAPSHOTS,
+    assign_badge_category,
+    badge_categories,
+    build_outer_merge,
+    create_analysis_dataset,
+    hierarchy_errors,
+    load_badges,
+    load_citations,
+)
+
+
+def row_wise_hierarchy_errors(df):
+    rows = []
+    replicable_errors = df[
+        (df["Replicable"] == 1) & ((df["Functional"] != 1) | (df["Available"] != 1))
+    ]
+    functional_errors = df[(df["Functional"] == 1) & (df["Available"] != 1)]
+    for errors, message in [
+        (replicable_errors, "Replicable does not imply Functional and Available"),
+        (functional_errors, "Functional does not imply Available"),
+    ]:
+        for _, row in errors.iterrows():
+            rows.append(
+                {
+                    "DOI": row["DOI"],
+                    "CitationDOI": row["CitationDOI"],
+                    "BadgeDOI": row["BadgeDOI"],
+                    "error": message,
+                }
+            )
+    return pd.DataFrame(rows, columns=["DOI", "CitationDOI", "BadgeDOI", "error"])
+
+
+def random_badge_table(n_rows, seed):
+    """Badge rows with every combination of badges, hierarchy violations included."""
+    rng = np.random.default_rng(seed)
+    dois = [f"10.1000/random.{index}" for index in range(n_rows)]
+    return pd.DataFrame(
+        {
+            "DOI": dois,
+            "CitationDOI": dois,
+            "BadgeDOI": dois,
+            "Available": rng.integers(0, 2, n_rows),
+            "Functional": rng.integers(0, 2, n_rows),
+            "Replicable": rng.integers(0, 2, n_rows),
+        }
+    )
+
+
+def assert_matches_row_wise(df):
+    expected = df.apply(assign_badge_category, axis=1)
+    pd.testing.assert_series_equal(badge_categories(df), expected, check_dtype=False)
+    pd.testing.assert_frame_equal(
+        hierarchy_errors(df).reset_index(drop=True),
+        row_wise_hierarchy_errors(df),
+        check_dtype=False,
+    )
+
+
+@pytest.mark.parametrize("snapshot", SNAPSHOTS, ids=[snapshot["label"] for snapshot in SNAPSHOTS])
+def test_sc2022_snapshots_match_row_wise(snapshot):
+    merged_df = build_outer_merge(
+        load_citations(snapshot["citation_file"]), load_badges(BADGE_FILE)
+    )
+    assert_matches_row_wise(create_analysis_dataset(merged_df))
+
+
+def test_random_badge_table_matches_row_wise():
+    df = random_badge_table(5000, seed=0)
+    assert_matches_row_wise(df)
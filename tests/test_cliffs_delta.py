@@ -0,0 +1,82 @@
+"""cliffs_delta() and cliffs_delta_bootstrap_ci() against the pairwise definition."""
+
+import numpy as np
+import pytest
+
+from correlation_analysis import CONFIDENCE_LEVEL, cliffs_delta, cliffs_delta_bootstrap_ci
+
+
+def pairwise_cliffs_delta(x_values, y_values):
+    """Cliff's delta by comparing every pair, as the original double loop did."""
+    if not len(x_values) or not len(y_values):
+        return None
+    greater = lesser = 0
+    for x_value in x_values:
+        for y_value in y_values:
+            if x_value > y_value:
+                greater += 1
+            elif x_value < y_value:
+                lesser += 1
+    return (greater - lesser) / (len(x_values) * len(y_values))
+
+
+def pairwise_bootstrap_ci(x_values, y_values, n_resamples, seed, chunk_values):
+    """Bootstrap with the same draws as cliffs_delta_bootstrap_ci(), counted pairwise."""
+    x_array = np.asarray(x_values, dtype=float)
+    y_array = np.asarray(y_values, dtype=float)
+    n_x, n_y = len(x_array), len(y_array)
+    chunk_rows = max(1, chunk_values // (n_x + n_y))
+    rng = np.random.default_rng(seed)
+    deltas = []
+    for start in range(0, n_resamples, chunk_rows):
+        size = min(chunk_rows, n_resamples - start)
+        x_rows = x_array[rng.integers(0, n_x, size=(size, n_x))]
+        y_rows = y_array[rng.integers(0, n_y, size=(size, n_y))]
+        signs = np.sign(x_rows[:, :, np.newaxis] - y_rows[:, np.newaxis, :])
+        deltas.extend(signs.sum(axis=(1, 2)) / (n_x * n_y))
+    tail = (1 - CONFIDENCE_LEVEL) / 2 * 100
+    lower, upper = np.percentile(deltas, [tail, 100 - tail])
+    return float(lower), float(upper)
+
+
+def tied_samples(n_x, n_y, seed):
+    rng = np.random.default_rng(seed)
+    # Small integer counts with a heavy tail, so most values are tied.
+    x_values = np.floor(rng.pareto(1.5, size=n_x) * 4).astype(np.int64)
+    y_values = np.floor(rng.pareto(1.3, size=n_y) * 4).astype(np.int64)
+    return x_values, y_values
+
+
+SAMPLES = [
+    ([1, 2, 3], [1, 2, 3]),
+    ([5, 5, 5], [5, 5]),
+    ([0, 0, 1, 7, 7, 30], [7]),
+    ([2.5, -1.0, 2.5], [2.5, 0.0, 3.0, -1.0]),
+    tied_samples(36, 26, seed=0),
+    tied_samples(150, 7, seed=1),
+    tied_samples(5, 400, seed=2),
+]
+
+
+@pytest.mark.parametrize("x_values, y_values", SAMPLES)
+def test_cliffs_delta_matches_pairwise(x_values, y_values):
+    assert cliffs_delta(x_values, y_values) == pairwise_cliffs_delta(x_values, y_values)
+    assert cliffs_delta(y_values, x_values) == pairwise_cliffs_delta(y_values, x_values)
+
+
+def test_cliffs_delta_of_an_empty_group():
+    assert cliffs_delta([], [1, 2]) is None
+    assert cliffs_delta([1, 2], []) is None
+
+
+@pytest.mark.parametrize("chunk_values", [10, 1000, 10 ** 6])
+@pytest.mark.parametrize("x_values, y_values", SAMPLES[3:6])
+def test_bootstrap_ci_matches_pairwise(x_values, y_values, chunk_values):
+    expected = pairwise_bootstrap_ci(x_values, y_values, 300, 11, chunk_values)
+    result = cliffs_delta_bootstrap_ci(x_values, y_values, 300, seed=11, chunk_values=chunk_values)
+    assert result == expected
+
+
+def test_bootstrap_ci_without_resamples_or_values():
+    assert cliffs_delta_bootstrap_ci([1, 2], [3], 0) == (None, None)
+    assert cliffs_delta_bootstrap_ci([], [3], 100) == (None, None)
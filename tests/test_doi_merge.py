@@ -0,0 +1,144 @@
+"""normalize_dois() and build_outer_merge() against normalize_doi() and DataFrame.merge()."""
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from correlation_analysis import DOI_PREFIXES, build_outer_merge, normalize_doi, normalize_dois
+
+RAW_DOIS = [
+    "10.1109/SC41404.2022.00001",
+    "https://doi.org/10.1109/SC41404.2022.00002",
+    "http://dx.doi.org/10.1145/3581784.3607035",
+    "doi:10.1145/ABC",
+    "  https://doi.org/10.1145/padded  ",
+    "\t\ndoi:10.1145/tabbed/\n",
+    "10.1145/trailing///",
+    "10.1145/trailing / ",
+    "HTTPS://DOI.ORG/10.1145/UPPER-PREFIX",
+    "https://doi.org/https://doi.org/10.1145/twice",
+    "https://doi.org/",
+    "/",
+    "",
+    "   ",
+    " 10.1145/no-break-space ",
+    "10.1145/ΣΊΣΥΦΟΣ",
+    "10.1145/İstanbul",
+    "10.1145/straße",
+    "10.1145/ǅ-titlecase",
+    "doi:  10.1145/space-after-prefix",
+    None,
+    np.nan,
+]
+
+
+def random_dois(n_rows, seed):
+    rng = np.random.default_rng(seed)
+    pieces = ["", " ", "\t", "/", "//", "A", "b", "Σ", "İ", "ß", " ", "10.1145/", "."]
+    pieces += list(DOI_PREFIXES) + [prefix.upper() for prefix in DOI_PREFIXES]
+    return [
+        "".join(rng.choice(pieces, size=rng.integers(0, 6))) for _ in range(n_rows)
+    ]
+
+
+@pytest.mark.parametrize(
+    "values",
+    [
+        RAW_DOIS,
+        random_dois(5000, seed=0),
+        # Non-string values are converted with str(), as normalize_doi() does.
+        ["10.1145/A", 10.5, 42, None],
+        # Values containing the separator take the row-at-a-time path.
+        ["10.1145/A\x00B", " doi:10.1145/C/ "],
+        [],
+    ],
+    ids=["edge-cases", "random", "non-strings", "separator", "empty"],
+)
+def test_normalize_dois_matches_row_wise(values):
+    series = pd.Series(values, dtype=object, index=np.arange(len(values)) * 2, name="DOI")
+    expected = series.map(normalize_doi)
+    result = normalize_dois(series)
+    pd.testing.assert_series_equal(result, expected.astype(object))
+
+
+def citation_table(dois, seed):
+    rng = np.random.default_rng(seed)
+    return pd.DataFrame(
+        {
+            "DOI": dois,
+            "Citations": rng.integers(0, 500, size=len(dois)).astype(np.int32),
+            "CitationDOI": [f"https://doi.org/{doi.upper()}" for doi in dois],
+        }
+    )
+
+
+def badge_table(dois, seed):
+    rng = np.random.default_rng(seed)
+    return pd.DataFrame(
+        {
+            "BadgeDOI": [f"https://doi.org/{doi}" for doi in dois],
+            "Available": rng.integers(0, 2, size=len(dois)),
+            "Functional": rng.integers(0, 2, size=len(dois)),
+            "Replicable": rng.integers(0, 2, size=len(dois)),
+            "DOI": dois,
+        }
+    )
+
+
+def plain_outer_merge(citations_df, badges_df):
+    return citations_df.merge(
+        badges_df, on="DOI", how="outer", indicator=True, suffixes=("_citation", "_badge")
+    )
+
+
+def random_doi_pool(n_dois, seed):
+    rng = np.random.default_rng(seed)
+    return np.array([f"10.{rng.integers(1000, 9999)}/{rng.integers(0, 10 ** 6)}" for _ in range(n_dois)])
+
+
+@pytest.mark.parametrize(
+    "citation_dois, badge_dois",
+    [
+        (["10.1/b", "10.1/a", "10.1/c"], ["10.1/c", "10.1/d", "10.1/a"]),
+        (["10.1/a"], []),
+        ([], ["10.1/a"]),
+        (["10.1/Z", "10.1/a", "10.1/é", "10.1/ab"], ["10.1/ab", "10.1/é", "10.1/"]),
+    ],
+    ids=["overlap", "no-badges", "no-citations", "ordering"],
+)
+def test_build_outer_merge_matches_merge(citation_dois, badge_dois):
+    citations_df = citation_table(pd.Series(citation_dois, dtype=object), seed=1)
+    badges_df = badge_table(pd.Series(badge_dois, dtype=object), seed=2)
+    pd.testing.assert_frame_equal(
+        build_outer_merge(citations_df, badges_df), plain_outer_merge(citations_df, badges_df)
+    )
+
+
+def test_build_outer_merge_matches_merge_on_random_tables():
+    pool = random_doi_pool(6000, seed=3)
+    rng = np.random.default_rng(4)
+    pool = pd.unique(pool)
+    citation_dois = rng.choice(pool, size=4000, replace=False)
+    badge_dois = rng.choice(pool, size=3000, replace=False)
+    citations_df = citation_table(pd.Series(citation_dois, dtype=object), seed=5)
+    badges_df = badge_table(pd.Series(badge_dois, dtype=object), seed=6)
+    # Overlapping non-key columns get suffixes as in merge().
+    citations_df["Available"] = 1
+    pd.testing.assert_frame_equal(
+        build_outer_merge(citations_df, badges_df), plain_outer_merge(citations_df, badges_df)
+    )
+
+
+@pytest.mark.parametrize("duplicated", ["citations", "badges"])
+def test_build_outer_merge_falls_back_on_duplicate_dois(duplicated):
+    citation_dois = ["10.1/a", "10.1/b", "10.1/c"]
+    badge_dois = ["10.1/b", "10.1/c", "10.1/d"]
+    if duplicated == "citations":
+        citation_dois.append("10.1/b")
+    else:
+        badge_dois.append("10.1/c")
+    citations_df = citation_table(pd.Series(citation_dois, dtype=object), seed=7)
+    badges_df = badge_table(pd.Series(badge_dois, dtype=object), seed=8)
+    merged = build_outer_merge(citations_df, badges_df)
+    pd.testing.assert_frame_equal(merged, plain_outer_merge(citations_df, badges_df))
+    assert len(merged) == 5
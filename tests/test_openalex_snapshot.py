@@ -0,0 +1,133 @@
+"""OpenAlex snapshot scans and the counts_by_year CSV on a small gzip JSON Lines fixture."""
+
+import csv
+import gzip
+import importlib.util
+import json
+import sys
+from pathlib import Path
+
+import pytest
+
+REPO_ROOT = Path(__file__).resolve().parent.parent
+
+
+def load_get_citations():
+    # Registered under an importable name so that worker processes can unpickle its functions.
+    spec = importlib.util.spec_from_file_location("get_citations", REPO_ROOT / "get-citations.py")
+    module = importlib.util.module_from_spec(spec)
+    sys.modules[spec.name] = module
+    spec.loader.exec_module(module)
+    return module
+
+
+get_citations = load_get_citations()
+
+
+def work(doi, cited_by_count, counts_by_year, updated_date, **fields):
+    return {
+        "doi": doi,
+        "ids": {"doi": doi},
+        "cited_by_count": cited_by_count,
+        "counts_by_year": [
+            {"year": year, "cited_by_count": count} for year, count in counts_by_year.items()
+        ],
+        "updated_date": updated_date,
+        **fields,
+    }
+
+
+def write_partition(path, works):
+    path.parent.mkdir(parents=True, exist_ok=True)
+    with gzip.open(path, "wt", encoding="utf-8") as handle:
+        for entry in works:
+            handle.write(json.dumps(entry) + "\n")
+
+
+@pytest.fixture
+def snapshot_dir(tmp_path):
+    directory = tmp_path / "works"
+    write_partition(
+        directory / "updated_date=2024-01-01" / "part_000.gz",
+        [
+            # Wanted, spelled with a URL prefix and upper case in the snapshot.
+            work("https://doi.org/10.1145/SC.2022.A", 12, {2023: 5, 2022: 7}, "2024-01-01T00:00:00"),
+            # Wanted, superseded by the newer record in the second partition.
+            work("https://doi.org/10.1145/sc.2022.b", 3, {2023: 3}, "2024-01-01T00:00:00"),
+            # Only mentions a wanted DOI in a nested "doi" field; its own DOI is not wanted.
+            work(
+                "https://doi.org/10.1145/other",
+                40,
+                {2023: 40},
+                "2024-01-01T00:00:00",
+                primary_location={"doi": "https://doi.org/10.1145/sc.2022.a"},
+            ),
+            # Wanted, but without an integer citation count.
+            work("https://doi.org/10.1145/sc.2022.c", None, {}, "2024-01-01T00:00:00"),
+        ],
+    )
+    write_partition(
+        directory / "updated_date=2024-06-01" / "part_000.gz",
+        [
+            work("https://doi.org/10.1145/sc.2022.b", 9, {2024: 6, 2023: 3}, "2024-06-01T00:00:00"),
+            work("https://doi.org/10.1145/unwanted", 1, {2024: 1}, "2024-06-01T00:00:00"),
+        ],
+    )
+    return directory
+
+
+WANTED = {"10.1145/sc.2022.a", "10.1145/sc.2022.b", "10.1145/sc.2022.c", "10.1145/missing"}
+
+EXPECTED = {
+    "10.1145/sc.2022.a": {
+        "cited_by_count": 12,
+        "counts_by_year": {2022: 7, 2023: 5},
+        "updated_date": "2024-01-01T00:00:00",
+    },
+    "10.1145/sc.2022.b": {
+        "cited_by_count": 9,
+        "counts_by_year": {2023: 3, 2024: 6},
+        "updated_date": "2024-06-01T00:00:00",
+    },
+}
+
+
+def test_partition_matches_normalized_dois(snapshot_dir):
+    partition = snapshot_dir / "updated_date=2024-01-01" / "part_000.gz"
+    found = get_citations.scan_openalex_partition(str(partition), frozenset(WANTED))
+    assert set(found) == {"10.1145/sc.2022.a", "10.1145/sc.2022.b"}
+    assert found["10.1145/sc.2022.a"] == EXPECTED["10.1145/sc.2022.a"]
+    assert found["10.1145/sc.2022.b"]["cited_by_count"] == 3
+
+
+@pytest.mark.parametrize("jobs", [1, 2])
+def test_snapshot_keeps_the_newest_record(snapshot_dir, jobs):
+    assert get_citations.scan_openalex_snapshot(str(snapshot_dir), WANTED, jobs=jobs) == EXPECTED
+
+
+def test_snapshot_without_partitions(tmp_path):
+    with pytest.raises(ValueError, match="No \\*.gz partitions"):
+        get_citations.scan_openalex_snapshot(str(tmp_path), WANTED)
+
+
+def test_counts_by_year_csv(snapshot_dir, tmp_path):
+    snapshot_works = get_citations.scan_openalex_snapshot(str(snapshot_dir), WANTED)
+    keys = [
+        "https://doi.org/10.1145/sc.2022.b",
+        "https://doi.org/10.1145/SC.2022.A",
+        "https://doi.org/10.1145/missing",
+        "A paper without a DOI",
+        "https://doi.org/10.1145/sc.2022.b",
+    ]
+    csv_filename = tmp_path / "counts_by_year.csv"
+    get_citations.write_counts_by_year_csv(str(csv_filename), snapshot_works, keys)
+    with open(csv_filename, newline="", encoding="utf-8") as handle:
+        rows = list(csv.reader(handle))
+    # One row per key and year, keys as given and in first-seen order, years ascending.
+    assert rows == [
+        ["DOI", "Year", "Citations"],
+        ["https://doi.org/10.1145/sc.2022.b", "2023", "3"],
+        ["https://doi.org/10.1145/sc.2022.b", "2024", "6"],
+        ["https://doi.org/10.1145/SC.2022.A", "2022", "7"],
+        ["https://doi.org/10.1145/SC.2022.A", "2023", "5"],
+    ]
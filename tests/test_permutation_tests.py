@@ -0,0 +1,78 @@
+"""Permutation test statistics against SciPy, and seeded p-values across worker counts."""
+
+import numpy as np
+import pandas as pd
+import pytest
+from scipy.stats import kruskal, mannwhitneyu, spearmanr
+
+import correlation_analysis
+from correlation_analysis import (
+    CATEGORY_LEVELS,
+    CATEGORY_ORDER,
+    GroupIndex,
+    permutation_context,
+    permutation_p_values,
+    permutation_statistics,
+    statistical_tests,
+)
+
+PERMUTATIONS = 400
+BLOCK_SIZE = 60  # several seeded blocks, so that the workers share them out
+
+
+def analysis_frame(n_rows, seed):
+    rng = np.random.default_rng(seed)
+    categories = rng.choice(CATEGORY_ORDER, size=n_rows, p=[0.3, 0.15, 0.15, 0.4])
+    levels = np.array([CATEGORY_LEVELS[category] for category in categories])
+    citations = np.floor(rng.pareto(1.3, size=n_rows) * (3 + levels))
+    return pd.DataFrame({"BadgeCategory": categories, "Citations": citations.astype(np.int64)})
+
+
+def observed_statistics(analysis_df):
+    context = permutation_context(analysis_df)
+    identity_pair = context["pair_is_replicable"][np.newaxis, :].astype(float)
+    return [
+        float(statistic[0])
+        for statistic in permutation_statistics(
+            context, context["levels"][np.newaxis, :], identity_pair
+        )
+    ]
+
+
+@pytest.mark.parametrize("n_rows, seed", [(87, 0), (3000, 1)])
+def test_observed_statistics_match_scipy(n_rows, seed):
+    analysis_df = analysis_frame(n_rows, seed)
+    rho, h_statistic, u_distance = observed_statistics(analysis_df)
+
+    levels = analysis_df["BadgeCategory"].map(CATEGORY_LEVELS)
+    citations = analysis_df["Citations"]
+    by_category = {
+        category: citations[analysis_df["BadgeCategory"] == category] for category in CATEGORY_ORDER
+    }
+    replicable, no_badge = by_category["Replicable"], by_category["No badge"]
+    u_statistic = mannwhitneyu(replicable, no_badge, alternative="two-sided").statistic
+
+    assert rho == pytest.approx(abs(spearmanr(levels, citations).statistic), rel=1e-12)
+    assert h_statistic == pytest.approx(kruskal(*by_category.values()).statistic, rel=1e-12)
+    assert u_distance == pytest.approx(abs(u_statistic - len(replicable) * len(no_badge) / 2))
+
+
+def test_seeded_p_values_do_not_depend_on_worker_count(monkeypatch):
+    monkeypatch.setattr(correlation_analysis, "PERMUTATION_BLOCK_SIZE", BLOCK_SIZE)
+    analysis_df = analysis_frame(200, seed=2)
+    serial = permutation_p_values(analysis_df, PERMUTATIONS, seed=7, jobs=1)
+    for jobs in (2, 3):
+        assert permutation_p_values(analysis_df, PERMUTATIONS, seed=7, jobs=jobs) == serial
+    assert permutation_p_values(analysis_df, PERMUTATIONS, seed=8, jobs=1) != serial
+    for p_value in serial.values():
+        assert 1 / (PERMUTATIONS + 1) <= p_value <= 1
+
+
+def test_statistical_tests_permutation_columns_do_not_depend_on_worker_count(monkeypatch):
+    monkeypatch.setattr(correlation_analysis, "PERMUTATION_BLOCK_SIZE", BLOCK_SIZE)
+    analysis_df = analysis_frame(150, seed=3)
+    options = {"permutations": PERMUTATIONS, "seed": 5, "groups": GroupIndex(analysis_df)}
+    serial = statistical_tests(analysis_df, permutation_jobs=1, **options)
+    parallel = statistical_tests(analysis_df, permutation_jobs=2, **options)
+    pd.testing.assert_frame_equal(serial, parallel)
+    assert serial["permutation_p_value"].notna().sum() == 3
@@ -0,0 +1,76 @@
+"""rank_spearman() and rank_kruskal() against scipy.stats.spearmanr() and kruskal()."""
+
+import numpy as np
+import pandas as pd
+import pytest
+from scipy.stats import kruskal, spearmanr
+
+from correlation_analysis import (
+    CATEGORY_LEVELS,
+    CATEGORY_ORDER,
+    GroupIndex,
+    rank_kruskal,
+    rank_spearman,
+)
+
+
+def heavy_tailed_analysis_frame(n_rows, seed, sizes=None):
+    """Badge categories with heavy-tailed, heavily tied integer citation counts."""
+    rng = np.random.default_rng(seed)
+    if sizes is None:
+        categories = rng.choice(CATEGORY_ORDER, size=n_rows, p=[0.3, 0.15, 0.15, 0.4])
+    else:
+        categories = rng.permutation(np.repeat(CATEGORY_ORDER, sizes))
+    # Higher badge levels get a slightly heavier tail, so the tests see an effect.
+    levels = np.array([CATEGORY_LEVELS[category] for category in categories])
+    citations = np.floor(rng.pareto(1.2 - 0.1 * levels / 3, size=len(categories)) * 3)
+    return pd.DataFrame({"BadgeCategory": categories, "Citations": citations.astype(np.int64)})
+
+
+def scipy_results(analysis_df):
+    levels = analysis_df["BadgeCategory"].map(CATEGORY_LEVELS)
+    samples = [
+        analysis_df.loc[analysis_df["BadgeCategory"] == category, "Citations"]
+        for category in CATEGORY_ORDER
+    ]
+    spearman = spearmanr(levels, analysis_df["Citations"])
+    kruskal_result = kruskal(*samples)
+    return spearman, kruskal_result
+
+
+@pytest.mark.parametrize(
+    "n_rows, seed, sizes",
+    [
+        (87, 0, None),
+        (2000, 1, None),
+        (50000, 2, None),
+        (None, 3, [1, 1, 1, 40]),
+        (None, 4, [200, 3, 5, 500]),
+    ],
+    ids=["sc-sized", "medium", "large", "singletons", "unbalanced"],
+)
+def test_rank_tests_match_scipy(n_rows, seed, sizes):
+    analysis_df = heavy_tailed_analysis_frame(n_rows, seed, sizes)
+    assert analysis_df["Citations"].duplicated().any()
+    groups = GroupIndex(analysis_df)
+    spearman, kruskal_result = scipy_results(analysis_df)
+
+    rho, spearman_p = rank_spearman(groups)
+    assert rho == pytest.approx(spearman.statistic, rel=1e-12, abs=1e-15)
+    assert spearman_p == pytest.approx(spearman.pvalue, rel=1e-9, abs=1e-300)
+
+    h_statistic, kruskal_p = rank_kruskal(groups)
+    assert h_statistic == pytest.approx(kruskal_result.statistic, rel=1e-12)
+    assert kruskal_p == pytest.approx(kruskal_result.pvalue, rel=1e-9, abs=1e-300)
+
+
+@pytest.mark.filterwarnings("ignore::scipy.stats.ConstantInputWarning")
+def test_rank_tests_are_undefined_for_degenerate_input():
+    constant = pd.DataFrame({"BadgeCategory": CATEGORY_ORDER * 3, "Citations": 5})
+    groups = GroupIndex(constant)
+    assert all(np.isnan(value) for value in rank_spearman(groups))
+    levels = constant["BadgeCategory"].map(CATEGORY_LEVELS)
+    assert np.isnan(spearmanr(levels, constant["Citations"]).statistic)
+
+    missing_category = heavy_tailed_analysis_frame(None, 5, [10, 0, 10, 10])
+    assert all(np.isnan(value) for value in rank_kruskal(GroupIndex(missing_category)))
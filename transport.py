@@ -0,0 +1,213 @@
+"""Pooled, rate-limited HTTP GET transport shared by the citation fetch sources.
+
+Every host gets one keep-alive requests.Session whose connection pool is sized
+for the worker threads, so concurrent lookups reuse connections instead of
+paying a TCP and TLS handshake per request. Requests to a host draw from a
+token bucket: `rate` requests per second with bursts of up to `burst`.
+
+Responses with status 429, 500, 502, 503 or 504 and connection errors are
+retried up to `max_retries` times. The delay is the server's Retry-After when
+it sends one and otherwise exponential backoff with full jitter. A 429 also
+pauses the host's bucket, so the other threads back off instead of hitting the
+limit again. With a `validators` store, responses carrying an ETag or
+Last-Modified header are remembered and later requests for the same URL are
+sent as conditional requests; a 304 answer is returned as the stored 200
+response.
+
+get-citations.py builds one Transport in main(); this module has no knowledge
+of the APIs behind the URLs.
+"""
+
+import email.utils
+import random
+import threading
+import time
+from urllib.parse import urlparse
+
+import requests
+from requests.adapters import HTTPAdapter
+
+import instrumentation
+
+
+RETRY_STATUSES = frozenset({429, 500, 502, 503, 504})
+DEFAULT_MAX_RETRIES = 5
+DEFAULT_BACKOFF_BASE = 0.5  # seconds before the first retry, doubled for each further retry
+DEFAULT_BACKOFF_MAX = 60.0
+DEFAULT_TIMEOUT = 30.0
+USER_AGENT = "reproducibility-impact (citation fetcher)"
+
+
+class TokenBucket:
+    """Per-host token buckets refilled at `rate` tokens per second up to `burst`.
+
+    A rate of None or 0 disables limiting. take() blocks until the host has a
+    token; pause() empties a host's bucket until the given delay has passed.
+    """
+
+    def __init__(self, rate=None, burst=1):
+        self._lock = threading.Lock()
+        self._hosts = {}
+        self.configure(rate, burst)
+
+    def configure(self, rate, burst=1):
+        with self._lock:
+            self.rate = rate or 0.0
+            self.burst = max(1.0, float(burst))
+            self._hosts.clear()
+
+    def take(self, host):
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                tokens, updated, paused_until = self._hosts.get(host, (self.burst, now, 0.0))
+                if now >= paused_until:
+                    if not self.rate:
+                        return
+                    tokens = min(self.burst, tokens + (now - updated) * self.rate)
+                    if tokens >= 1:
+                        self._hosts[host] = (tokens - 1, now, paused_until)
+                        return
+                    delay = (1 - tokens) / self.rate
+                    self._hosts[host] = (tokens, now, paused_until)
+                else:
+                    delay = paused_until - now
+            time.sleep(delay)
+
+    def pause(self, host, seconds):
+        with self._lock:
+            now = time.monotonic()
+            _, _, paused_until = self._hosts.get(host, (0.0, now, 0.0))
+            self._hosts[host] = (0.0, now + seconds, max(paused_until, now + seconds))
+
+
+def retry_after_seconds(response):
+    """Seconds requested by a Retry-After header (delta or HTTP date), or None."""
+    value = response.headers.get("Retry-After")
+    if not value:
+        return None
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        pass
+    try:
+        retry_at = email.utils.parsedate_to_datetime(value)
+    except (TypeError, ValueError):
+        return None
+    return max(0.0, retry_at.timestamp() - time.time())
+
+
+class Transport:
+    """GET requests through pooled per-host sessions with rate limiting and retries."""
+
+    def __init__(
+        self,
+        rate=None,
+        burst=1,
+        pool_size=10,
+        max_retries=DEFAULT_MAX_RETRIES,
+        backoff_base=DEFAULT_BACKOFF_BASE,
+        backoff_max=DEFAULT_BACKOFF_MAX,
+        timeout=DEFAULT_TIMEOUT,
+        validators=None,
+    ):
+        self.limiter = TokenBucket(rate, burst)
+        self.pool_size = pool_size
+        self.max_retries = max_retries
+        self.backoff_base = backoff_base
+        self.backoff_max = backoff_max
+        self.timeout = timeout
+        # Object with get(url) and set(url, entry) storing ETag/Last-Modified
+        # validators with the response body; None disables conditional requests.
+        self.validators = validators
+        self._sessions = {}
+        self._lock = threading.Lock()
+
+    def session(self, host):
+        with self._lock:
+            if host not in self._sessions:
+                session = requests.Session()
+                adapter = HTTPAdapter(pool_connections=1, pool_maxsize=self.pool_size)
+                session.mount("https://", adapter)
+                session.mount("http://", adapter)
+                session.headers["User-Agent"] = USER_AGENT
+                self._sessions[host] = session
+            return self._sessions[host]
+
+    def backoff(self, attempt):
+        return random.uniform(0, min(self.backoff_max, self.backoff_base * 2**attempt))
+
+    def get(self, url, source=None, headers=None):
+        """GET `url`, retrying throttled and failed attempts.
+
+        Returns the last response, whatever its status, or raises the last
+        requests.RequestException when no attempt got a response. `source`
+        names the API for the instrumentation records (default: the host).
+        """
+        host = urlparse(url).netloc
+        source = source or host
+        stored = self.validators.get(url) if self.validators is not None else None
+        headers = dict(headers or {})
+        if stored:
+            if stored.get("etag"):
+                headers["If-None-Match"] = stored["etag"]
+            if stored.get("last_modified"):
+                headers["If-Modified-Since"] = stored["last_modified"]
+
+        session = self.session(host)
+        for attempt in range(self.max_retries + 1):
+            self.limiter.take(host)
+            start = time.time()
+            wall_start = time.perf_counter()
+            try:
+                response = session.get(url, headers=headers, timeout=self.timeout)
+            except (requests.ConnectionError, requests.Timeout):
+                instrumentation.record_request(source, start, time.perf_counter() - wall_start, True)
+                if attempt == self.max_retries:
+                    raise
+                instrumentation.record_retry(source)
+                time.sleep(self.backoff(attempt))
+                continue
+            failed = response.status_code not in (200, 304)
+            instrumentation.record_request(source, start, time.perf_counter() - wall_start, failed)
+            if response.status_code not in RETRY_STATUSES or attempt == self.max_retries:
+                break
+            delay = retry_after_seconds(response)
+            if delay is None:
+                delay = self.backoff(attempt)
+            if response.status_code == 429:
+                self.limiter.pause(host, delay)
+            instrumentation.record_retry(source)
+            response.close()
+            time.sleep(delay)
+
+        if response.status_code == 304 and stored:
+            return stored_response(url, stored)
+        if response.status_code == 200 and self.validators is not None:
+            etag = response.headers.get("ETag")
+            last_modified = response.headers.get("Last-Modified")
+            if etag or last_modified:
+                self.validators.set(
+                    url, {"etag": etag, "last_modified": last_modified, "body": response.text}
+                )
+        return response
+
+    def close(self):
+        with self._lock:
+            for session in self._sessions.values():
+                session.close()
+            self._sessions.clear()
+
+
+def stored_response(url, stored):
+    """Rebuild the 200 response a conditional request was answered with 304 for."""
+    response = requests.Response()
+    response.status_code = 200
+    response.url = url
+    response.encoding = "utf-8"
+    response._content = stored["body"].encode("utf-8")
+    if stored.get("etag"):
+        response.headers["ETag"] = stored["etag"]
+    if stored.get("last_modified"):
+        response.headers["Last-Modified"] = stored["last_modified"]
+    return response